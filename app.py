@@ -26,6 +26,7 @@ for field in fields(Accounts):
             generate_name('BackendStack', account_props),
             account=account_props,
             artist_table=database_stack.artist_table,
+            cache_table=database_stack.cache_table,
         )
 
 app.synth()
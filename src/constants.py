@@ -2,6 +2,9 @@ import os
 from dataclasses import dataclass
 from enum import Enum
 
+# Sparse GSI on the artist table that the adaptive notifier schedule queries for due artists
+NEXT_CHECK_INDEX_NAME: str = 'NextCheckIndex'
+
 
 class Stage(Enum):
     Prod = 'Prod'
@@ -28,3 +31,29 @@ class Accounts:
         stage=Stage.Prod,
         region='us-east-1',
     )
+
+
+@dataclass(frozen=True)
+class NotifierSharding:
+    """
+    Settings for fanning the notifier's fetch/update steps out over
+    chunks of the artist list with a Step Functions Map state.
+    """
+
+    chunk_size: int = 100
+    max_concurrency: int = 10
+    distributed: bool = False
+
+
+class NotifierStrategy(Enum):
+    """
+    How the notifier finds new music. `PerArtist` checks every artist's albums.
+    `NewReleasesFeed` only checks artists that show up in Spotify's new releases
+    feed, which is far cheaper but only covers the releases Spotify lists there.
+    `Auto` picks whichever needs fewer requests on each run, but only uses the
+    feed while every artist was also checked one by one in the last four weeks.
+    """
+
+    PerArtist = 'per_artist'
+    NewReleasesFeed = 'new_releases'
+    Auto = 'auto'
@@ -22,8 +22,11 @@ class ApiGatewayConstruct(Construct):
         fetch_artists_lambda: Function,
         add_artists_lambda: Function,
         remove_artists_lambda: Function,
+        add_artists_batch_lambda: Function,
+        remove_artists_batch_lambda: Function,
         access_token_lambda: Function,
         get_artist_id_lambda: Function,
+        import_playlist_artists_lambda: Function,
         **kwargs,
     ) -> None:
         super().__init__(scope, id, **kwargs)
@@ -38,8 +41,11 @@ class ApiGatewayConstruct(Construct):
         fetch_artists_lambda.grant_invoke(api_gateway_role)
         add_artists_lambda.grant_invoke(api_gateway_role)
         remove_artists_lambda.grant_invoke(api_gateway_role)
+        add_artists_batch_lambda.grant_invoke(api_gateway_role)
+        remove_artists_batch_lambda.grant_invoke(api_gateway_role)
         access_token_lambda.grant_invoke(api_gateway_role)
         get_artist_id_lambda.grant_invoke(api_gateway_role)
+        import_playlist_artists_lambda.grant_invoke(api_gateway_role)
 
         self._api = RestApi(
             self,
@@ -54,8 +60,11 @@ class ApiGatewayConstruct(Construct):
         fetch_artist_integration = LambdaIntegration(fetch_artists_lambda)  # type: ignore
         add_artist_integration = LambdaIntegration(add_artists_lambda)  # type: ignore
         remove_artist_integration = LambdaIntegration(remove_artists_lambda)  # type: ignore
+        add_artists_batch_integration = LambdaIntegration(add_artists_batch_lambda)  # type: ignore
+        remove_artists_batch_integration = LambdaIntegration(remove_artists_batch_lambda)  # type: ignore
         access_token_integration = LambdaIntegration(access_token_lambda)  # type: ignore
         get_artist_id_integration = LambdaIntegration(get_artist_id_lambda)  # type: ignore
+        import_playlist_artists_integration = LambdaIntegration(import_playlist_artists_lambda)  # type: ignore
 
         """
         Define resources and methods for all CoreTableOperator Lambda functions.
@@ -81,6 +90,17 @@ class ApiGatewayConstruct(Construct):
         remove_artist_resource = artist_resource
         remove_artist_resource.add_method('DELETE', remove_artist_integration, authorization_type=AuthorizationType.IAM)
 
+        # POST /artist/batch
+        artist_batch_resource = artist_resource.add_resource('batch')
+        artist_batch_resource.add_method('POST', add_artists_batch_integration, authorization_type=AuthorizationType.IAM)
+
+        # DELETE /artist/batch
+        artist_batch_resource.add_method('DELETE', remove_artists_batch_integration, authorization_type=AuthorizationType.IAM)
+
+        # POST /artist/import
+        import_artists_resource = artist_resource.add_resource('import')
+        import_artists_resource.add_method('POST', import_playlist_artists_integration, authorization_type=AuthorizationType.IAM)
+
         # Store the API Gateway URL in SSM for CLI users
         endpoint_url_param = StringParameter(
             self,
@@ -1,17 +1,28 @@
-from aws_cdk import Duration
+from aws_cdk import Duration, RemovalPolicy
 from aws_cdk.aws_dynamodb import TableV2
 from aws_cdk.aws_events import Rule, Schedule
 from aws_cdk.aws_events_targets import SfnStateMachine
 from aws_cdk.aws_iam import Effect, PolicyStatement
-from aws_cdk.aws_lambda import Code, Function, LayerVersion, Runtime
+from aws_cdk.aws_lambda import Function, LayerVersion, Runtime
+from aws_cdk.aws_s3 import BlockPublicAccess, Bucket, BucketEncryption, LifecycleRule
 from aws_cdk.aws_secretsmanager import Secret
 from aws_cdk.aws_sns import Topic
-from aws_cdk.aws_stepfunctions import Choice, Condition, StateMachine
+from aws_cdk.aws_stepfunctions import (
+    Choice,
+    Condition,
+    DistributedMap,
+    Errors,
+    JsonPath,
+    Map,
+    Pass,
+    StateMachine,
+    Succeed,
+)
 from aws_cdk.aws_stepfunctions_tasks import LambdaInvoke
 from constructs import Construct
 
-from ..constants import AwsAccount
-from ..helpers.helpers import generate_name
+from ..constants import NEXT_CHECK_INDEX_NAME, AwsAccount, NotifierSharding, NotifierStrategy
+from ..helpers.helpers import generate_name, get_removal_policy, handler_code
 
 
 class NotifierConstruct(Construct):
@@ -27,12 +38,47 @@ class NotifierConstruct(Construct):
         id: str,
         account: AwsAccount,
         artist_table: TableV2,
-        requests_layer: LayerVersion,
+        cache_table: TableV2,
+        common_layer: LayerVersion,
         access_token_lambda: Function,
+        max_concurrent_requests: int = 10,
+        sharding: NotifierSharding | None = None,
+        scan_total_segments: int = 1,
+        claim_check_threshold_bytes: int | None = None,
+        strategy: NotifierStrategy = NotifierStrategy.PerArtist,
+        adaptive_schedule: bool = False,
+        max_due_artists: int = 500,
         **kwargs,
     ) -> None:
         super().__init__(scope, id, **kwargs)
 
+        # Optional claim check bucket. Payloads over the threshold are passed between tasks as S3 pointers
+        _payload_bucket: Bucket | None = None
+        claim_check_environment: dict[str, str] = {}
+        if claim_check_threshold_bytes is not None:
+            removal_policy = get_removal_policy(account.stage)
+            _payload_bucket = Bucket(
+                self,
+                'NotifierPayloadBucket',
+                encryption=BucketEncryption.S3_MANAGED,
+                block_public_access=BlockPublicAccess.BLOCK_ALL,
+                enforce_ssl=True,
+                lifecycle_rules=[LifecycleRule(expiration=Duration.days(7))],
+                removal_policy=removal_policy,
+                auto_delete_objects=removal_policy == RemovalPolicy.DESTROY,
+            )
+            claim_check_environment = {
+                'PAYLOAD_BUCKET_NAME': _payload_bucket.bucket_name,
+                'CLAIM_CHECK_THRESHOLD_BYTES': str(claim_check_threshold_bytes),
+            }
+
+        # With the adaptive schedule, the notifier runs daily and only checks the artists that are due,
+        # based on each artist's own release cadence
+        schedule_environment: dict[str, str] = {
+            'SCHEDULE_MODE': 'adaptive' if adaptive_schedule else 'weekly',
+            'NEXT_CHECK_INDEX_NAME': NEXT_CHECK_INDEX_NAME,
+        }
+
         # All Lambdas throughout our StepFunction
         get_artists_list_lambda_name = generate_name('GetArtistsListFor-ForNotifier', account)
         _fetch_artists_list_lambda = Function(
@@ -41,13 +87,23 @@ class NotifierConstruct(Construct):
             description='Pulls the current list of artists being monitored',
             function_name=get_artists_list_lambda_name,
             runtime=Runtime.PYTHON_3_12,
-            code=Code.from_asset('src/lambdas/NotifierConstructLambdas'),
+            code=handler_code('src/lambdas/NotifierConstructLambdas', 'get_artist_list_for_notifier.handler'),
             handler='get_artist_list_for_notifier.handler',
-            layers=[requests_layer],
-            environment={'ARTIST_TABLE_NAME': artist_table.table_name},
-            timeout=Duration.seconds(10),
+            layers=[common_layer],
+            environment={
+                'ARTIST_TABLE_NAME': artist_table.table_name,
+                'ARTIST_CHUNK_SIZE': str(sharding.chunk_size if sharding else 0),
+                'SCAN_TOTAL_SEGMENTS': str(scan_total_segments),
+                'MAX_DUE_ARTISTS': str(max_due_artists),
+                'CACHE_TABLE_NAME': cache_table.table_name,
+                **schedule_environment,
+                **claim_check_environment,
+            },
+            # Full table scans and the unscheduled artist backfill run in here, in line with the other scan Lambdas
+            timeout=Duration.seconds(30),
         )
         artist_table.grant_read_data(_fetch_artists_list_lambda)
+        cache_table.grant_read_write_data(_fetch_artists_list_lambda)
 
         _topic = Topic(self, 'NotifierTopic', topic_name='SpotificityNotifierTopic')
 
@@ -59,8 +115,9 @@ class NotifierConstruct(Construct):
             function_name=email_if_no_artists_lambda_name,
             runtime=Runtime.PYTHON_3_12,
             timeout=Duration.seconds(5),
-            code=Code.from_asset('src/lambdas/NotifierConstructLambdas'),
+            code=handler_code('src/lambdas/NotifierConstructLambdas', 'message_if_no_artists.handler'),
             handler='message_if_no_artists.handler',
+            layers=[common_layer],
             environment={'SNS_TOPIC_ARN': _topic.topic_arn},
         )
         _email_if_no_artists_lambda.add_to_role_policy(
@@ -79,10 +136,21 @@ class NotifierConstruct(Construct):
             function_name=fetch_music_lambda_name,
             runtime=Runtime.PYTHON_3_12,
             timeout=Duration.minutes(3),
-            code=Code.from_asset('src/lambdas/NotifierConstructLambdas'),
+            code=handler_code('src/lambdas/NotifierConstructLambdas', 'get_latest_music_for_notifier.handler'),
             handler='get_latest_music_for_notifier.handler',
-            layers=[requests_layer],
+            layers=[common_layer],
+            environment={
+                'MAX_CONCURRENT_REQUESTS': str(max_concurrent_requests),
+                'NOTIFIER_STRATEGY': strategy.value,
+                'CACHE_TABLE_NAME': cache_table.table_name,
+                **claim_check_environment,
+            },
         )
+        cache_table.grant_read_write_data(_fetch_music_lambda)
+
+        # The fetch Lambda gets its own access tokens, as a long run can outlast the one passed in
+        __spotify_secrets = Secret.from_secret_name_v2(self, 'ImportedSpotifySecrets', secret_name='SpotifySecrets')
+        __spotify_secrets.grant_read(_fetch_music_lambda)
 
         update_table_music_lambda_name = generate_name('UpdateTableMusicLambda-ForNotifier', account)
         _update_table_music_lambda = Function(
@@ -92,11 +160,18 @@ class NotifierConstruct(Construct):
             function_name=update_table_music_lambda_name,
             runtime=Runtime.PYTHON_3_12,
             timeout=Duration.seconds(45),
-            code=Code.from_asset('src/lambdas/NotifierConstructLambdas'),
+            code=handler_code('src/lambdas/NotifierConstructLambdas', 'update_table_music_for_notifier.handler'),
             handler='update_table_music_for_notifier.handler',
-            environment={'ARTIST_TABLE_NAME': artist_table.table_name},
+            layers=[common_layer],
+            environment={
+                'ARTIST_TABLE_NAME': artist_table.table_name,
+                'ARTIST_CHUNK_SIZE': str(sharding.chunk_size if sharding else 0),
+                'MAX_CONCURRENT_REQUESTS': str(max_concurrent_requests),
+                **schedule_environment,
+                **claim_check_environment,
+            },
         )
-        artist_table.grant_write_data(_update_table_music_lambda)
+        artist_table.grant_read_write_data(_update_table_music_lambda)
 
         email_new_music_lambda_name = generate_name('MessageNewMusicLambda', account)
         _email_new_music_lambda = Function(
@@ -105,9 +180,14 @@ class NotifierConstruct(Construct):
             description='Publishes a message to a SNS topic with new music.',
             function_name=email_new_music_lambda_name,
             runtime=Runtime.PYTHON_3_12,
-            code=Code.from_asset('src/lambdas/NotifierConstructLambdas'),
+            code=handler_code('src/lambdas/NotifierConstructLambdas', 'message_new_music.handler'),
             handler='message_new_music.handler',
-            environment={'SNS_TOPIC_ARN': _topic.topic_arn},
+            layers=[common_layer],
+            environment={
+                'SNS_TOPIC_ARN': _topic.topic_arn,
+                'SKIP_EMPTY_REPORTS': 'true' if adaptive_schedule else 'false',
+                **claim_check_environment,
+            },
             timeout=Duration.seconds(5),
         )
         _email_new_music_lambda.add_to_role_policy(
@@ -117,6 +197,12 @@ class NotifierConstruct(Construct):
             )
         )
 
+        if _payload_bucket is not None:
+            _payload_bucket.grant_read_write(_fetch_artists_list_lambda)
+            _payload_bucket.grant_read_write(_fetch_music_lambda)
+            _payload_bucket.grant_read_write(_update_table_music_lambda)
+            _payload_bucket.grant_read(_email_new_music_lambda)
+
         # Tasks within our Step Function workflow
         _fetch_access_token_task = LambdaInvoke(
             self,
@@ -135,7 +221,7 @@ class NotifierConstruct(Construct):
         )
 
         # If `_scan_task` returns with a status code of 204, we immediately publish SNS message to the topic.
-        # Otherwise, we invoke the lambda to fetch the latest music released all artists
+        # A 202 means no artist is due for a check yet on the adaptive schedule, so the run just ends. Otherwise, we invoke the lambda to fetch the latest music released all artists
         _choice_state = Choice(self, 'Artists in the list, or not?')
 
         # Define tasks for choice state
@@ -145,17 +231,24 @@ class NotifierConstruct(Construct):
             lambda_function=_email_if_no_artists_lambda,  # type: ignore
         )
 
+        # The fetch task checkpoints its progress and returns a `continuation` when it runs low on time.
+        # `_fetch_finished_choice` then loops back to it until every artist is fetched. Its checkpoints are
+        # kept per execution (and per chunk), so neither the loop nor a retry fetches an artist twice
         _fetch_latest_music_task = LambdaInvoke(
             self,
             'FetchLatestMusic',
             lambda_function=_fetch_music_lambda,  # type: ignore
-            output_path='$.latest_music',
+            result_path='$.fetch',
             payload_response_only=True,
         )
-
-        # Add conditions to the choice state
-        _choice_state.when(Condition.number_equals('$.status_code', 204), _if_no_artists_publish_task)
-        _choice_state.otherwise(_fetch_latest_music_task)
+        _fetch_latest_music_task.add_retry(
+            errors=[Errors.TASKS_FAILED],
+            interval=Duration.seconds(5),
+            max_attempts=2,
+            backoff_rate=2,
+        )
+        _fetch_finished_choice = Choice(self, 'Finished fetching, or not?')
+        _fetch_finished_choice.when(Condition.is_present('$.fetch.continuation'), _fetch_latest_music_task)
 
         # Continue listing the rest of the tasks in our Step Function workflow
         _update_table_task = LambdaInvoke(
@@ -171,8 +264,53 @@ class NotifierConstruct(Construct):
         # Connect tasks to be in order
         _fetch_access_token_task.next(_scan_task)
         _scan_task.next(_choice_state)
-        _fetch_latest_music_task.next(_update_table_task)
-        _update_table_task.next(_publish_results_task)
+        _choice_state.when(Condition.number_equals('$.status_code', 204), _if_no_artists_publish_task)
+        _choice_state.when(Condition.number_equals('$.status_code', 202), Succeed(self, 'NoArtistsDue'))
+
+        _fetch_latest_music_task.next(_fetch_finished_choice)
+        # Once every artist is fetched, only the latest music is passed on. The artist list is dropped from the state
+        _drop_artist_list_state = Pass(self, 'DropArtistList', output_path='$.fetch.latest_music')
+        _fetch_finished_choice.otherwise(_drop_artist_list_state)
+        _drop_artist_list_state.next(_update_table_task)
+
+        if sharding is None:
+            _start_fetch_state = Pass(
+                self,
+                'StartFetch',
+                parameters={'execution_id': JsonPath.string_at('$$.Execution.Id')},
+                result_path='$.checkpoint',
+            )
+            _choice_state.otherwise(_start_fetch_state)
+            _start_fetch_state.next(_fetch_latest_music_task)
+            _update_table_task.next(_publish_results_task)
+        else:
+            # Fan the fetch and update tasks out over chunks of the artist list. Each iteration gets the
+            # same payload shape the unsharded tasks get, just with its own slice of the artists.
+            # The Map state collects one `new_music` list per chunk, which `PublishResults` merges back together.
+            # With a claim check bucket, every non-empty chunk hands back a claim check, so the collected output stays small.
+            map_props = {
+                'items_path': '$.artists.artist_chunks',
+                'item_selector': {
+                    'access_token': JsonPath.string_at('$.access_token'),
+                    'artists': {
+                        'current_artists_with_id': JsonPath.string_at('$$.Map.Item.Value'),
+                        'artist_count': JsonPath.number_at('$.artists.artist_count'),
+                    },
+                    'checkpoint': {
+                        'execution_id': JsonPath.string_at('$$.Execution.Id'),
+                        'chunk_index': JsonPath.number_at('$$.Map.Item.Index'),
+                    },
+                },
+                'max_concurrency': sharding.max_concurrency,
+            }
+            if sharding.distributed:
+                _shard_map = DistributedMap(self, 'FetchAndUpdateArtistChunks', **map_props)
+            else:
+                _shard_map = Map(self, 'FetchAndUpdateArtistChunks', **map_props)
+
+            _shard_map.item_processor(_fetch_latest_music_task)
+            _choice_state.otherwise(_shard_map)
+            _shard_map.next(_publish_results_task)
 
         # Instantiate StateMachine for our entire step function workflow
         _state_machine = StateMachine(
@@ -182,8 +320,18 @@ class NotifierConstruct(Construct):
             definition=_fetch_access_token_task,  # The initial task to invoke
         )
 
-        # EventBridge rule to trigger Lambda StepFunction routine every Sunday at 8AM EST
-        if account.stage.value == 'Prod':
+        # EventBridge rule to trigger Lambda StepFunction routine every Sunday at 8AM EST,
+        # or every day at 8AM EST on the adaptive schedule
+        if account.stage.value == 'Prod' and adaptive_schedule:
+            Rule(
+                self,
+                'NotificationRule',
+                rule_name=generate_name('DailyMusicFetchNotificationRule', account),
+                schedule=Schedule.cron(minute='0', hour='12'),
+                description='Triggers Lambda every day to fetch the latest musical releases from the artists due for a check.',
+                targets=[SfnStateMachine(_state_machine)],  # type: ignore
+            )
+        elif account.stage.value == 'Prod':
             Rule(
                 self,
                 'NotificationRule',
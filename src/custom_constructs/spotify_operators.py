@@ -1,12 +1,12 @@
 from aws_cdk import Duration
-from aws_cdk.aws_dynamodb import Table
-from aws_cdk.aws_lambda import Code, Function, LayerVersion, Runtime, StartingPosition
+from aws_cdk.aws_dynamodb import Table, TableV2
+from aws_cdk.aws_lambda import FilterCriteria, FilterRule, Function, LayerVersion, Runtime, StartingPosition
 from aws_cdk.aws_lambda_event_sources import DynamoEventSource
 from aws_cdk.aws_secretsmanager import Secret
 from constructs import Construct
 
 from ..constants import AwsAccount
-from ..helpers.helpers import generate_name, get_removal_policy
+from ..helpers.helpers import generate_name, get_removal_policy, handler_code
 
 
 class CoreSpotifyOperatorsConstruct(Construct):
@@ -23,6 +23,10 @@ class CoreSpotifyOperatorsConstruct(Construct):
     def artist_id_lambda(self) -> Function:
         return self.get_artist_id_lambda
 
+    @property
+    def playlist_import_lambda(self) -> Function:
+        return self.import_playlist_artists_lambda
+
     def __init__(
         self,
         scope: Construct,
@@ -30,8 +34,12 @@ class CoreSpotifyOperatorsConstruct(Construct):
         account: AwsAccount,
         artist_table_arn: str,
         artist_table_stream_arn: str | None,
-        update_table_music_lambda: Function,
-        requests_layer: LayerVersion,
+        cache_table: TableV2,
+        common_layer: LayerVersion,
+        stream_batch_size: int | None = None,
+        stream_max_batching_window: Duration | None = None,
+        stream_parallelization_factor: int | None = None,
+        adaptive_schedule: bool = False,
         **kwargs,
     ) -> None:
         super().__init__(scope, id, **kwargs)
@@ -41,59 +49,99 @@ class CoreSpotifyOperatorsConstruct(Construct):
             self,
             get_access_token_lambda_name,
             runtime=Runtime.PYTHON_3_12,
-            code=Code.from_asset('src/lambdas/CoreSpotifyOperatorLambdas'),
+            code=handler_code('src/lambdas/CoreSpotifyOperatorLambdas', 'get_access_token.handler'),
             handler='get_access_token.handler',
             function_name=get_access_token_lambda_name,
             description=f'Calls Spotify\'s API to get an access token.',
-            layers=[requests_layer],
-            timeout=Duration.seconds(5),
+            layers=[common_layer],
+            environment={'CACHE_TABLE_NAME': cache_table.table_name},
+            timeout=Duration.seconds(15),
         )
+        cache_table.grant_read_write_data(self.get_access_token_lambda)
 
         get_artist_id_lambda_name = generate_name('GetArtist-IDLambda', account)
         self.get_artist_id_lambda = Function(
             self,
             get_artist_id_lambda_name,
             runtime=Runtime.PYTHON_3_12,
-            code=Code.from_asset('src/lambdas/CoreSpotifyOperatorLambdas'),
+            code=handler_code('src/lambdas/CoreSpotifyOperatorLambdas', 'get_artist_id.handler'),
             handler='get_artist_id.handler',
             function_name=get_artist_id_lambda_name,
             description=f'Queries the Spotify\'s API for the artist\'s ID.',
-            layers=[requests_layer],
+            layers=[common_layer],
+            environment={'CACHE_TABLE_NAME': cache_table.table_name},
             timeout=Duration.seconds(5),
         )
+        cache_table.grant_read_write_data(self.get_artist_id_lambda)
 
         # Grant read permissions to my Spotify client secrets
         __spotify_secrets = Secret.from_secret_name_v2(self, 'ImportedSpotifySecrets', secret_name='SpotifySecrets')
         __spotify_secrets.grant_read(self.get_access_token_lambda)
 
+        # Imported so the stream handler can both consume the table's stream and write to the table
+        artist_table = Table.from_table_attributes(
+            self,
+            f'MonitoredArtistTable-{account.stage.value.lower()}',
+            table_arn=artist_table_arn,
+            table_stream_arn=artist_table_stream_arn,
+        )
+
         get_latest_music_lambda_name = generate_name('GetLatestMusicLambda', account)
         _get_latest_music_lambda = Function(
             self,
             get_latest_music_lambda_name,
             runtime=Runtime.PYTHON_3_12,
-            code=Code.from_asset('src/lambdas/CoreSpotifyOperatorLambdas'),
+            code=handler_code('src/lambdas/CoreSpotifyOperatorLambdas', 'get_latest_music.handler'),
             handler='get_latest_music.handler',
             function_name=get_latest_music_lambda_name,
             description='Queries a series of Spotify API\'s for the artist\'s latest music.',
-            layers=[requests_layer],
+            layers=[common_layer],
             environment={
                 'GET_ACCESS_TOKEN_LAMBDA': self.get_access_token_lambda.function_name,
-                'UPDATE_TABLE_MUSIC_LAMBDA': update_table_music_lambda.function_name,
+                'ARTIST_TABLE_NAME': artist_table.table_name,
+                'CACHE_TABLE_NAME': cache_table.table_name,
+                # New artists only get a check schedule when the notifier runs on the adaptive schedule
+                'SCHEDULE_MODE': 'adaptive' if adaptive_schedule else 'weekly',
             },
-            timeout=Duration.seconds(10),
+            timeout=Duration.seconds(30),
         )
         self.get_access_token_lambda.grant_invoke(_get_latest_music_lambda)
+        cache_table.grant_read_write_data(_get_latest_music_lambda)
+        __spotify_secrets.grant_read(_get_latest_music_lambda)
+        artist_table.grant_write_data(_get_latest_music_lambda)
         _get_latest_music_lambda.add_event_source(
             DynamoEventSource(
-                table=Table.from_table_attributes(
-                    self,
-                    f'MonitoredArtistTable-{account.stage.value.lower()}',
-                    table_arn=artist_table_arn,
-                    table_stream_arn=artist_table_stream_arn,
-                ),
+                table=artist_table,
                 starting_position=StartingPosition.LATEST,
+                # Only new artists need their music fetched. The MODIFY records from our own writes never reach the Lambda
+                filters=[FilterCriteria.filter({'eventName': FilterRule.is_equal('INSERT')})],
+                batch_size=stream_batch_size,
+                max_batching_window=stream_max_batching_window,
+                parallelization_factor=stream_parallelization_factor,
                 retry_attempts=3,
                 bisect_batch_on_error=True,
+                report_batch_item_failures=True,
             )
         )
-        update_table_music_lambda.grant_invoke(_get_latest_music_lambda)
+
+        import_playlist_artists_lambda_name = generate_name('ImportPlaylistArtistsLambda', account)
+        self.import_playlist_artists_lambda = Function(
+            self,
+            import_playlist_artists_lambda_name,
+            runtime=Runtime.PYTHON_3_12,
+            code=handler_code('src/lambdas/CoreSpotifyOperatorLambdas', 'import_playlist_artists.handler'),
+            handler='import_playlist_artists.handler',
+            function_name=import_playlist_artists_lambda_name,
+            description='Imports every artist on a Spotify playlist into the monitored artists table.',
+            layers=[common_layer],
+            environment={
+                'ARTIST_TABLE_NAME': artist_table.table_name,
+                'CACHE_TABLE_NAME': cache_table.table_name,
+                'MAX_PLAYLIST_TRACKS': '5000',
+            },
+            # API Gateway gives up on the request after 29 seconds, so there is no point in running any longer
+            timeout=Duration.seconds(29),
+        )
+        artist_table.grant_read_write_data(self.import_playlist_artists_lambda)
+        cache_table.grant_read_write_data(self.import_playlist_artists_lambda)
+        __spotify_secrets.grant_read(self.import_playlist_artists_lambda)
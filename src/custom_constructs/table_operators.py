@@ -1,10 +1,12 @@
 from aws_cdk import Duration
 from aws_cdk.aws_dynamodb import TableV2
-from aws_cdk.aws_lambda import Code, Function, Runtime
+from aws_cdk.aws_lambda import FilterCriteria, FilterRule, Function, LayerVersion, Runtime, StartingPosition
+from aws_cdk.aws_lambda_event_sources import DynamoEventSource, SqsDlq
+from aws_cdk.aws_sqs import Queue
 from constructs import Construct
 
 from ..constants import AwsAccount
-from ..helpers.helpers import generate_name
+from ..helpers.helpers import generate_name, handler_code
 
 
 class CoreTableOperatorsConstruct(Construct):
@@ -27,10 +29,24 @@ class CoreTableOperatorsConstruct(Construct):
         return self.remove_artist_lambda_
 
     @property
-    def update_table_with_music_lambda(self) -> Function:
-        return self.update_table_with_music_lambda_
+    def add_artists_batch_lambda(self) -> Function:
+        return self.add_artists_batch_lambda_
 
-    def __init__(self, scope: Construct, id: str, account: AwsAccount, artist_table: TableV2, **kwargs) -> None:
+    @property
+    def remove_artists_batch_lambda(self) -> Function:
+        return self.remove_artists_batch_lambda_
+
+    def __init__(
+        self,
+        scope: Construct,
+        id: str,
+        account: AwsAccount,
+        artist_table: TableV2,
+        cache_table: TableV2,
+        common_layer: LayerVersion,
+        scan_total_segments: int = 1,
+        **kwargs,
+    ) -> None:
         super().__init__(scope, id, **kwargs)
 
         fetch_artist_lambda_name = generate_name('FetchArtistLambda', account)
@@ -38,22 +54,75 @@ class CoreTableOperatorsConstruct(Construct):
             self,
             fetch_artist_lambda_name,
             runtime=Runtime.PYTHON_3_12,
-            code=Code.from_asset('src/lambdas/CoreTableOperatorLambdas'),
+            code=handler_code('src/lambdas/CoreTableOperatorLambdas', 'list_artists.handler'),
             handler='list_artists.handler',
-            environment={'ARTIST_TABLE_NAME': artist_table.table_name},
+            layers=[common_layer],
+            environment={
+                'ARTIST_TABLE_NAME': artist_table.table_name,
+                'CACHE_TABLE_NAME': cache_table.table_name,
+                'SCAN_TOTAL_SEGMENTS': str(scan_total_segments),
+            },
             function_name=fetch_artist_lambda_name,
             description=f'Returns a list of all current artists being monitored in DynamoDB table: {artist_table.table_name}.',
             timeout=Duration.seconds(20),
         )
         artist_table.grant_read_data(self.fetch_artists_lambda_)
+        cache_table.grant_read_write_data(self.fetch_artists_lambda_)
+
+        sync_artist_snapshot_lambda_name = generate_name('SyncArtistSnapshotLambda', account)
+        _sync_artist_snapshot_lambda = Function(
+            self,
+            sync_artist_snapshot_lambda_name,
+            runtime=Runtime.PYTHON_3_12,
+            code=handler_code('src/lambdas/CoreTableOperatorLambdas', 'sync_artist_snapshot.handler'),
+            handler='sync_artist_snapshot.handler',
+            layers=[common_layer],
+            environment={
+                'ARTIST_TABLE_NAME': artist_table.table_name,
+                'CACHE_TABLE_NAME': cache_table.table_name,
+            },
+            function_name=sync_artist_snapshot_lambda_name,
+            description=f'Keeps the cached list of artists in step with the DynamoDB table: {artist_table.table_name}.',
+            timeout=Duration.seconds(30),
+        )
+        artist_table.grant_read_write_data(_sync_artist_snapshot_lambda)
+        cache_table.grant_read_write_data(_sync_artist_snapshot_lambda)
+        # Batches that still fail after every retry end up here. The snapshot is rebuilt from a scan once it is
+        # older than SNAPSHOT_MAX_AGE_SECONDS, so a lost batch only leaves it wrong until then
+        _sync_artist_snapshot_failures = Queue(
+            self,
+            'SyncArtistSnapshotFailureQueue',
+            queue_name=generate_name('SyncArtistSnapshotFailureQueue', account),
+            retention_period=Duration.days(14),
+        )
+        _sync_artist_snapshot_lambda.add_event_source(
+            DynamoEventSource(
+                table=artist_table,  # type: ignore
+                starting_position=StartingPosition.LATEST,
+                # Of the MODIFY records, only renames are needed. Music and schedule updates don't change the list
+                filters=[
+                    FilterCriteria.filter({'eventName': FilterRule.or_('INSERT', 'REMOVE')}),
+                    FilterCriteria.filter(
+                        {
+                            'eventName': FilterRule.is_equal('MODIFY'),
+                            'dynamodb': {'NewImage': {'name_changed': {'BOOL': [True]}}},
+                        }
+                    ),
+                ],
+                retry_attempts=5,
+                bisect_batch_on_error=True,
+                on_failure=SqsDlq(_sync_artist_snapshot_failures),
+            )
+        )
 
         add_artist_lambda_name = generate_name('AddArtistLambda', account)
         self.add_artist_lambda_ = Function(
             self,
             add_artist_lambda_name,
             runtime=Runtime.PYTHON_3_12,
-            code=Code.from_asset('src/lambdas/CoreTableOperatorLambdas'),
+            code=handler_code('src/lambdas/CoreTableOperatorLambdas', 'add_artist.handler'),
             handler='add_artist.handler',
+            layers=[common_layer],
             environment={'ARTIST_TABLE_NAME': artist_table.table_name},
             function_name=add_artist_lambda_name,
             description=f'Adds a new artist to the DynamoDB table: {artist_table.table_name}.',
@@ -66,8 +135,9 @@ class CoreTableOperatorsConstruct(Construct):
             self,
             remove_artist_lambda_name,
             runtime=Runtime.PYTHON_3_12,
-            code=Code.from_asset('src/lambdas/CoreTableOperatorLambdas'),
+            code=handler_code('src/lambdas/CoreTableOperatorLambdas', 'remove_artist.handler'),
             handler='remove_artist.handler',
+            layers=[common_layer],
             environment={'ARTIST_TABLE_NAME': artist_table.table_name},
             function_name=remove_artist_lambda_name,
             description=f'Removes an artist from the DynamoDB table: {artist_table.table_name}.',
@@ -75,16 +145,34 @@ class CoreTableOperatorsConstruct(Construct):
         )
         artist_table.grant_write_data(self.remove_artist_lambda_)
 
-        update_table_with_music_lambda_name = generate_name('UpdateTableWithMusicLambda', account)
-        self.update_table_with_music_lambda_ = Function(
+        add_artists_batch_lambda_name = generate_name('AddArtistsBatchLambda', account)
+        self.add_artists_batch_lambda_ = Function(
             self,
-            update_table_with_music_lambda_name,
+            add_artists_batch_lambda_name,
             runtime=Runtime.PYTHON_3_12,
-            code=Code.from_asset('src/lambdas/CoreTableOperatorLambdas'),
-            handler='update_table_music.handler',
+            code=handler_code('src/lambdas/CoreTableOperatorLambdas', 'add_artists_batch.handler'),
+            handler='add_artists_batch.handler',
+            layers=[common_layer],
             environment={'ARTIST_TABLE_NAME': artist_table.table_name},
-            function_name=update_table_with_music_lambda_name,
-            description=f'Once the latest musical release is pulled, this updates {artist_table.table_name}\'s artist attributes.',
-            timeout=Duration.seconds(20),
+            function_name=add_artists_batch_lambda_name,
+            description=f'Adds many new artists at once to the DynamoDB table: {artist_table.table_name}.',
+            # API Gateway gives up on the request after 29 seconds. `MAX_BATCH_ARTISTS` keeps the writes well within it
+            timeout=Duration.seconds(29),
+        )
+        artist_table.grant_read_write_data(self.add_artists_batch_lambda_)
+
+        remove_artists_batch_lambda_name = generate_name('RemoveArtistsBatchLambda', account)
+        self.remove_artists_batch_lambda_ = Function(
+            self,
+            remove_artists_batch_lambda_name,
+            runtime=Runtime.PYTHON_3_12,
+            code=handler_code('src/lambdas/CoreTableOperatorLambdas', 'remove_artists_batch.handler'),
+            handler='remove_artists_batch.handler',
+            layers=[common_layer],
+            environment={'ARTIST_TABLE_NAME': artist_table.table_name},
+            function_name=remove_artists_batch_lambda_name,
+            description=f'Removes many artists at once from the DynamoDB table: {artist_table.table_name}.',
+            # API Gateway gives up on the request after 29 seconds. `MAX_BATCH_ARTISTS` keeps the writes well within it
+            timeout=Duration.seconds(29),
         )
-        artist_table.grant_write_data(self.update_table_with_music_lambda_)
+        artist_table.grant_write_data(self.remove_artists_batch_lambda_)
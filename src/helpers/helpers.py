@@ -1,7 +1,27 @@
+import ast
+import compileall
+import hashlib
+import os
+import py_compile
+import shutil
+import sys
+import tempfile
+
 from aws_cdk import RemovalPolicy
+from aws_cdk.aws_lambda import Code
 
 from src.constants import AwsAccount, Stage
 
+# Bundles are cached here by content hash, so unchanged functions keep the same asset hash between deploys
+LAMBDA_BUNDLES_DIR: str = '.lambda_bundles'
+
+# Bytecode only loads on the Python version that compiled it, which has to match `Runtime.PYTHON_3_12`
+LAMBDA_PYTHON_VERSION: tuple[int, int] = (3, 12)
+
+# Never shipped in a bundle
+EXCLUDED_NAMES: set[str] = {'__pycache__', 'tests', 'test'}
+EXCLUDED_SUFFIXES: tuple[str, ...] = ('.pyc', '.pyo', '.dist-info', '.egg-info')
+
 
 def get_removal_policy(stage: Stage) -> RemovalPolicy:
     """
@@ -19,3 +39,104 @@ def generate_name(name: str, account: AwsAccount) -> str:
     account.
     """
     return f'{name}-{account.stage.value.lower()}'
+
+
+def handler_code(lambdas_dir: str, handler: str) -> Code:
+    """
+    Packages a Lambda handler with only the modules from `lambdas_dir` that it
+    (transitively) imports, rather than the whole directory. Editing one handler
+    then only changes the asset hash, and redeploys, the functions that use it.
+    """
+
+    module_name: str = handler.split('.')[0]
+    modules: list[str] = find_local_imports(lambdas_dir, module_name)
+    return Code.from_asset(bundle_files(lambdas_dir, [f'{module}.py' for module in modules]))
+
+
+def layer_code(layer_dir: str) -> Code:
+    """
+    Packages a Lambda layer without tests, package metadata (`.dist-info`) or
+    stale bytecode, precompiled like the handler bundles.
+    """
+
+    relative_paths: list[str] = []
+    for dir_path, dir_names, file_names in os.walk(layer_dir):
+        dir_names[:] = sorted(name for name in dir_names if not is_excluded(name))
+        relative_paths.extend(
+            os.path.relpath(os.path.join(dir_path, name), layer_dir) for name in sorted(file_names) if not is_excluded(name)
+        )
+    return Code.from_asset(bundle_files(layer_dir, relative_paths))
+
+
+def find_local_imports(lambdas_dir: str, module_name: str) -> list[str]:
+    """
+    Walks the import statements of `module_name` and every sibling module it
+    imports from `lambdas_dir`. Returns the module itself and those siblings.
+    """
+
+    modules: list[str] = []
+    pending: list[str] = [module_name]
+    while pending:
+        module: str = pending.pop()
+        if module in modules:
+            continue
+        modules.append(module)
+
+        with open(os.path.join(lambdas_dir, f'{module}.py')) as source:
+            tree = ast.parse(source.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                imported: list[str] = [alias.name.split('.')[0] for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                imported = [node.module.split('.')[0]]
+            else:
+                continue
+            pending.extend(name for name in imported if os.path.isfile(os.path.join(lambdas_dir, f'{name}.py')))
+
+    return sorted(modules)
+
+
+def bundle_files(source_dir: str, relative_paths: list[str]) -> str:
+    """
+    Copies the files into a bundle directory named after the hash of their
+    contents, and precompiles them when synthesizing on the Lambda's Python
+    version. A bundle that already exists is reused as is.
+    """
+
+    precompile: bool = sys.version_info[:2] == LAMBDA_PYTHON_VERSION
+    digest = hashlib.sha256(f'precompile={precompile}'.encode())
+    for relative_path in sorted(relative_paths):
+        digest.update(relative_path.encode())
+        with open(os.path.join(source_dir, relative_path), 'rb') as source:
+            digest.update(hashlib.sha256(source.read()).digest())
+
+    bundle_dir: str = os.path.join(LAMBDA_BUNDLES_DIR, digest.hexdigest()[:32])
+    if os.path.isdir(bundle_dir):
+        return bundle_dir
+
+    os.makedirs(LAMBDA_BUNDLES_DIR, exist_ok=True)
+    staging_dir: str = tempfile.mkdtemp(dir=LAMBDA_BUNDLES_DIR)
+    for relative_path in relative_paths:
+        os.makedirs(os.path.join(staging_dir, os.path.dirname(relative_path)), exist_ok=True)
+        shutil.copyfile(os.path.join(source_dir, relative_path), os.path.join(staging_dir, relative_path))
+
+    if precompile:
+        # Hash based bytecode isn't checked against the source's timestamp, so the bundle stays byte for byte
+        # reproducible. Unchecked is safe, as a bundle is never edited after it is built
+        compileall.compile_dir(
+            staging_dir,
+            quiet=1,
+            optimize=0,
+            invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+        )
+
+    try:
+        os.rename(staging_dir, bundle_dir)
+    except OSError:
+        # Another synth built the same bundle first
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    return bundle_dir
+
+
+def is_excluded(name: str) -> bool:
+    return name in EXCLUDED_NAMES or name.endswith(EXCLUDED_SUFFIXES) or (name.startswith('test_') and name.endswith('.py'))
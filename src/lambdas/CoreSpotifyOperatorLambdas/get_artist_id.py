@@ -1,16 +1,42 @@
 import json
 import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
 
-import requests
-from requests.exceptions import HTTPError
+from botocore.exceptions import ClientError
+from spotificity_common.clients import get_client
+from spotificity_common.http_client import HTTPError
+from spotificity_common.metrics import emit_metrics
+from spotificity_common.spotify_client import get_spotify_client
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
+# DynamoDB table that shares search results between containers. Unset means in-memory caching only
+CACHE_TABLE_NAME: str | None = os.getenv('CACHE_TABLE_NAME')
+
+# How long search results are trusted before Spotify is asked again
+SEARCH_CACHE_TTL_SECONDS: int = int(os.getenv('SEARCH_CACHE_TTL_SECONDS', '86400'))
+
+# Most search results a warm container keeps in memory
+SEARCH_CACHE_MAX_ENTRIES: int = int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', '512'))
+
+# Warm containers keep recent search results in memory, least recently used first
+_search_cache: OrderedDict[str, tuple[float, list]] = OrderedDict()
+_search_cache_lock = threading.Lock()
+
+# Searches currently being sent to Spotify, so identical concurrent lookups share one request
+_in_flight_searches: dict[str, Future] = {}
+
 
 def handler(event: dict, context) -> dict:
     """
     Queries the Spotify `Search` API for the artist's Spotify ID.
+    Results are cached in memory and in the cache table, keyed on the normalized
+    artist name and market.
     """
 
     log.debug(f'Received event: {event}')
@@ -18,33 +44,174 @@ def handler(event: dict, context) -> dict:
     payload: dict = json.loads(event['body'])
     artist_name: str = payload['artist_name']
     access_token: str = payload['access_token']
-    endpoint: str = 'https://api.spotify.com/v1/search'
+    market: str = payload.get('market', 'US')
 
     try:
-        log.info('Initiating GET request for artist ID...')
-
-        response = requests.get(
-            url=endpoint,
-            params={'q': artist_name, 'type': 'artist', 'limit': 5, 'offset': 0, 'market': 'US'},
-            headers={'Authorization': f'Bearer {access_token}'},
-        )
-        response.raise_for_status()
+        artist_search_results: list = search_artist(artist_name, market, access_token)
     except HTTPError as err:
         log.error(f'HTTP Error occurred: {err}')
         log.warning(f'Unsuccessful retrieval from Spotify `Search` API. Returning error to client.')
+        # No response means Spotify kept failing until the retries ran out
         return {
-            'statusCode': err.response.status_code,
+            'statusCode': err.response.status_code if err.response is not None else 502,
             'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({'error': err.response.text, 'error_type': 'HTTP'}),
+            'body': json.dumps({'error': err.response.text if err.response is not None else str(err), 'error_type': 'HTTP'}),
         }
     else:
-        log.info(f'Successfully received response from Spotify `Search` API. HTTP Status code: {response.status_code}')
-        log.debug(f'Returned Payload: {response.json()}')
-        artist_search_results: dict = response.json()
-
         log.info('Successfully retrieved list of artists with their respective Spotify IDs. Returning list to client.')
         return {
             'statusCode': 200,
             'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps({'artistSearchResultsList': artist_search_results['artists']['items']}),
+            'body': json.dumps({'artistSearchResultsList': artist_search_results}),
         }
+
+
+def search_artist(artist_name: str, market: str, access_token: str) -> list:
+    """
+    Returns the artist search results, checking the in-memory cache first, then
+    the cache table, and only then Spotify.
+    """
+
+    cache_key: str = f'search#{market}#{normalize_query(artist_name)}'
+
+    cached_results: list | None = read_memory_cache(cache_key)
+    if cached_results is not None:
+        log.info('Using artist search results cached in memory.')
+        emit_metrics({'ArtistSearchMemoryHit': 1})
+        return cached_results
+
+    # Only the first of several identical concurrent lookups does the work. The rest wait on its result
+    with _search_cache_lock:
+        search: Future | None = _in_flight_searches.get(cache_key)
+        is_owner: bool = search is None
+        if is_owner:
+            search = _in_flight_searches[cache_key] = Future()
+
+    if not is_owner:
+        log.info('Identical search already in flight. Waiting for its results...')
+        emit_metrics({'ArtistSearchCoalesced': 1})
+        return search.result()
+
+    try:
+        results: list = read_shared_cache(cache_key)
+        if results is not None:
+            log.info('Using artist search results shared through the cache table.')
+            emit_metrics({'ArtistSearchTableHit': 1})
+        else:
+            emit_metrics({'ArtistSearchMiss': 1})
+            results = request_artist_search(artist_name, market, access_token)
+            write_shared_cache(cache_key, results)
+
+        write_memory_cache(cache_key, results)
+        search.set_result(results)
+        return results
+    except Exception as err:
+        search.set_exception(err)
+        raise
+    finally:
+        with _search_cache_lock:
+            _in_flight_searches.pop(cache_key, None)
+
+
+def normalize_query(artist_name: str) -> str:
+    """
+    Folds case and collapses whitespace, so "  The  Weeknd" and "the weeknd"
+    share a cache entry.
+    """
+
+    return ' '.join(artist_name.casefold().split())
+
+
+def read_memory_cache(cache_key: str) -> list | None:
+    """
+    Returns unexpired search results held in memory, marking them as recently used.
+    """
+
+    with _search_cache_lock:
+        cached_entry = _search_cache.get(cache_key)
+        if cached_entry is None:
+            return None
+        if time.time() >= cached_entry[0]:
+            del _search_cache[cache_key]
+            return None
+
+        _search_cache.move_to_end(cache_key)
+        return cached_entry[1]
+
+
+def write_memory_cache(cache_key: str, results: list) -> None:
+    """
+    Holds search results in memory, evicting the least recently used ones once full.
+    """
+
+    with _search_cache_lock:
+        _search_cache[cache_key] = (time.time() + SEARCH_CACHE_TTL_SECONDS, results)
+        _search_cache.move_to_end(cache_key)
+        while len(_search_cache) > SEARCH_CACHE_MAX_ENTRIES:
+            _search_cache.popitem(last=False)
+
+
+def read_shared_cache(cache_key: str) -> list | None:
+    """
+    Reads search results from the cache table. Returns None if there is no
+    table, no unexpired entry, or the read fails.
+    """
+
+    if not CACHE_TABLE_NAME:
+        return None
+
+    try:
+        ddb = get_client('dynamodb')
+        response = ddb.get_item(TableName=CACHE_TABLE_NAME, Key={'cache_key': {'S': cache_key}})
+    except ClientError as err:
+        log.warning(f'Could not read the shared search results: {err.response["Error"]["Message"]}')
+        return None
+
+    item: dict | None = response.get('Item')
+
+    # TTL deletes aren't immediate, so expired items can still be read for a while
+    if not item or int(item['expires_at']['N']) <= time.time():
+        return None
+    return json.loads(item['results']['S'])
+
+
+def write_shared_cache(cache_key: str, results: list) -> None:
+    """
+    Shares search results through the cache table. `expires_at` doubles as the
+    table's TTL attribute, so stale results clean themselves up.
+    """
+
+    if not CACHE_TABLE_NAME:
+        return
+
+    try:
+        ddb = get_client('dynamodb')
+        ddb.put_item(
+            TableName=CACHE_TABLE_NAME,
+            Item={
+                'cache_key': {'S': cache_key},
+                'results': {'S': json.dumps(results)},
+                'expires_at': {'N': str(int(time.time()) + SEARCH_CACHE_TTL_SECONDS)},
+            },
+        )
+    except ClientError as err:
+        log.warning(f'Could not share the search results: {err.response["Error"]["Message"]}')
+
+
+def request_artist_search(artist_name: str, market: str, access_token: str) -> list:
+    """
+    Sends GET request to the Spotify `Search` API and returns the matching artists.
+    """
+
+    endpoint: str = 'https://api.spotify.com/v1/search'
+    log.info('Initiating GET request for artist ID...')
+
+    response = get_spotify_client().get(
+        endpoint,
+        access_token,
+        params={'q': artist_name, 'type': 'artist', 'limit': 5, 'offset': 0, 'market': market},
+    )
+
+    log.info(f'Successfully received response from Spotify `Search` API. HTTP Status code: {response.status_code}')
+    log.debug(f'Returned Payload: {response.json()}')
+    return response.json()['artists']['items']
@@ -1,83 +1,112 @@
 import json
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-import boto3
-import requests
 from botocore.exceptions import ClientError
-from requests.exceptions import HTTPError
+from spotificity_common.artist_table import update_artist_music
+from spotificity_common.check_schedule import schedule_from_release_dates, set_check_schedule
+from spotificity_common.clients import get_client
+from spotificity_common.releases import get_latest_releases
+from spotificity_common.token_provider import get_access_token
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
+# Upper bound on how many new artists from one stream batch are processed at the same time
+MAX_CONCURRENT_REQUESTS: int = int(os.getenv('MAX_CONCURRENT_REQUESTS', '10'))
+
+# Check schedules are only kept on the `adaptive` schedule. The `weekly` notifier checks every artist
+SCHEDULE_MODE: str = os.getenv('SCHEDULE_MODE', 'weekly')
+
 
 def handler(event: dict, context) -> dict:
     """
     Queries a couple of Spotify's APIs to return back the latest musical releases
-    for the artist.
+    for every artist inserted in the stream batch, and writes them to the table.
+    Records that fail are reported back so only they get retried.
     """
 
     log.debug(f'Passed in event: {event}')
 
     # If no INSERT event in batch of records, don't continue execution.
-    if not any(record['eventName'] == 'INSERT' for record in event['Records']):
+    insert_records: list[dict] = [record for record in event['Records'] if record['eventName'] == 'INSERT']
+    if not insert_records:
         log.info('No INSERT events in batch of records. Exiting.')
-        return {}
+        return {'batchItemFailures': []}
 
-    # If access token is passed in, use it. Otherwise, invoke Lambda that will return one.
+    # If access token is passed in, use it. Otherwise, get one from the shared token provider.
     try:
         access_token: str = event['access_token']
         log.info('Access token passed in. Using it. :D')
     except KeyError:
         log.warning('Access token not passed in. Fetching new one.')
-        access_token = request_token()
-
-    # Keeps track of how many artists have been processed from the stream batch
-    # This is me over-engineering for when I have the ability to add multiple artists at once
-    artists_processed: int = 0
-
-    # Iterate through DynamoDB records to get artist_id and artist_name for each record.
-    # For each record, invoke Lambda function that will update the DynamoDB table.
-    for record in event['Records']:
-        if record['eventName'] == 'INSERT':
-            artist_id: str = record['dynamodb']['NewImage']['artist_id']['S']
-            artist_name: str = record['dynamodb']['NewImage']['artist_name']['S']
-
-            # Get latest musical releases
-            last_album_details: dict = get_latest_album(artist_id, artist_name, access_token)
-            last_single_details: dict = get_latest_single(artist_id, artist_name, access_token)
-
-            # Update DynamoDB with latest musical releases
-            try:
-                lambda_name = os.getenv('UPDATE_TABLE_MUSIC_LAMBDA')
-                lambda_ = boto3.client('lambda')
-                log.debug(f'Invoking Lambda that will update the DynamoDB table... (Lambda Name: {lambda_name})')
-
-                response: dict = lambda_.invoke(
-                    FunctionName=lambda_name,
-                    InvocationType='RequestResponse',
-                    Payload=json.dumps(
-                        {
-                            'artist_id': artist_id,
-                            'artist_name': artist_name,
-                            'last_album_details': last_album_details,
-                            'last_single_details': last_single_details,
-                        }
-                    ),
-                )
-            except ClientError as err:
-                log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
-                log.error(f'Client Error Code: {err.response["Error"]["Code"]}')
-                raise
-            else:
-                log.info(f'Successfully invoked {lambda_name} to update the DynamoDB table.')
-                returned_json: dict = json.load(response['Payload'])
-
-                log.debug(f'Returned payload: {returned_json}')
-                artists_processed += 1
-
-                return {'artists_processed': artists_processed}
-    return {}
+        access_token = fetch_access_token()
+
+    # Fetch and store the latest music of every new artist at once rather than one after another
+    log.info(f'Processing {len(insert_records)} new artists ({MAX_CONCURRENT_REQUESTS} max in flight)...')
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENT_REQUESTS, len(insert_records)))) as executor:
+        succeeded: list[bool] = list(executor.map(lambda record: process_record(record, access_token), insert_records))
+
+    batch_item_failures: list[dict] = [
+        {'itemIdentifier': record['dynamodb']['SequenceNumber']}
+        for record, record_succeeded in zip(insert_records, succeeded)
+        if not record_succeeded
+    ]
+    log.info(f'Processed {succeeded.count(True)} out of {len(insert_records)} new artists.')
+    return {'artists_processed': succeeded.count(True), 'batchItemFailures': batch_item_failures}
+
+
+def process_record(record: dict, access_token: str) -> bool:
+    """
+    Fetches the latest musical releases of the inserted artist and writes them
+    to the table. Returns False instead of raising, so one failed artist doesn't
+    fail the rest of the batch.
+    """
+
+    artist_id: str = record['dynamodb']['NewImage']['artist_id']['S']
+    artist_name: str = record['dynamodb']['NewImage']['artist_name']['S']
+
+    try:
+        # Get latest musical releases
+        last_album_details, last_single_details = get_latest_releases(artist_id, artist_name, access_token)
+
+        # Update DynamoDB with latest musical releases
+        table = os.getenv('ARTIST_TABLE_NAME')
+        log.info(f'Initiating PUT request to update {table} with {artist_name}\'s latest releases...')
+        update_artist_music(table, artist_id, {'album': last_album_details, 'single': last_single_details})
+
+        # Schedule the first check, so the adaptive notifier picks up the new artist too
+        if SCHEDULE_MODE == 'adaptive':
+            next_check, cadence_days = schedule_from_release_dates(
+                [last_album_details['last_album_release_date'], last_single_details['last_single_release_date']]
+            )
+            set_check_schedule(table, artist_id, next_check, cadence_days)
+    except ClientError as err:
+        log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
+        log.error(f'Client Error Code: {err.response["Error"]["Code"]}')
+        return False
+    except Exception as err:
+        log.error(f'Failed to process {artist_name}: {err}')
+        return False
+
+    log.info(f'Successfully stored {artist_name}\'s latest releases.')
+    return True
+
+
+def fetch_access_token() -> str:
+    """
+    Gets an access token in-process from the token provider in the common layer.
+    Only if that fails, and a token Lambda is configured, fall back to invoking it.
+    """
+
+    try:
+        return get_access_token()
+    except Exception as err:
+        if not os.getenv('GET_ACCESS_TOKEN_LAMBDA'):
+            raise
+        log.warning(f'Token provider failed ({err}). Falling back to the access token Lambda...')
+        return request_token()
 
 
 def request_token() -> str:
@@ -91,7 +120,7 @@ def request_token() -> str:
     try:
         log.debug(f'Invoking Lambda that will request an access token from Spotify... (Lambda Name: {lambda_name})')
 
-        lambda_ = boto3.client('lambda')
+        lambda_ = get_client('lambda')
         response: dict = lambda_.invoke(FunctionName=lambda_name, InvocationType='RequestResponse')
     except ClientError as err:
         log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
@@ -109,98 +138,6 @@ def request_token() -> str:
             return returned_json['access_token']
 
 
-def get_latest_album(artist_id: str, artist_name: str, access_token: str) -> dict:
-    """
-    Queries the Spotify API to return the last album released by the
-    artist.
-    """
-
-    endpoint: str = f'https://api.spotify.com/v1/artists/{artist_id}/albums'
-
-    try:
-        log.info(f'Initiating GET request for the {artist_name}\'s last album...')
-        response = requests.get(
-            url=endpoint,
-            params={'limit': 1, 'offset': 0, 'include_groups': 'album', 'market': 'US'},
-            headers={'Authorization': f'Bearer {access_token}'},
-        )
-        response.raise_for_status()
-    except HTTPError as err:
-        log.error(f'HTTP Error occurred: {err}')
-        raise
-    else:
-        log.debug(f'Returned payload: {response.json()}')
-        log.debug('Parsing returned payload...')
-        album_search_results: dict = response.json()
-
-        # Catch any errors that may occur when searching for the last album
-        if album_search_results.get('error'):
-            log.error(f'Error occurred: {album_search_results["error"]}')
-            raise Exception(f'Error occurred: {album_search_results["error"]}')
-        elif len(album_search_results['items']) == 0:
-            log.warning(f'No albums found for {artist_name}. Returning empty details.')
-            return {'last_album_name': '', 'last_album_release_date': '', 'last_album_artists': []}
-
-        # Extract out the last album's details
-        last_album: dict = album_search_results['items'][0]
-        last_album_artists: list[str] = [artist['name'] for artist in last_album['artists']]
-
-        log.info('Successfully retrieved last album details.')
-        return {
-            'last_album_name': last_album['name'],
-            'last_album_release_date': last_album['release_date'],
-            'last_album_artists': last_album_artists,
-        }
-
-
-def get_latest_single(artist_id: str, artist_name: str, access_token: str) -> dict:
-    """
-    Queries the Spotify API to return the last single released by the
-    artist.
-    """
-
-    endpoint: str = f'https://api.spotify.com/v1/artists/{artist_id}/albums'
-
-    try:
-        log.info(f'Initiating GET request for the {artist_name}\'s last single...')
-        response = requests.get(
-            url=endpoint,
-            params={'limit': 1, 'offset': 0, 'include_groups': 'single', 'market': 'US'},
-            headers={'Authorization': f'Bearer {access_token}'},
-        )
-        response.raise_for_status()
-    except HTTPError as err:
-        log.error(f'HTTP Error occurred: {err}')
-        raise
-    else:
-        log.debug(f'Returned payload: {response.json()}')
-        log.debug('Parsing returned payload...')
-        single_search_results: dict = response.json()
-
-        # Catch any errors that may occur when searching for the last single
-        if single_search_results.get('error'):
-            log.error(f'Error occurred: {single_search_results["error"]}')
-            raise Exception(f'Error occurred: {single_search_results["error"]}')
-        elif len(single_search_results['items']) == 0:
-            log.warning(f'No singles found for {artist_name}. Returning empty details.')
-            return {
-                'last_single_name': '',
-                'last_single_release_date': '',
-                'last_single_artists': [],
-            }
-
-        # Extract out the last single's details
-        last_single: dict = single_search_results['items'][0]
-        last_single_artists: list[str] = [artist['name'] for artist in last_single['artists']]
-
-        log.info('Successfully retrieved last single details.')
-        return {
-            'last_single_name': last_single['name'],
-            'last_single_release_date': last_single['release_date'],
-            'last_single_artists': last_single_artists,
-        }
-
-
 """
 Unfortunately it turns out Spotify does not have a way to filter by songs the artist is featured on.
 Until then, this will be commented out. 
@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+from spotificity_common.artist_table import batch_get_artists, put_new_artists
+from spotificity_common.http_client import HTTPError, RequestException
+from spotificity_common.spotify_client import get_spotify_client
+from spotificity_common.token_provider import get_access_token
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+# Spotify caps the page size of the playlist items API at 100
+PLAYLIST_PAGE_LIMIT: int = 100
+
+# Only ask Spotify for the fields we need, which keeps every page small
+PLAYLIST_PAGE_FIELDS: str = 'total,items(track(artists(id,name)))'
+
+# Upper bound on how many playlist pages are fetched at the same time
+MAX_CONCURRENT_REQUESTS: int = int(os.getenv('MAX_CONCURRENT_REQUESTS', '10'))
+
+# Largest playlist that can be imported within API Gateway's 29 second integration timeout
+MAX_PLAYLIST_TRACKS: int = int(os.getenv('MAX_PLAYLIST_TRACKS', '5000'))
+
+
+def handler(event: dict, context) -> dict:
+    """
+    Imports every artist on a Spotify playlist into the "Monitored Artists"
+    DynamoDB table. Artists that are already being monitored are skipped.
+    """
+
+    log.debug(f'Received event: {event}')
+    log.info(f'Passed in payload: {event["body"]}')
+    payload: dict = json.loads(event['body'])
+    playlist_id: str | None = payload.get('playlist_id')
+
+    if not playlist_id:
+        log.warning('No playlist ID passed in. Returning error message to client.')
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': 'Expected a "playlist_id".', 'error_type': 'Validation'}),
+        }
+
+    # If access token is passed in, use it. Otherwise, get one from the shared token provider.
+    try:
+        access_token: str = payload.get('access_token') or get_access_token()
+    except ClientError as err:
+        log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
+        log.error(f'Client Error Code: {err.response["Error"]["Code"]}')
+        log.warning('Unable to read the Spotify secrets to get an access token. Returning error to client.')
+        return {
+            'statusCode': 502,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': err.response['Error'], 'error_type': 'Client'}),
+        }
+    except RequestException as err:
+        log.error(f'Request Error occurred: {err}')
+        log.warning('Unable to get an access token from Spotify. Returning error to client.')
+        return {
+            'statusCode': 502,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': str(err), 'error_type': 'HTTP'}),
+        }
+
+    try:
+        log.info(f'Collecting the artists on playlist {playlist_id}...')
+        first_page: dict = get_playlist_page(playlist_id, access_token, 0)
+
+        if first_page['total'] > MAX_PLAYLIST_TRACKS:
+            log.warning(f'Playlist {playlist_id} has {first_page["total"]} tracks. Returning error message to client.')
+            return {
+                'statusCode': 413,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps(
+                    {'error': f'Playlists of over {MAX_PLAYLIST_TRACKS} tracks cannot be imported.', 'error_type': 'Validation'}
+                ),
+            }
+
+        # Dedupe as the pages come in, so only one entry per artist is ever held in memory
+        playlist_artists: dict[str, str] = {}
+        for page in get_playlist_pages(playlist_id, access_token, first_page):
+            for item in page['items']:
+                for artist in (item.get('track') or {}).get('artists', []):
+                    # Local files have artists without a Spotify ID
+                    if artist.get('id'):
+                        playlist_artists.setdefault(artist['id'], artist['name'])
+    except HTTPError as err:
+        log.error(f'HTTP Error occurred: {err}')
+        log.warning('Unsuccessful retrieval from Spotify `Playlist Items` API. Returning error to client.')
+        # No response means Spotify kept failing until the retries ran out
+        return {
+            'statusCode': err.response.status_code if err.response is not None else 502,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': err.response.text if err.response is not None else str(err), 'error_type': 'HTTP'}),
+        }
+
+    try:
+        table = os.getenv('ARTIST_TABLE_NAME')
+        log.info(f'Found {len(playlist_artists)} artists on the playlist. Importing the new ones into {table}...')
+
+        already_monitored: set[str] = set(batch_get_artists(table, list(playlist_artists)))
+        new_artists: list[dict] = [
+            {'artist_id': artist_id, 'artist_name': artist_name}
+            for artist_id, artist_name in playlist_artists.items()
+            if artist_id not in already_monitored
+        ]
+        added_since, failures = put_new_artists(table, new_artists, MAX_CONCURRENT_REQUESTS)
+        already_monitored |= added_since
+    except ClientError as err:
+        log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
+        log.error(f'Client Error Code: {err.response["Error"]["Code"]}')
+        log.warning('Error occurred while trying to import artists. Returning error message to client.')
+        return {
+            'statusCode': err.response['ResponseMetadata']['HTTPStatusCode'],
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': err.response['Error'], 'error_type': 'Client'}),
+        }
+
+    imported_artists: list[dict] = [
+        artist for artist in new_artists if artist['artist_id'] not in failures and artist['artist_id'] not in added_since
+    ]
+    log.info(f'Import complete. Now monitoring {len(imported_artists)} more artists. Returning payload to client.')
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps(
+            {
+                'imported': imported_artists,
+                'already_monitored': len(already_monitored),
+                'failed': [{'artist_id': artist_id, 'error': error} for artist_id, error in failures.items()],
+            }
+        ),
+    }
+
+
+def get_playlist_pages(playlist_id: str, access_token: str, first_page: dict) -> Iterator[dict]:
+    """
+    Yields every page of the playlist's items. The first page tells us how many
+    items there are, so the remaining pages are then fetched concurrently and
+    yielded in order as they arrive.
+    """
+
+    yield first_page
+
+    offsets = range(PLAYLIST_PAGE_LIMIT, first_page['total'], PLAYLIST_PAGE_LIMIT)
+    if not offsets:
+        return
+
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENT_REQUESTS, len(offsets)))) as executor:
+        yield from executor.map(lambda offset: get_playlist_page(playlist_id, access_token, offset), offsets)
+
+
+def get_playlist_page(playlist_id: str, access_token: str, offset: int) -> dict:
+    """
+    Queries the Spotify `Playlist Items` API for one page of the playlist's tracks.
+    """
+
+    log.debug(f'Initiating GET request for tracks {offset} to {offset + PLAYLIST_PAGE_LIMIT} of playlist {playlist_id}...')
+    response = get_spotify_client().get(
+        f'https://api.spotify.com/v1/playlists/{playlist_id}/tracks',
+        access_token,
+        params={'fields': PLAYLIST_PAGE_FIELDS, 'limit': PLAYLIST_PAGE_LIMIT, 'offset': offset, 'market': 'US'},
+    )
+    return response.json()
@@ -2,8 +2,8 @@ import json
 import logging
 import os
 
-import boto3
 from botocore.exceptions import ClientError
+from spotificity_common.clients import get_client
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
@@ -21,15 +21,11 @@ def handler(event: dict, context) -> dict:
     artist_id: str = payload['artist_id']
 
     try:
-        ddb = boto3.client('dynamodb')
+        ddb = get_client('dynamodb')
         table = os.getenv('ARTIST_TABLE_NAME')
         log.info(f'Attempting to add {artist_name} to {table}...')
 
-        response = ddb.put_item(
-            TableName=table,
-            Item={'artist_id': {'S': artist_id}, 'artist_name': {'S': artist_name}},
-            ReturnConsumedCapacity='TOTAL',
-        )
+        response = put_artist(ddb, table, artist_id, artist_name)
     except ClientError as err:
         log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
         log.error(f'Client Error Code: {err.response["Error"]["Code"]}')
@@ -47,3 +43,39 @@ def handler(event: dict, context) -> dict:
             'headers': {'Content-Type': 'application/json'},
             'body': json.dumps({'returned_response_from_put': response}),
         }
+
+
+def put_artist(ddb, table: str, artist_id: str, artist_name: str) -> dict:
+    """
+    Inserts the artist. An artist that is already monitored keeps its music and
+    schedule, and only a changed name is written. Renames are flagged with
+    `name_changed`, which is the only kind of MODIFY record the artist list
+    snapshot consumer is sent.
+    """
+
+    try:
+        return ddb.put_item(
+            TableName=table,
+            Item={'artist_id': {'S': artist_id}, 'artist_name': {'S': artist_name}},
+            ConditionExpression='attribute_not_exists(artist_id)',
+            ReturnConsumedCapacity='TOTAL',
+        )
+    except ClientError as err:
+        if err.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+    try:
+        log.info(f'{artist_name} is already being monitored. Updating its name...')
+        return ddb.update_item(
+            TableName=table,
+            Key={'artist_id': {'S': artist_id}},
+            UpdateExpression='SET artist_name = :artist_name, name_changed = :name_changed',
+            ConditionExpression='artist_name <> :artist_name',
+            ExpressionAttributeValues={':artist_name': {'S': artist_name}, ':name_changed': {'BOOL': True}},
+            ReturnConsumedCapacity='TOTAL',
+        )
+    except ClientError as err:
+        if err.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        log.info(f'{artist_name} is already being monitored under this name. Nothing to write.')
+        return {}
@@ -0,0 +1,98 @@
+import json
+import logging
+import os
+
+from botocore.exceptions import ClientError
+from spotificity_common.artist_table import batch_get_artists, put_new_artists
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+# Most artists accepted in a single request. Keeps the writes well within API Gateway's 29 second timeout
+MAX_BATCH_ARTISTS: int = int(os.getenv('MAX_BATCH_ARTISTS', '1000'))
+
+# Upper bound on how many `PutItem` requests are in flight at the same time
+MAX_CONCURRENT_WRITES: int = int(os.getenv('MAX_CONCURRENT_REQUESTS', '10'))
+
+
+def handler(event: dict, context) -> dict:
+    """
+    Adds many artists to the "Monitored Artists" DynamoDB table in one request.
+    Artists that are already being monitored are left untouched so their stored
+    music isn't wiped. Returns the result for each artist.
+    """
+
+    log.debug(f'Received event: {event}')
+    payload: dict = json.loads(event['body'])
+    artists: list[dict] = payload.get('artists', [])
+
+    error: str | None = validate_artists(artists)
+    if error:
+        log.warning(f'Invalid payload: {error}. Returning error message to client.')
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': error, 'error_type': 'Validation'}),
+        }
+
+    # The last entry wins if the same artist is passed in more than once
+    artists_by_id: dict[str, dict] = {
+        artist['artist_id']: {'artist_id': artist['artist_id'], 'artist_name': artist['artist_name']} for artist in artists
+    }
+
+    try:
+        table = os.getenv('ARTIST_TABLE_NAME')
+        log.info(f'Attempting to add {len(artists_by_id)} artists to {table}...')
+
+        # Most artists that are already monitored are filtered out in bulk. The conditional puts catch the ones added since
+        already_monitored: set[str] = set(batch_get_artists(table, list(artists_by_id)))
+        new_artists: list[dict] = [artist for artist_id, artist in artists_by_id.items() if artist_id not in already_monitored]
+        added_since, failures = put_new_artists(table, new_artists, MAX_CONCURRENT_WRITES)
+        already_monitored |= added_since
+    except ClientError as err:
+        log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
+        log.error(f'Client Error Code: {err.response["Error"]["Code"]}')
+        log.warning('Error occurred while trying to add artists. Returning error message to client.')
+        return {
+            'statusCode': err.response['ResponseMetadata']['HTTPStatusCode'],
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': err.response['Error'], 'error_type': 'Client'}),
+        }
+
+    results: list[dict] = []
+    for artist_id, artist in artists_by_id.items():
+        if artist_id in already_monitored:
+            results.append({**artist, 'status': 'already_monitored'})
+        elif artist_id in failures:
+            results.append({**artist, 'status': 'failed', 'error': failures[artist_id]})
+        else:
+            results.append({**artist, 'status': 'added'})
+
+    added_count: int = len(new_artists) - len(added_since) - len(failures)
+    log.info(f'Batch PUT request complete. Now monitoring {added_count} more artists. Returning payload to client.')
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps(
+            {
+                'added': added_count,
+                'already_monitored': len(already_monitored),
+                'failed': len(failures),
+                'results': results,
+            }
+        ),
+    }
+
+
+def validate_artists(artists: list[dict]) -> str | None:
+    """
+    Returns why the passed in list of artists can't be added, or None if it can.
+    """
+
+    if not isinstance(artists, list) or not artists:
+        return 'Expected a non-empty "artists" list.'
+    if len(artists) > MAX_BATCH_ARTISTS:
+        return f'At most {MAX_BATCH_ARTISTS} artists can be added per request.'
+    if any(not isinstance(artist, dict) or not artist.get('artist_id') or not artist.get('artist_name') for artist in artists):
+        return 'Every artist needs an "artist_id" and an "artist_name".'
+    return None
@@ -1,25 +1,40 @@
+import base64
+import binascii
 import json
 import logging
 import os
+import time
 
-import boto3
 from botocore.exceptions import ClientError
+from spotificity_common.artist_snapshot import read_snapshot, write_snapshot
+from spotificity_common.artist_table import scan_artists, scan_artists_page
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
+# Number of parallel segments to scan the artist table with
+SCAN_TOTAL_SEGMENTS: int = int(os.getenv('SCAN_TOTAL_SEGMENTS', '1'))
+
+# Page size bounds for paginated requests
+DEFAULT_PAGE_LIMIT: int = 100
+MAX_PAGE_LIMIT: int = 1000
+
+# Attributes a client may ask for with the `fields` query parameter
+SELECTABLE_FIELDS: tuple[str, ...] = ('artist_id', 'artist_name', 'last_album_details', 'last_single_details')
+
 
 def handler(event: dict, context) -> dict:
     """
     Returns a list of all current artists being monitored.
+    Passing `limit`, `cursor` or `fields` query parameters returns one page of artists instead.
     """
 
-    try:
-        ddb = boto3.client('dynamodb')
-        table = os.getenv('ARTIST_TABLE_NAME')
-        log.info(f'Sending scan request to {table}...')
+    query_parameters: dict = event.get('queryStringParameters') or {}
+    if any(parameter in query_parameters for parameter in ('limit', 'cursor', 'fields')):
+        return list_artists_page(query_parameters)
 
-        response = ddb.scan(TableName=table, Select='ALL_ATTRIBUTES', ReturnConsumedCapacity='TOTAL')
+    try:
+        artists: list[dict] = list_artists()
     except ClientError as err:
         log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
         log.error(f'Client Error Code: {err.response["Error"]["Code"]}')
@@ -29,10 +44,9 @@ def handler(event: dict, context) -> dict:
             'body': json.dumps({'error': err.response['Error'], 'error_type': 'Client'}),
         }
     else:
-        log.debug(f'Returned payload: {response}')
-        log.debug('Parsing returned payload...')
+        log.debug(f'Returned artists: {artists}')
 
-        if len(response['Items']) == 0:
+        if len(artists) == 0:
             log.warning('No artists found. Returning empty list to client.')
             return {
                 'statusCode': 204,
@@ -42,13 +56,11 @@ def handler(event: dict, context) -> dict:
         else:
             log.info('Successfully received list of artists. Returning list to client.')
 
-            # Extract out only artist ID and name. Then add all artists into a list of dicts
-            current_artists_with_id: list[dict] = [
-                {'artist_id': artist['artist_id']['S'], 'artist_name': artist['artist_name']['S']} for artist in response['Items']
-            ]
+            # Both the snapshot and the scan only hold artist ID and name, so each artist is already in the shape we return
+            current_artists_with_id: list[dict] = artists
 
             # Extract out only artist name. Then add all artists into a list
-            current_artists_names: list[str] = [artist['artist_name']['S'] for artist in response['Items']]
+            current_artists_names: list[str] = [artist['artist_name'] for artist in artists]
 
             return {
                 'statusCode': 200,
@@ -62,3 +74,114 @@ def handler(event: dict, context) -> dict:
                     }
                 ),
             }
+
+
+def list_artists() -> list[dict]:
+    """
+    Serves the artists from the snapshot in the cache table with one point read.
+    Falls back to scanning the artist table if there is no snapshot (yet) or it is
+    too old, and rebuilds the snapshot from that scan.
+    """
+
+    cache_table = os.getenv('CACHE_TABLE_NAME')
+    version: int | None = None
+    if cache_table:
+        try:
+            snapshot, version, _ = read_snapshot(cache_table)
+        except ClientError as err:
+            log.warning(f'Could not read the artist list snapshot: {err.response["Error"]["Message"]}')
+        else:
+            if snapshot is not None:
+                log.info(f'Serving {len(snapshot)} artists from version {version} of the artist list snapshot.')
+                return [{'artist_id': artist_id, 'artist_name': artist_name} for artist_id, artist_name in snapshot.items()]
+            log.warning('No fresh artist list snapshot found. Falling back to a scan.')
+
+    table = os.getenv('ARTIST_TABLE_NAME')
+    log.info(f'Sending scan request to {table}...')
+    scanned_at: int = int(time.time())
+    artists, _ = scan_artists(table, SCAN_TOTAL_SEGMENTS)
+
+    if version is not None:
+        try:
+            # Losing the race to a stream consumer is fine. It writes a snapshot that is at least as new
+            snapshot = {artist['artist_id']: artist['artist_name'] for artist in artists}
+            if write_snapshot(cache_table, snapshot, version, scanned_at):
+                log.info(f'Rebuilt the artist list snapshot with {len(snapshot)} artists.')
+        except ClientError as err:
+            log.warning(f'Could not rebuild the artist list snapshot: {err.response["Error"]["Message"]}')
+    return artists
+
+
+def list_artists_page(query_parameters: dict) -> dict:
+    """
+    Returns one page of artists with only the requested `fields`, plus an opaque
+    `next_cursor` to pass back in for the next page (None on the last page).
+    """
+
+    try:
+        limit: int = int(query_parameters.get('limit', DEFAULT_PAGE_LIMIT))
+        fields: tuple[str, ...] = tuple(
+            dict.fromkeys(field.strip() for field in query_parameters.get('fields', 'artist_id,artist_name').split(','))
+        )
+        exclusive_start_key: dict | None = decode_cursor(query_parameters.get('cursor'))
+    except (ValueError, binascii.Error):
+        limit, fields, exclusive_start_key = 0, (), None
+
+    invalid_fields: list[str] = [field for field in fields if field not in SELECTABLE_FIELDS]
+    if not 1 <= limit <= MAX_PAGE_LIMIT or not fields or invalid_fields:
+        log.warning(f'Invalid query parameters: {query_parameters}. Returning error message to client.')
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps(
+                {
+                    'error': f'Expected a limit of 1 to {MAX_PAGE_LIMIT}, a valid cursor, and fields out of {", ".join(SELECTABLE_FIELDS)}.',
+                    'error_type': 'Validation',
+                }
+            ),
+        }
+
+    try:
+        table = os.getenv('ARTIST_TABLE_NAME')
+        log.info(f'Sending scan request for a page of {limit} artists to {table}...')
+
+        artists, last_evaluated_key = scan_artists_page(table, limit, exclusive_start_key, fields)
+    except ClientError as err:
+        log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
+        log.error(f'Client Error Code: {err.response["Error"]["Code"]}')
+        return {
+            'statusCode': err.response['ResponseMetadata']['HTTPStatusCode'],
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': err.response['Error'], 'error_type': 'Client'}),
+        }
+
+    log.info(f'Successfully received a page of {len(artists)} artists. Returning page to client.')
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps({'artists': artists, 'next_cursor': encode_cursor(last_evaluated_key)}),
+    }
+
+
+def encode_cursor(last_evaluated_key: dict | None) -> str | None:
+    """
+    Turns the scan's `LastEvaluatedKey` into an opaque, URL safe cursor.
+    """
+
+    if not last_evaluated_key:
+        return None
+    return base64.urlsafe_b64encode(last_evaluated_key['artist_id']['S'].encode()).decode()
+
+
+def decode_cursor(cursor: str | None) -> dict | None:
+    """
+    Turns a cursor from `encode_cursor` back into an `ExclusiveStartKey`.
+    """
+
+    if not cursor:
+        return None
+
+    artist_id: str = base64.b64decode(cursor.encode(), altchars=b'-_', validate=True).decode()
+    if not artist_id:
+        raise ValueError(f'Invalid cursor: {cursor}')
+    return {'artist_id': {'S': artist_id}}
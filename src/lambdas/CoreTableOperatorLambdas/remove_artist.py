@@ -2,8 +2,8 @@ import json
 import logging
 import os
 
-import boto3
 from botocore.exceptions import ClientError
+from spotificity_common.clients import get_client
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
@@ -21,7 +21,7 @@ def handler(event: dict, context) -> dict:
     artist_id: str = payload['artist_id']
 
     try:
-        ddb = boto3.client('dynamodb')
+        ddb = get_client('dynamodb')
         table = os.getenv('ARTIST_TABLE_NAME')
         log.info(f'Attempting to remove {artist_name} from {table}...')
 
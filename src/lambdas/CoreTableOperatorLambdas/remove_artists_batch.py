@@ -0,0 +1,76 @@
+import json
+import logging
+import os
+
+from botocore.exceptions import ClientError
+from spotificity_common.artist_table import batch_delete_artists
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+# Most artists accepted in a single request
+MAX_BATCH_ARTISTS: int = int(os.getenv('MAX_BATCH_ARTISTS', '1000'))
+
+# Upper bound on how many `BatchWriteItem` requests are in flight at the same time
+MAX_CONCURRENT_WRITES: int = int(os.getenv('MAX_CONCURRENT_REQUESTS', '10'))
+
+
+def handler(event: dict, context) -> dict:
+    """
+    Removes many artists from the "Monitored Artists" DynamoDB table in one
+    request. Returns the result for each artist.
+    """
+
+    log.debug(f'Event: {event}')
+    payload: dict = json.loads(event['body'])
+    artists: list[dict] = payload.get('artists', [])
+
+    if not isinstance(artists, list) or not artists or len(artists) > MAX_BATCH_ARTISTS:
+        log.warning('Invalid payload. Returning error message to client.')
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps(
+                {'error': f'Expected an "artists" list of 1 to {MAX_BATCH_ARTISTS} artists.', 'error_type': 'Validation'}
+            ),
+        }
+    if any(not isinstance(artist, dict) or not artist.get('artist_id') for artist in artists):
+        log.warning('Artist without an ID passed in. Returning error message to client.')
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': 'Every artist needs an "artist_id".', 'error_type': 'Validation'}),
+        }
+
+    artist_ids: list[str] = list(dict.fromkeys(artist['artist_id'] for artist in artists))
+
+    try:
+        table = os.getenv('ARTIST_TABLE_NAME')
+        log.info(f'Attempting to remove {len(artist_ids)} artists from {table}...')
+
+        failures: dict[str, str] = batch_delete_artists(table, artist_ids, MAX_CONCURRENT_WRITES)
+    except ClientError as err:
+        log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
+        log.error(f'Client Error Code: {err.response["Error"]["Code"]}')
+        log.warning('Error occurred while trying to remove artists. Returning error message to client.')
+        return {
+            'statusCode': err.response['ResponseMetadata']['HTTPStatusCode'],
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': err.response['Error'], 'error_type': 'Client'}),
+        }
+
+    results: list[dict] = [
+        (
+            {'artist_id': artist_id, 'status': 'failed', 'error': failures[artist_id]}
+            if artist_id in failures
+            else {'artist_id': artist_id, 'status': 'removed'}
+        )
+        for artist_id in artist_ids
+    ]
+
+    log.info(f'Batch DELETE request complete. {len(artist_ids) - len(failures)} artists removed. Returning payload to client.')
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps({'removed': len(artist_ids) - len(failures), 'failed': len(failures), 'results': results}),
+    }
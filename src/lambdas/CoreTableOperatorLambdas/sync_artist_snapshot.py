@@ -0,0 +1,79 @@
+import logging
+import os
+
+from botocore.exceptions import ClientError
+from spotificity_common.artist_snapshot import apply_snapshot_changes
+from spotificity_common.clients import get_client
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+
+def handler(event: dict, context) -> dict:
+    """
+    Keeps the artist list snapshot in the cache table in step with the
+    "Monitored Artists" DynamoDB table. Applies every INSERT, REMOVE and rename
+    in the stream batch with one snapshot write.
+    """
+
+    log.debug(f'Passed in event: {event}')
+    added_artists: dict[str, str] = {}
+    removed_artist_ids: set[str] = set()
+    renamed_artists: dict[str, str] = {}
+
+    # Records are in stream order, so a later change to the same artist wins
+    for record in event['Records']:
+        artist_id: str = record['dynamodb']['Keys']['artist_id']['S']
+
+        # The event source only sends MODIFY records that are flagged with `name_changed`, i.e. renames
+        if record['eventName'] in ('INSERT', 'MODIFY'):
+            added_artists[artist_id] = record['dynamodb']['NewImage']['artist_name']['S']
+            removed_artist_ids.discard(artist_id)
+            if record['eventName'] == 'MODIFY':
+                renamed_artists[artist_id] = added_artists[artist_id]
+        elif record['eventName'] == 'REMOVE':
+            added_artists.pop(artist_id, None)
+            removed_artist_ids.add(artist_id)
+
+    if not added_artists and not removed_artist_ids:
+        log.info('No INSERT, REMOVE or rename events in batch of records. Exiting.')
+        return {}
+
+    try:
+        log.info(f'Applying {len(added_artists)} added and {len(removed_artist_ids)} removed artists to the snapshot...')
+        apply_snapshot_changes(
+            os.getenv('CACHE_TABLE_NAME'),
+            os.getenv('ARTIST_TABLE_NAME'),
+            added_artists,
+            removed_artist_ids,
+        )
+
+        # The flag only has to live until the rename is in the snapshot. Clearing it keeps the music and schedule
+        # writes that follow from reaching us
+        for artist_id, artist_name in renamed_artists.items():
+            clear_name_changed(os.getenv('ARTIST_TABLE_NAME'), artist_id, artist_name)
+    except ClientError as err:
+        log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
+        log.error(f'Client Error Code: {err.response["Error"]["Code"]}')
+        raise
+
+    return {'artists_added': len(added_artists), 'artists_removed': len(removed_artist_ids)}
+
+
+def clear_name_changed(table: str, artist_id: str, artist_name: str) -> None:
+    """
+    Removes the `name_changed` flag, unless the artist was renamed again (or
+    removed) in the meantime.
+    """
+
+    try:
+        get_client('dynamodb').update_item(
+            TableName=table,
+            Key={'artist_id': {'S': artist_id}},
+            UpdateExpression='REMOVE name_changed',
+            ConditionExpression='artist_name = :artist_name',
+            ExpressionAttributeValues={':artist_name': {'S': artist_name}},
+        )
+    except ClientError as err:
+        if err.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
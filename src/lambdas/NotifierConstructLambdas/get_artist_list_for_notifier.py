@@ -1,62 +1,135 @@
 import logging
 import os
+import time
 
-import boto3
 from botocore.exceptions import ClientError
+from spotificity_common.artist_table import scan_artists
+from spotificity_common.check_schedule import query_due_artists
+from spotificity_common.clients import get_client
+from spotificity_common.payload_store import is_over_threshold, payload_size, store_records
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
+# Number of artists per chunk when the notifier workflow is sharded. 0 disables chunking
+ARTIST_CHUNK_SIZE: int = int(os.getenv('ARTIST_CHUNK_SIZE', '0'))
+
+# Number of parallel segments to scan the artist table with
+SCAN_TOTAL_SEGMENTS: int = int(os.getenv('SCAN_TOTAL_SEGMENTS', '1'))
+
+# `weekly` checks every artist. `adaptive` only checks the artists whose `next_check_at` has passed
+SCHEDULE_MODE: str = os.getenv('SCHEDULE_MODE', 'weekly')
+
+# Most due artists checked per adaptive run, which keeps every run small
+MAX_DUE_ARTISTS: int = int(os.getenv('MAX_DUE_ARTISTS', '500'))
+
+# Artists that were never scheduled (e.g. added before the adaptive schedule, or whose first check failed to be
+# scheduled) aren't in the next check index. A filtered scan picks them up at most this often
+BACKFILL_INTERVAL_DAYS: int = int(os.getenv('BACKFILL_INTERVAL_DAYS', '7'))
+BACKFILL_CACHE_KEY: str = 'notifier_schedule_backfill'
+
+# Besides the artist itself, the fetch task needs the last seen album and single to sync releases from
+SCAN_PROJECTION: tuple[str, ...] = (
+    'artist_id',
+    'artist_name',
+    'last_album_details.last_album_id',
+    'last_album_details.last_album_release_date',
+    'last_single_details.last_single_id',
+    'last_single_details.last_single_release_date',
+)
+
 
 def handler(event: dict, context) -> dict:
     """
     Returns a list of all current artists being monitored.
+    In the adaptive schedule mode, only the artists that are due for a check are returned.
     """
 
     try:
-        ddb = boto3.client('dynamodb')
         table = os.getenv('ARTIST_TABLE_NAME')
-        log.info(f'Sending scan request to {table}...')
 
-        response = ddb.scan(TableName=table, Select='ALL_ATTRIBUTES', ReturnConsumedCapacity='TOTAL')
+        if SCHEDULE_MODE == 'adaptive':
+            log.info(f'Querying {table} for artists due for a check...')
+            artists_found: list[dict] = query_due_artists(table, MAX_DUE_ARTISTS, SCAN_PROJECTION)
+            artists_found.extend(find_unscheduled_artists(table, MAX_DUE_ARTISTS - len(artists_found)))
+        else:
+            log.info(f'Sending scan request to {table}...')
+            artists_found, _ = scan_artists(table, SCAN_TOTAL_SEGMENTS, SCAN_PROJECTION)
     except ClientError as err:
         log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
         log.error(f'Client Error Code: {err.response["Error"]["Code"]}')
         raise
     else:
-        log.debug(f'Returned payload: {response}')
-        log.debug('Parsing returned payload...')
-
-        if response.get('Error'):
-            log.error('Error occurred while trying to scan table. Returning error to client.')
-            return {
-                'payload': {
-                    'status_code': response['ResponseMetadata']['HTTPStatusCode'],
-                    'error': response['Error'],
-                }
-            }
-        elif len(response['Items']) == 0:
+        log.debug(f'Returned artists: {artists_found}')
+
+        if len(artists_found) == 0 and SCHEDULE_MODE == 'adaptive':
+            log.info('No artists are due for a check. Nothing to do this run.')
+            return {'payload': {'status_code': 202, 'artists': []}}
+        elif len(artists_found) == 0:
             log.warning('No artists found. Returning empty list to client.')
             return {'payload': {'status_code': 204, 'artists': []}}
         else:
-            log.debug(f'Returned payload: {response}')
             log.info('Successfully received list of artists. Sending list to next task in step function.')
 
-            # Extract out only artist ID and name. Then add all artists into a list of dicts
-            current_artists_with_id: list[dict] = [
-                {'artist_id': artist['artist_id']['S'], 'artist_name': artist['artist_name']['S']} for artist in response['Items']
-            ]
-
-            # Extract out only artist name. Then add all artists into a list
-            current_artists_names: list[str] = [artist['artist_name']['S'] for artist in response['Items']]
-
-            return {
-                'payload': {
-                    'status_code': 200,
-                    'access_token': event,
-                    'artists': {
-                        'current_artists_names': current_artists_names,
-                        'current_artists_with_id': current_artists_with_id,
-                    },
+            # The scan only projects what the next tasks need, so each artist is already in the shape we return
+            current_artists_with_id: list[dict] = artists_found
+
+            # Too many artists to pass through the state machine inline. Hand the next tasks claim checks instead.
+            # The access token is passed along in the same state
+            offload: bool = is_over_threshold(current_artists_with_id, payload_size(event))
+
+            # Split the artists into chunks for the Map state to fan out over. The Map state only reads the
+            # chunks, so the full list isn't passed along as well
+            if ARTIST_CHUNK_SIZE > 0:
+                artists: dict = {
+                    'artist_count': len(current_artists_with_id),
+                    'artist_chunks': [
+                        store_records(chunk, 'artist_chunk', offload)
+                        for chunk in chunk_artists(current_artists_with_id, ARTIST_CHUNK_SIZE)
+                    ],
+                }
+                log.info(f'Split {len(current_artists_with_id)} artists into {len(artists["artist_chunks"])} chunks.')
+            else:
+                artists = {
+                    'artist_count': len(current_artists_with_id),
+                    'current_artists_with_id': store_records(current_artists_with_id, 'artists', offload),
                 }
-            }
+
+            return {'payload': {'status_code': 200, 'access_token': event, 'artists': artists}}
+
+
+def find_unscheduled_artists(table: str, limit: int) -> list[dict]:
+    """
+    Returns at most `limit` artists without a `next_check_at`, so they get checked
+    and scheduled. Once a scan finds no more of them than fit in a run, the next
+    scan is skipped for `BACKFILL_INTERVAL_DAYS`.
+    """
+
+    cache_table: str | None = os.getenv('CACHE_TABLE_NAME')
+    if limit <= 0 or not cache_table:
+        return []
+
+    ddb = get_client('dynamodb')
+    cache_key: dict = {'cache_key': {'S': BACKFILL_CACHE_KEY}}
+    backfilled: dict | None = ddb.get_item(TableName=cache_table, Key=cache_key).get('Item')
+    if backfilled and time.time() - int(backfilled['checked_at']['N']) < BACKFILL_INTERVAL_DAYS * 86400:
+        return []
+
+    log.info(f'Scanning {table} for artists that were never scheduled...')
+    unscheduled_artists, _ = scan_artists(
+        table, SCAN_TOTAL_SEGMENTS, SCAN_PROJECTION, filter_expression='attribute_not_exists(next_check_at)'
+    )
+    log.info(f'Found {len(unscheduled_artists)} unscheduled artists. Checking up to {limit} of them this run.')
+
+    # The rest are picked up by the next run's scan
+    if len(unscheduled_artists) <= limit:
+        ddb.put_item(TableName=cache_table, Item={**cache_key, 'checked_at': {'N': str(int(time.time()))}})
+    return unscheduled_artists[:limit]
+
+
+def chunk_artists(artists: list[dict], chunk_size: int) -> list[list[dict]]:
+    """
+    Splits the list of artists into consecutive chunks of at most `chunk_size` artists.
+    """
+
+    return [artists[index : index + chunk_size] for index in range(0, len(artists), chunk_size)]
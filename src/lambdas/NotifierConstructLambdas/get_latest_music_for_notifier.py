@@ -1,149 +1,354 @@
 import logging
-
-import requests
-from requests.exceptions import HTTPError
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import date, timedelta
+
+from botocore.exceptions import ClientError
+from spotificity_common.checkpoint_store import get_or_create_value, read_checkpoint, write_checkpoint
+from spotificity_common.clients import get_client
+from spotificity_common.payload_store import is_over_threshold, load_records, payload_size, store_records
+from spotificity_common.releases import (
+    NEW_RELEASES_FEED_MAX_PAGES,
+    RELEASE_TYPES,
+    RELEASES_PAGE_LIMIT,
+    compact_release,
+    format_release_details,
+    get_new_releases_feed,
+    get_releases_since,
+)
+from spotificity_common.spotify_client import DeadlineExceeded, get_spotify_client
+from spotificity_common.token_provider import get_access_token
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
+# Upper bound on how many artists are fetched from Spotify at the same time
+MAX_CONCURRENT_REQUESTS: int = int(os.getenv('MAX_CONCURRENT_REQUESTS', '10'))
+
+# `per_artist`, `new_releases` or `auto`. See `NotifierStrategy` in `src/constants.py`
+NOTIFIER_STRATEGY: str = os.getenv('NOTIFIER_STRATEGY', 'per_artist')
+
+# How far back the new releases feed is searched. The notifier runs weekly
+NEW_RELEASES_LOOKBACK_DAYS: int = int(os.getenv('NEW_RELEASES_LOOKBACK_DAYS', '7'))
+
+# `auto` only relies on the feed if every artist was checked one by one within this many days. A release the feed
+# doesn't list is then reported late, at the next full sweep, but never missed
+FULL_SWEEP_INTERVAL_DAYS: int = int(os.getenv('FULL_SWEEP_INTERVAL_DAYS', '28'))
+FULL_SWEEP_CACHE_KEY: str = 'notifier_last_full_sweep'
+
+# Cache table that partial results are checkpointed to when a run can't finish within the Lambda timeout
+CACHE_TABLE_NAME: str | None = os.getenv('CACHE_TABLE_NAME')
+
+# Time left at which no more artists are started, so the ones in flight can finish and be checkpointed
+CHECKPOINT_MARGIN_MS: int = int(os.getenv('CHECKPOINT_MARGIN_MS', '20000'))
+
+# Time left at which requests (and retries) still in flight are abandoned, which leaves enough time to checkpoint
+DEADLINE_MARGIN_MS: int = int(os.getenv('DEADLINE_MARGIN_MS', '5000'))
+
 
 def handler(event: dict, context) -> dict:
     """
     Queries a couple of Spotify's APIs to return back the latest musical releases
     for the artists.
+
+    When the state machine passes in a `checkpoint` scope and the time budget runs
+    low, the finished artists are checkpointed and a `continuation` is returned
+    instead, so the state machine can invoke us again. Every invocation (including
+    retries) skips the artists already checkpointed in the same scope.
     """
 
     log.debug(f'Passed in event: {event}')
-    access_token: str = event['access_token']
-    current_artists: list[dict] = event['artists']['current_artists_with_id']
-    latest_music: list[dict] = []
+    current_artists: list[dict] = load_records(event['artists']['current_artists_with_id'])
+    checkpoint_scope: str | None = get_checkpoint_scope(event)
+
+    # Without a checkpoint to resume from, every artist has to finish in this invocation
+    get_spotify_client().deadline = (
+        time.monotonic() + (context.get_remaining_time_in_millis() - DEADLINE_MARGIN_MS) / 1000 if checkpoint_scope else None
+    )
+
+    artist_count: int = event['artists'].get('artist_count', len(current_artists))
+    feed_artist_ids: set[str] | None = plan_feed_artist_ids(event, artist_count)
+    unchecked_artists: list[dict] = []
+    if feed_artist_ids is not None:
+        # Only check the artists that show up in Spotify's new releases feed
+        released_artists: list[dict] = find_artists_in_new_releases_feed(current_artists, feed_artist_ids)
+        unchecked_artists = [artist for artist in current_artists if artist['artist_id'] not in feed_artist_ids]
+        current_artists = released_artists
+
+    checkpointed_music: list[dict] = read_checkpoint(CACHE_TABLE_NAME, checkpoint_scope) if checkpoint_scope else []
+    checkpointed_ids: set[str] = {artist['artist_id'] for artist in checkpointed_music}
+    pending_artists: list[dict] = [artist for artist in current_artists if artist['artist_id'] not in checkpointed_ids]
+
+    def has_time_left() -> bool:
+        return checkpoint_scope is None or context.get_remaining_time_in_millis() > CHECKPOINT_MARGIN_MS
 
     # For each artist, fetch the latest musical releases
-    log.info('Starting iteration through artist list...')
-    for artist in current_artists:
-        artist_id: str = artist['artist_id']
-        artist_name: str = artist['artist_name']
-
-        # Get latest musical releases
-        last_album_details: dict = get_latest_album(artist_id, artist_name, access_token)
-        last_single_details: dict = get_latest_single(artist_id, artist_name, access_token)
-
-        # Add to list of latest musical releases
-        log.info(f'Adding {artist_name}\'s information to return payload...')
-        latest_music.append(
-            {
-                'artist_id': artist_id,
-                'artist_name': artist_name,
-                'last_album_details': last_album_details,
-                'last_single_details': last_single_details,
-            }
-        )
+    log.info(f'Fetching latest music for {len(pending_artists)} artists ({MAX_CONCURRENT_REQUESTS} max in flight)...')
+    fetched_music, error = fetch_latest_music(pending_artists, MAX_CONCURRENT_REQUESTS, has_time_left)
+
+    if checkpoint_scope and (error or len(fetched_music) < len(pending_artists)):
+        write_checkpoint(CACHE_TABLE_NAME, checkpoint_scope, fetched_music)
+    if error:
+        raise error
+
+    if len(fetched_music) < len(pending_artists):
+        if not fetched_music:
+            raise Exception(f'Not a single artist could be fetched with {CHECKPOINT_MARGIN_MS}ms left.')
+
+        completed_count: int = len(checkpointed_music) + len(fetched_music)
+        log.info(f'Running out of time. Checkpointed {completed_count} out of {len(current_artists)} artists.')
+        return {'continuation': {'completed': completed_count, 'remaining': len(current_artists) - completed_count}}
+
+    # Put the checkpointed artists back in with the rest, in the order they were passed in
+    artist_order: dict[str, int] = {artist['artist_id']: index for index, artist in enumerate(current_artists)}
+    latest_music: list[dict] = sorted(
+        checkpointed_music + fetched_music, key=lambda artist: artist_order.get(artist['artist_id'], len(artist_order))
+    )
+
+    # The feed counts as a check of the artists that aren't in it, so the update task still reschedules them
+    latest_music.extend(unchanged_artist_music(artist) for artist in unchecked_artists)
 
     # Return list of latest musical releases
     log.info('Successfully retrieved latest musical releases for all artists.')
+    log.info(f'Spotify client stats: {get_spotify_client().stats}')
     log.debug(f'Returning payload: {latest_music}')
-    return {'latest_music': latest_music}
+    # The state still holds this task's input (the artists) next to the result, so both count towards its size
+    offload: bool = is_over_threshold(latest_music, payload_size(event))
+    return {'latest_music': store_records(latest_music, 'latest_music', offload)}
 
 
-def get_latest_album(artist_id: str, artist_name: str, access_token: str) -> dict:
+def plan_feed_artist_ids(event: dict, artist_count: int) -> set[str] | None:
     """
-    Queries the Spotify API to return the last album released by the
-    artist.
+    Picks the strategy and, for the feed, pages through it. Returns the IDs of
+    every artist in the feed, or None if every artist is checked one by one.
+
+    Both happen once per execution. The plan is kept in the cache table, so the
+    checkpoint loop, retries and Map chunks neither decide differently nor page
+    through the feed again.
     """
 
-    endpoint: str = f'https://api.spotify.com/v1/artists/{artist_id}/albums'
+    if NOTIFIER_STRATEGY == 'per_artist':
+        return None
 
-    try:
-        log.info(f'Initiating GET request for the {artist_name}\'s last album...')
+    def create_plan() -> dict:
+        strategy: str = choose_strategy(artist_count, read_last_full_sweep())
+        if strategy == 'per_artist':
+            # Counted from when the sweep is planned, so a failed sweep isn't retried until the next run
+            record_full_sweep()
+            return {'strategy': strategy}
+        return {'strategy': strategy, 'artist_ids': get_new_releases_feed_artist_ids(get_access_token())}
 
-        response = requests.get(
-            url=endpoint,
-            params={'limit': 1, 'offset': 0, 'include_groups': 'album', 'market': 'US'},
-            headers={'Authorization': f'Bearer {access_token}'},
-        )
-        response.raise_for_status()
-    except HTTPError as err:
-        log.error(f'HTTP Error occurred: {err}')
-        raise
-    except Exception as err:
-        log.error(f'Other error occurred: {err}')
-        raise
+    execution_id: str | None = (event.get('checkpoint') or {}).get('execution_id')
+    if execution_id and CACHE_TABLE_NAME:
+        plan: dict = get_or_create_value(CACHE_TABLE_NAME, f'{execution_id}#strategy', create_plan)
     else:
-        log.debug(f'Returned payload: {response.json()}')
-        log.debug('Parsing returned payload...')
-        album_search_results: dict = response.json()
-
-        # Catch any errors that may occur when searching for the last album
-        if album_search_results.get('error'):
-            log.error(f'Error occurred: {album_search_results["error"]}')
-            raise Exception(f'Error occurred: {album_search_results["error"]}')
-        elif len(album_search_results['items']) == 0:
-            log.warning(f'No albums found for {artist_name}. Returning empty details.')
-            return {'last_album_name': '', 'last_album_release_date': '', 'last_album_artists': []}
-
-        # Extract out the last album's details
-        last_album: dict = album_search_results['items'][0]
-        last_album_artists: list[str] = [artist['name'] for artist in last_album['artists']]
-
-        log.info('Successfully retrieved last album details.')
-        return {
-            'last_album_name': last_album['name'],
-            'last_album_release_date': last_album['release_date'],
-            'last_album_artists': last_album_artists,
-        }
+        plan = create_plan()
+
+    log.info(f'Using the {plan["strategy"]} strategy.')
+    return set(plan['artist_ids']) if plan['strategy'] == 'new_releases' else None
 
 
-def get_latest_single(artist_id: str, artist_name: str, access_token: str) -> dict:
+def choose_strategy(artist_count: int, last_full_sweep_at: int | None) -> str:
     """
-    Queries the Spotify API to return the last single released by the
-    artist.
+    Resolves the `auto` strategy. The feed only lists the releases Spotify picks,
+    so it is only used while a full sweep of every artist happened within
+    `FULL_SWEEP_INTERVAL_DAYS`. Otherwise a simple cost model decides: checking
+    every artist costs at least one request per artist, and the feed costs its
+    pages plus, at worst, one request per artist that could show up in it.
     """
 
-    endpoint: str = f'https://api.spotify.com/v1/artists/{artist_id}/albums'
+    if NOTIFIER_STRATEGY != 'auto':
+        return NOTIFIER_STRATEGY
+
+    if last_full_sweep_at is None or time.time() - last_full_sweep_at > FULL_SWEEP_INTERVAL_DAYS * 86400:
+        log.info(f'No full sweep of every artist in the last {FULL_SWEEP_INTERVAL_DAYS} days. Using the per_artist strategy.')
+        return 'per_artist'
+
+    per_artist_cost: int = artist_count
+    feed_cost: int = NEW_RELEASES_FEED_MAX_PAGES + min(artist_count, NEW_RELEASES_FEED_MAX_PAGES * RELEASES_PAGE_LIMIT)
+    strategy: str = 'new_releases' if feed_cost < per_artist_cost else 'per_artist'
+
+    log.info(f'Estimated {per_artist_cost} requests per artist and {feed_cost} with the feed. Using the {strategy} strategy.')
+    return strategy
+
+
+def read_last_full_sweep() -> int | None:
+    """
+    Returns when every artist was last checked one by one, as an epoch timestamp.
+    """
+
+    if not CACHE_TABLE_NAME:
+        return None
 
     try:
-        log.info(f'Initiating GET request for the {artist_name}\'s last single...')
+        response = get_client('dynamodb').get_item(TableName=CACHE_TABLE_NAME, Key={'cache_key': {'S': FULL_SWEEP_CACHE_KEY}})
+    except ClientError as err:
+        log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
+        log.error(f'Client Error Code: {err.response["Error"]["Code"]}')
+        return None
+
+    item: dict | None = response.get('Item')
+    return int(item['swept_at']['N']) if item else None
+
 
-        response = requests.get(
-            url=endpoint,
-            params={'limit': 1, 'offset': 0, 'include_groups': 'single', 'market': 'US'},
-            headers={'Authorization': f'Bearer {access_token}'},
+def record_full_sweep() -> None:
+    if CACHE_TABLE_NAME:
+        get_client('dynamodb').put_item(
+            TableName=CACHE_TABLE_NAME,
+            Item={'cache_key': {'S': FULL_SWEEP_CACHE_KEY}, 'swept_at': {'N': str(int(time.time()))}},
         )
-        response.raise_for_status()
-    except HTTPError as err:
-        log.error(f'HTTP Error occurred: {err}')
-        raise
-    except Exception as err:
-        log.error(f'Other error occurred: {err}')
-        raise
-    else:
-        log.debug(f'Returned payload: {response.json()}')
-        log.debug('Parsing returned payload...')
-        single_search_results: dict = response.json()
-
-        # Catch any errors that may occur when searching for the last single
-        if single_search_results.get('error'):
-            log.error(f'Error occurred: {single_search_results["error"]}')
-            raise Exception(f'Error occurred: {single_search_results["error"]}')
-        elif len(single_search_results['items']) == 0:
-            log.warning(f'No singles found for {artist_name}. Returning empty details.')
-            return {
-                'last_single_name': '',
-                'last_single_release_date': '',
-                'last_single_artists': [],
-            }
-
-        # Extract out the last single's details
-        last_single: dict = single_search_results['items'][0]
-        last_single_artists: list[str] = [artist['name'] for artist in last_single['artists']]
-
-        log.info('Successfully retrieved last single details.')
-        return {
-            'last_single_name': last_single['name'],
-            'last_single_release_date': last_single['release_date'],
-            'last_single_artists': last_single_artists,
+
+
+def get_new_releases_feed_artist_ids(access_token: str) -> list[str]:
+    """
+    Pages through the new releases feed and returns the ID of every artist on
+    any of its releases.
+    """
+
+    released_since: str = (date.today() - timedelta(days=NEW_RELEASES_LOOKBACK_DAYS)).isoformat()
+    feed_releases, request_count = get_new_releases_feed(access_token, released_since)
+
+    artist_ids: list[str] = sorted({release_artist['id'] for release in feed_releases for release_artist in release['artists']})
+    log.info(f'Found {len(artist_ids)} artists in the {len(feed_releases)} releases of the feed ({request_count} requests).')
+    return artist_ids
+
+
+def find_artists_in_new_releases_feed(artists: list[dict], feed_artist_ids: set[str]) -> list[dict]:
+    """
+    Joins the artists in the new releases feed against the monitored artists,
+    and returns only the monitored artists that released something. Artists that
+    aren't in the feed are left unchanged this run.
+    """
+
+    released_artists: list[dict] = [artist for artist in artists if artist['artist_id'] in feed_artist_ids]
+    log.info(f'{len(released_artists)} out of {len(artists)} monitored artists are in the new releases feed.')
+    return released_artists
+
+
+def get_checkpoint_scope(event: dict) -> str | None:
+    """
+    Builds the key that this run's checkpoints are stored under: the state machine
+    execution ID, plus the chunk index when the artists are sharded over a Map state.
+    """
+
+    checkpoint: dict | None = event.get('checkpoint')
+    if not checkpoint or not CACHE_TABLE_NAME:
+        return None
+    if checkpoint.get('chunk_index') is not None:
+        return f'{checkpoint["execution_id"]}#{checkpoint["chunk_index"]}'
+    return checkpoint['execution_id']
+
+
+def fetch_latest_music(
+    artists: list[dict],
+    max_in_flight: int,
+    has_time_left=lambda: True,
+) -> tuple[list[dict], Exception | None]:
+    """
+    Fetches the latest musical releases for every artist with a bounded pool of
+    worker threads. Results come back in the same order as the passed in artists.
+    The Spotify client further narrows how many requests are in flight while
+    Spotify is throttling us.
+
+    No new artists are started once `has_time_left` returns False or an artist
+    fails. Artists that ran into the Spotify client's deadline count as not
+    finished rather than failed. Returns the artists that did finish, along with
+    the first error.
+    """
+
+    worker_count: int = max(1, min(max_in_flight, len(artists)))
+    error: Exception | None = None
+
+    executor = ThreadPoolExecutor(max_workers=worker_count)
+    futures: dict[Future, int] = {executor.submit(fetch_artist_music, artist): index for index, artist in enumerate(artists)}
+    pending: set[Future] = set(futures)
+    while pending and error is None and has_time_left():
+        done, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+        error = next(
+            (
+                future.exception()
+                for future in done
+                if future.exception() and not isinstance(future.exception(), DeadlineExceeded)
+            ),
+            None,
+        )
+
+    # Artists already in flight still finish. Only the ones that never started are dropped
+    executor.shutdown(wait=True, cancel_futures=True)
+
+    if error is not None:
+        log.error(f'Error occurred while fetching latest music: {error}')
+    finished: list[Future] = [
+        future for future in futures if future.done() and not future.cancelled() and future.exception() is None
+    ]
+    return [future.result() for future in sorted(finished, key=futures.get)], error
+
+
+def unchanged_artist_music(artist: dict) -> dict:
+    """
+    Returns the shape `fetch_artist_music` returns for an artist with no new releases.
+    """
+
+    return {
+        'artist_id': artist['artist_id'],
+        'artist_name': artist['artist_name'],
+        'last_album_details': None,
+        'last_single_details': None,
+        'new_releases': [],
+    }
+
+
+def fetch_artist_music(artist: dict) -> dict:
+    """
+    Fetches every release by a single artist since the last check. The newest
+    album and newest single are only returned if they changed (otherwise None),
+    and every release newer than the last seen one is listed in `new_releases`.
+    """
+
+    # Asked for per artist, as a run can outlast the token it started with
+    access_token: str = get_access_token()
+
+    artist_id: str = artist['artist_id']
+    artist_name: str = artist['artist_name']
+
+    # The scan hands us the ID and release date of the last album and single we saw
+    last_seen: dict[str, dict] = {}
+    for release_type in RELEASE_TYPES:
+        stored_details: dict = artist.get(f'last_{release_type}_details') or {}
+        last_seen[release_type] = {
+            'id': stored_details.get(f'last_{release_type}_id'),
+            'release_date': stored_details.get(f'last_{release_type}_release_date', ''),
         }
 
+    # Get musical releases since the last check
+    releases_since: dict[str, list] = get_releases_since(artist_id, artist_name, access_token, last_seen)
+
+    # A group we have no last seen ID for only returns its newest release, which isn't necessarily new
+    new_releases: list[dict] = sorted(
+        (
+            compact_release(release, release_type)
+            for release_type in RELEASE_TYPES
+            if last_seen[release_type]['id'] is not None
+            for release in releases_since[release_type]
+        ),
+        key=lambda release: release['release_date'],
+        reverse=True,
+    )
+
+    log.info(f'Adding {artist_name}\'s information to return payload...')
+    return {
+        'artist_id': artist_id,
+        'artist_name': artist_name,
+        'last_album_details': (
+            format_release_details(releases_since['album'][0], 'album', artist_name) if releases_since['album'] else None
+        ),
+        'last_single_details': (
+            format_release_details(releases_since['single'][0], 'single', artist_name) if releases_since['single'] else None
+        ),
+        'new_releases': new_releases,
+    }
+
 
 """
 Unfortunately it turns out Spotify does not have a way to filter by songs the artist is featured on.
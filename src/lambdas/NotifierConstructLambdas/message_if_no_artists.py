@@ -1,9 +1,9 @@
-import json
 import logging
 import os
 
-import boto3
 from botocore.exceptions import ClientError
+from spotificity_common.clients import get_client
+from spotificity_common.secret_cache import secret_cache
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
@@ -19,7 +19,7 @@ def handler(event, context) -> None:
     try:
         log.info('Attempting to publish email to SNS topic...')
         topic_arn = os.getenv('SNS_TOPIC_ARN')
-        sns = boto3.client('sns')
+        sns = get_client('sns')
 
         response = sns.publish(
             TopicArn=topic_arn,
@@ -44,26 +44,12 @@ def confirm_email_subscription() -> None:
 
     log.info('Checking to see if my email is already subscribed...')
 
-    try:
-        log.debug('Attempting to pull my email from AWS Secrets Manager...')
-
-        ssm = boto3.client('secretsmanager')
-        response = ssm.get_secret_value(SecretId='EmailSecret')
-    except ClientError as err:
-        log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
-        log.error(f'Client Error Code: {err.response["Error"]["Code"]}')
-        raise
-    else:
-        log.info('Successfully retrieved email from AWS Secrets Manager.')
-        email_secret_payload: dict = json.loads(response['SecretString'])
-        my_email: str = email_secret_payload['MY_EMAIL']
-
     # Check if my email is already subscribed to the SNS topic
     try:
         log.info('Pulling list of subscriptions from SNS topic...')
 
         topic_arn = os.getenv('SNS_TOPIC_ARN')
-        sns = boto3.client('sns')
+        sns = get_client('sns')
         response = sns.list_subscriptions_by_topic(TopicArn=topic_arn)
     except ClientError as err:
         log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
@@ -71,11 +57,16 @@ def confirm_email_subscription() -> None:
         raise
     else:
         log.info('Successfully pulled list of subscriptions from SNS topic.')
-        log.info('Checking to see if my email is already subscribed...')
-        subscriptions: list[dict] = response['Subscriptions']
-        for subscription in subscriptions:
-            if subscription['Endpoint'] == my_email:
-                log.info('My email is already subscribed to the SNS topic.')
-            else:
-                log.error('My email is not subscribed to the SNS topic.')
-                raise Exception('My email is not subscribed to the SNS topic.')
+        subscribed_emails: set[str] = {subscription['Endpoint'] for subscription in response['Subscriptions']}
+
+    my_email: str = secret_cache.get_secret_json('EmailSecret')['MY_EMAIL']
+    if my_email not in subscribed_emails:
+        # My email may have changed since it was cached. Pull it again before giving up
+        log.warning('Cached email is not subscribed. Refreshing it from AWS Secrets Manager...')
+        my_email = secret_cache.get_secret_json('EmailSecret', force_refresh=True)['MY_EMAIL']
+
+    if my_email in subscribed_emails:
+        log.info('My email is already subscribed to the SNS topic.')
+    else:
+        log.error('My email is not subscribed to the SNS topic.')
+        raise Exception('My email is not subscribed to the SNS topic.')
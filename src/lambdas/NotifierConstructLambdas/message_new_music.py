@@ -1,14 +1,17 @@
-import json
 import logging
 import os
 from random import choice
 
-import boto3
 from botocore.exceptions import ClientError
+from spotificity_common.clients import get_client
+from spotificity_common.payload_store import is_claim_check, load_records
+from spotificity_common.secret_cache import secret_cache
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
+SKIP_EMPTY_REPORTS: bool = os.getenv('SKIP_EMPTY_REPORTS', 'false') == 'true'
+
 
 def handler(event, context) -> None:
     """
@@ -20,8 +23,19 @@ def handler(event, context) -> None:
     log.debug(f'Event: {event}')
     confirm_email_subscription()
 
-    # Check if passed in list is empty. If so, send email that there is no music to report
-    if not event:
+    # Large runs hand us a claim check for the new music instead of the list itself.
+    # A sharded workflow hands us one list of new music (or claim check) per chunk. Merge them back into a single list
+    if is_claim_check(event):
+        event = load_records(event)
+    elif event and all(isinstance(chunk, list) or is_claim_check(chunk) for chunk in event):
+        log.info(f'Merging new music from {len(event)} chunks...')
+        event = [artist for chunk in event for artist in load_records(chunk)]
+
+    # Check if passed in list is empty. If so, send email that there is no music to report.
+    # Runs on the adaptive schedule happen daily, so they stay quiet unless there is something new
+    if not event and SKIP_EMPTY_REPORTS:
+        log.info('No new music to report. Skipping the email.')
+    elif not event:
         log.info('No new music to report. Sending email...')
         send_no_music_email()
     else:
@@ -38,7 +52,7 @@ def send_no_music_email() -> None:
     try:
         log.debug('Attempting to publish email to SNS topic...')
         topic_arn = os.getenv('SNS_TOPIC_ARN')
-        sns = boto3.client('sns')
+        sns = get_client('sns')
 
         response = sns.publish(
             TopicArn=topic_arn,
@@ -85,7 +99,13 @@ def send_email_with_new_music(event: list) -> None:
     for index, artist in enumerate(event, start=1):
         artist_name = artist['artist_name']
 
-        if artist.get('last_album_details'):
+        if artist.get('new_releases'):
+            releases_str = '\n\t'.join(
+                f'{artist_name} dropped the {release["type"]} "{release["name"]}" on {release["release_date"]}.'
+                for release in artist['new_releases']
+            )
+            email_strings_list.append(f'{index}. \n\t{releases_str}')
+        elif artist.get('last_album_details'):
             last_album_name = artist['last_album_details']['last_album_name']
             last_album_release_date = artist['last_album_details']['last_album_release_date']
             email_strings_list.append(f'{index}. \n\t{artist_name} dropped "{last_album_name}" on {last_album_release_date}.')
@@ -101,7 +121,7 @@ def send_email_with_new_music(event: list) -> None:
     try:
         log.debug('Attempting to publish email to SNS topic...')
         topic_arn = os.getenv('SNS_TOPIC_ARN')
-        sns = boto3.client('sns')
+        sns = get_client('sns')
 
         response = sns.publish(
             TopicArn=topic_arn,
@@ -132,28 +152,12 @@ def confirm_email_subscription() -> None:
 
     log.info('Checking to see if my email is already subscribed...')
 
-    try:
-        log.debug('Attempting to pull my email from AWS Secrets Manager...')
-
-        ssm = boto3.client('secretsmanager')
-        response = ssm.get_secret_value(SecretId='EmailSecret')
-    except ClientError as err:
-        log.error(f'Client Error: {err.response["Error"]["Message"]}')
-        log.error(f'Client Error Code: {err.response["Error"]["Code"]}')
-        raise
-    else:
-        log.info('Successfully retrieved email from AWS Secrets Manager.')
-
-        # Extract email from returned payload
-        email_secret_payload: dict = json.loads(response['SecretString'])
-        my_email: str = email_secret_payload['MY_EMAIL']
-
     # Check if my email is already subscribed to the SNS topic
     try:
         log.info('Pulling list of subscriptions from SNS topic...')
 
         topic_arn = os.getenv('SNS_TOPIC_ARN')
-        sns = boto3.client('sns')
+        sns = get_client('sns')
         response = sns.list_subscriptions_by_topic(TopicArn=topic_arn)
     except ClientError as err:
         log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
@@ -161,11 +165,16 @@ def confirm_email_subscription() -> None:
         raise
     else:
         log.info('Successfully pulled list of subscriptions from SNS topic.')
-        log.info('Checking to see if my email is already subscribed...')
-        subscriptions: list[dict] = response['Subscriptions']
-        for subscription in subscriptions:
-            if subscription['Endpoint'] == my_email:
-                log.info('My email is already subscribed to the SNS topic.')
-            else:
-                log.error('My email is not subscribed to the SNS topic.')
-                raise Exception('My email is not subscribed to the SNS topic.')
+        subscribed_emails: set[str] = {subscription['Endpoint'] for subscription in response['Subscriptions']}
+
+    my_email: str = secret_cache.get_secret_json('EmailSecret')['MY_EMAIL']
+    if my_email not in subscribed_emails:
+        # My email may have changed since it was cached. Pull it again before giving up
+        log.warning('Cached email is not subscribed. Refreshing it from AWS Secrets Manager...')
+        my_email = secret_cache.get_secret_json('EmailSecret', force_refresh=True)['MY_EMAIL']
+
+    if my_email in subscribed_emails:
+        log.info('My email is already subscribed to the SNS topic.')
+    else:
+        log.error('My email is not subscribed to the SNS topic.')
+        raise Exception('My email is not subscribed to the SNS topic.')
@@ -1,12 +1,28 @@
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-import boto3
 from botocore.exceptions import ClientError
+from spotificity_common.artist_table import batch_get_artists, update_artist_music
+from spotificity_common.check_schedule import schedule_from_release_dates, set_check_schedule
+from spotificity_common.payload_store import load_records, store_records
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
+# Upper bound on how many artists are written to the table at the same time
+MAX_CONCURRENT_WRITES: int = int(os.getenv('MAX_CONCURRENT_REQUESTS', '10'))
+
+# Most releases kept in each artist's release history
+RELEASE_HISTORY_LIMIT: int = int(os.getenv('RELEASE_HISTORY_LIMIT', '20'))
+
+# `adaptive` reschedules every checked artist. `weekly` checks every artist, so it writes no schedules
+SCHEDULE_MODE: str = os.getenv('SCHEDULE_MODE', 'weekly')
+
+# In a sharded run the Map state joins the new music of every chunk into one state, so one chunk's size says
+# nothing about whether the joined output fits. Sharded runs always claim check their new music
+SHARDED: bool = int(os.getenv('ARTIST_CHUNK_SIZE', '0')) > 0
+
 
 def handler(event, context) -> dict:
     """
@@ -16,81 +32,187 @@ def handler(event, context) -> dict:
     """
 
     log.debug(f'Passed in event: {event}')
+    event = load_records(event)
+    table = os.getenv('ARTIST_TABLE_NAME')
     artists_with_changes: list = []
+    pending_writes: list[tuple[dict, dict[str, dict], list[dict] | None, dict | None]] = []
+    pending_schedules: list[tuple[str, int, float | None]] = []
 
-    log.info('Initiating iteration through artists to update the music table...')
+    # Read every artist's stored music up front instead of one `update_item` round trip at a time
+    try:
+        log.info(f'Reading the stored music of {len(event)} artists from {table}...')
+        stored_music: dict[str, dict] = batch_get_artists(
+            table,
+            [artist['artist_id'] for artist in event],
+            projection=('last_album_details', 'last_single_details', 'release_history'),
+        )
+    except ClientError as err:
+        log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
+        log.error(f'Client Error Code: {err.response["Error"]["Code"]}')
+        raise
+
+    log.info('Checking if there are any changes in the music...')
     for artist in event:
-        artist_id: str = artist['artist_id']
         artist_name: str = artist['artist_name']
-        last_album_details: dict = artist['last_album_details']
-        last_single_details: dict = artist['last_single_details']
-
-        # Update DynamoDB with latest musical releases
-        try:
-            ddb = boto3.client('dynamodb')
-            table = os.getenv('ARTIST_TABLE_NAME')
-            log.info(f'Initiating PUT request to update {table} with {artist_name}\'s latest releases...')
-
-            # Convert the last_album_details and last_single_details to DynamoDB format
-            converted_last_album_details: dict = {
-                'M': {
-                    'last_album_name': {'S': last_album_details['last_album_name']},
-                    'last_album_release_date': {'S': last_album_details['last_album_release_date']},
-                    'last_album_artists': {'L': [{'S': artist} for artist in last_album_details['last_album_artists']]},
-                }
-            }
-            converted_last_single_details: dict = {
-                'M': {
-                    'last_single_name': {'S': last_single_details['last_single_name']},
-                    'last_single_release_date': {'S': last_single_details['last_single_release_date']},
-                    'last_single_artists': {'L': [{'S': artist} for artist in last_single_details['last_single_artists']]},
-                }
-            }
-
-            response = ddb.update_item(
-                TableName=table,
-                Key={'artist_id': {'S': artist_id}},
-                UpdateExpression='SET last_album_details = :last_album_details, last_single_details = :last_single_details',
-                ExpressionAttributeValues={
-                    ':last_album_details': converted_last_album_details,
-                    ':last_single_details': converted_last_single_details,
-                },
-                ReturnConsumedCapacity='TOTAL',
-                ReturnValues='UPDATED_OLD',
+        stored_artist: dict | None = stored_music.get(artist['artist_id'])
+
+        if stored_artist is None:
+            log.warning(f'{artist_name} is no longer being monitored. Skipping...')
+            continue
+
+        if SCHEDULE_MODE == 'adaptive':
+            pending_schedules.append(schedule_next_check(artist, stored_artist))
+
+        # Only write the release groups whose release ID differs from the stored one
+        changed_releases: dict[str, dict] = {
+            release_type: artist[f'last_{release_type}_details']
+            for release_type in ('album', 'single')
+            if release_changed(artist, stored_artist, release_type)
+        }
+        if changed_releases:
+            release_history: list[dict] | None = (
+                merge_release_history(artist['new_releases'], stored_artist.get('release_history', []))
+                if artist.get('new_releases')
+                else None
             )
-        except ClientError as err:
-            log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
-            log.error(f'Client Error Code: {err.response["Error"]["Code"]}')
-            raise
+            pending_writes.append((artist, changed_releases, release_history, detect_new_music(artist, stored_artist)))
         else:
-            log.debug(f'Returned response: {response}')
-            log.info(f'PUT request successful. {artist_name}\'s latest releases have been updated in {table}.')
-
-            # Check if there are any changes in the music. If so, add artist to list of artists with changes.
-            log.info('Checking if there are any changes in the music...')
-            if (
-                response['Attributes']['last_album_details']['M']['last_album_name']['S']
-                != converted_last_album_details['M']['last_album_name']['S']
-            ):
-                log.debug(f'{artist_name} dropped a new album! Adding {artist_name} to list of artists with changes...')
-                artists_with_changes.append(
-                    {
-                        'artist_name': artist_name,
-                        'last_album_details': last_album_details,
-                    }
-                )
-            elif (
-                response['Attributes']['last_single_details']['M']['last_single_name']['S']
-                != converted_last_single_details['M']['last_single_name']['S']
-            ):
-                log.debug(f'{artist_name} dropped a new single! Adding {artist_name} to list of artists with changes...')
-                artists_with_changes.append({'artist_name': artist_name, 'last_single_details': last_single_details})
-            else:
-                log.debug(f'No changes in {artist_name}\'s music.')
+            log.debug(f'No changes in {artist_name}\'s music.')
+
+    log.info(f'Writing the latest releases of {len(pending_writes)} out of {len(event)} artists to {table}...')
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENT_WRITES, len(pending_writes)))) as executor:
+        written: list[bool] = list(
+            executor.map(lambda pending: write_artist_music(table, pending[0], pending[1], pending[2]), pending_writes)
+        )
+
+    log.info(f'Scheduling the next check of {len(pending_schedules)} artists...')
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENT_WRITES, len(pending_schedules)))) as executor:
+        list(executor.map(lambda schedule: set_check_schedule(table, *schedule), pending_schedules))
+
+    # A failed write condition means the table already holds these releases, so there is nothing new to report
+    for (_, _, _, new_music), was_written in zip(pending_writes, written):
+        if was_written and new_music:
+            artists_with_changes.append(new_music)
 
     if len(artists_with_changes) == 0:
         log.info('No changes in music from all artists. Returning empty list...')
         return {'new_music': artists_with_changes}
     else:
         log.info('There were some changes in music! Returning list of artists with the updates...')
-        return {'new_music': artists_with_changes}
+        return {'new_music': store_records(artists_with_changes, 'new_music', offload=True if SHARDED else None)}
+
+
+def release_changed(artist: dict, stored_artist: dict, release_type: str) -> bool:
+    """
+    Returns True if the latest album or single (`release_type`) is not the one
+    stored in the table. Items written before release IDs were stored count as
+    changed, so their IDs get filled in. No latest details means no change.
+    """
+
+    if not artist.get(f'last_{release_type}_details'):
+        return False
+
+    stored_details: dict = stored_artist.get(f'last_{release_type}_details', {})
+    stored_id: str | None = stored_details.get(f'last_{release_type}_id')
+    return stored_id is None or stored_id != artist[f'last_{release_type}_details'][f'last_{release_type}_id']
+
+
+def detect_new_music(artist: dict, stored_artist: dict) -> dict | None:
+    """
+    Compares the latest releases against the ones stored in the table. Returns
+    the entry for the list of artists with changes, or None if nothing is new.
+    Releases are matched by ID, or by name for items stored without an ID.
+    """
+
+    artist_name: str = artist['artist_name']
+
+    # Every release since the last check, as found by the incremental sync
+    if artist.get('new_releases'):
+        log.debug(
+            f'{artist_name} dropped {len(artist["new_releases"])} new releases! Adding {artist_name} to list of artists with changes...'
+        )
+        return {'artist_name': artist_name, 'new_releases': artist['new_releases']}
+
+    if is_new_release(artist, stored_artist, 'album'):
+        log.debug(f'{artist_name} dropped a new album! Adding {artist_name} to list of artists with changes...')
+        return {'artist_name': artist_name, 'last_album_details': artist['last_album_details']}
+    elif is_new_release(artist, stored_artist, 'single'):
+        log.debug(f'{artist_name} dropped a new single! Adding {artist_name} to list of artists with changes...')
+        return {'artist_name': artist_name, 'last_single_details': artist['last_single_details']}
+
+    log.debug(f'No new releases from {artist_name}.')
+    return None
+
+
+def is_new_release(artist: dict, stored_artist: dict, release_type: str) -> bool:
+    """
+    Returns True if the latest album or single (`release_type`) differs from the stored one.
+    """
+
+    latest_details: dict | None = artist.get(f'last_{release_type}_details')
+    stored_details: dict = stored_artist.get(f'last_{release_type}_details', {})
+
+    if not latest_details:
+        return False
+
+    stored_id: str | None = stored_details.get(f'last_{release_type}_id')
+    if stored_id is not None:
+        return latest_details[f'last_{release_type}_id'] != stored_id
+    return latest_details[f'last_{release_type}_name'] != stored_details.get(f'last_{release_type}_name', '')
+
+
+def schedule_next_check(artist: dict, stored_artist: dict) -> tuple[str, int, float | None]:
+    """
+    Works out the artist's release cadence from every release date we know of,
+    and when the artist should be checked next.
+    """
+
+    release_dates: list[str] = [release['release_date'] for release in artist.get('new_releases', [])]
+    release_dates.extend(release['release_date'] for release in stored_artist.get('release_history', []))
+    for release_type in ('album', 'single'):
+        details: dict = artist.get(f'last_{release_type}_details') or stored_artist.get(f'last_{release_type}_details', {})
+        release_dates.append(details.get(f'last_{release_type}_release_date', ''))
+
+    return artist['artist_id'], *schedule_from_release_dates(release_dates)
+
+
+def merge_release_history(new_releases: list[dict], release_history: list[dict]) -> list[dict]:
+    """
+    Puts the new releases in front of the stored release history, drops
+    duplicates, and keeps only the newest `RELEASE_HISTORY_LIMIT` releases.
+    """
+
+    merged_history: dict[str, dict] = {}
+    for release in [*new_releases, *release_history]:
+        merged_history.setdefault(release['id'], release)
+    return list(merged_history.values())[:RELEASE_HISTORY_LIMIT]
+
+
+def write_artist_music(
+    table: str,
+    artist: dict,
+    changed_releases: dict[str, dict],
+    release_history: list[dict] | None = None,
+) -> bool:
+    """
+    Conditionally writes the artist's changed releases (and release history) to
+    the table. Returns False if the write condition failed because the releases
+    were already stored.
+    """
+
+    artist_name: str = artist['artist_name']
+
+    try:
+        log.info(f'Initiating PUT request to update {table} with {artist_name}\'s latest releases...')
+        old_music: dict | None = update_artist_music(table, artist['artist_id'], changed_releases, release_history)
+    except ClientError as err:
+        log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
+        log.error(f'Client Error Code: {err.response["Error"]["Code"]}')
+        raise
+
+    if old_music is None:
+        log.info(f'{artist_name}\'s latest releases were already up to date in {table}.')
+        return False
+
+    log.info(f'PUT request successful. {artist_name}\'s latest releases have been updated in {table}.')
+    return True
@@ -0,0 +1,196 @@
+import gzip
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from .artist_table import backoff, scan_artists
+from .clients import get_client
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+# Cache table item holding the manifest of the snapshot of every monitored artist. The artists themselves are
+# spread over part items, as one gzipped item crosses the 400 KB item size limit at around 15k artists
+SNAPSHOT_CACHE_KEY: str = 'artist_list_snapshot'
+
+# Artists per snapshot part. About 150 KB gzipped, which leaves plenty of room below the item size limit
+SNAPSHOT_PART_SIZE: int = 5000
+
+# How many times a write that lost a race with another writer is retried
+MAX_SNAPSHOT_WRITE_ATTEMPTS: int = 5
+
+# A snapshot built from a scan longer ago than this counts as missing, so it gets rebuilt. This bounds how long
+# a stream batch that was never applied (see the on-failure queue of the snapshot consumer) can leave it wrong
+SNAPSHOT_MAX_AGE_SECONDS: int = int(os.getenv('SNAPSHOT_MAX_AGE_SECONDS', str(24 * 60 * 60)))
+
+
+def read_snapshot(cache_table_name: str, consistent_read: bool = False) -> tuple[dict[str, str] | None, int, int]:
+    """
+    Reads the artist list snapshot: its manifest, then every part in parallel.
+    Returns the artist names keyed by artist ID together with the snapshot
+    version and when it was built from a scan. The artists are None if there is
+    no snapshot yet, if it is older than `SNAPSHOT_MAX_AGE_SECONDS`, or if one of
+    its parts is gone.
+    """
+
+    ddb = get_client('dynamodb')
+    response = ddb.get_item(
+        TableName=cache_table_name,
+        Key={'cache_key': {'S': SNAPSHOT_CACHE_KEY}},
+        ConsistentRead=consistent_read,
+    )
+
+    item: dict | None = response.get('Item')
+    if not item:
+        return None, 0, 0
+
+    version: int = int(item['version']['N'])
+    built_at: int = int(item.get('built_at', {}).get('N', '0'))
+    if time.time() - built_at > SNAPSHOT_MAX_AGE_SECONDS or 'part_count' not in item:
+        log.info(f'Version {version} of the artist list snapshot is older than {SNAPSHOT_MAX_AGE_SECONDS}s or unsharded.')
+        return None, version, built_at
+
+    def read_part(part_number: int) -> dict[str, str] | None:
+        part = ddb.get_item(
+            TableName=cache_table_name,
+            Key={'cache_key': {'S': part_key(item['parts_id']['S'], part_number)}},
+            ConsistentRead=consistent_read,
+        )
+        return decode_artists(part['Item']['artists']['B']) if 'Item' in part else None
+
+    part_count: int = int(item['part_count']['N'])
+    with ThreadPoolExecutor(max_workers=max(1, min(10, part_count))) as executor:
+        parts: list[dict[str, str] | None] = list(executor.map(read_part, range(part_count)))
+
+    if any(part is None for part in parts):
+        log.warning(f'Version {version} of the artist list snapshot is missing parts.')
+        return None, version, built_at
+    return {artist_id: artist_name for part in parts for artist_id, artist_name in part.items()}, version, built_at
+
+
+def apply_snapshot_changes(
+    cache_table_name: str,
+    artist_table_name: str,
+    added_artists: dict[str, str],
+    removed_artist_ids: set[str],
+) -> None:
+    """
+    Adds and removes artists from the snapshot. Writes are versioned, so two
+    consumers can't overwrite each other's changes. If there is no (fresh)
+    snapshot, it is rebuilt from a scan of the artist table instead, which
+    already reflects the changes. Nothing is written if nothing changed.
+    """
+
+    for attempt in range(MAX_SNAPSHOT_WRITE_ATTEMPTS):
+        artists, version, built_at = read_snapshot(cache_table_name, consistent_read=True)
+
+        if artists is None:
+            log.info(f'No fresh artist list snapshot. Building it from a scan of {artist_table_name}...')
+            artists, built_at = scan_snapshot_artists(artist_table_name), int(time.time())
+        else:
+            updated_artists: dict[str, str] = {
+                artist_id: artist_name for artist_id, artist_name in artists.items() if artist_id not in removed_artist_ids
+            }
+            updated_artists.update(added_artists)
+            if updated_artists == artists:
+                log.info('The changes are already in the artist list snapshot. Nothing to write.')
+                return
+            artists = updated_artists
+
+        if write_snapshot(cache_table_name, artists, version, built_at):
+            log.info(f'Artist list snapshot is now at version {version + 1} with {len(artists)} artists.')
+            return
+
+        log.warning('Artist list snapshot was changed by another writer. Retrying...')
+        backoff(attempt)
+
+    raise Exception(f'Could not update the artist list snapshot after {MAX_SNAPSHOT_WRITE_ATTEMPTS} attempts.')
+
+
+def scan_snapshot_artists(artist_table_name: str) -> dict[str, str]:
+    """
+    Scans the artist table for every artist's name, keyed by artist ID.
+    """
+
+    scanned_artists, _ = scan_artists(artist_table_name)
+    return {artist['artist_id']: artist['artist_name'] for artist in scanned_artists}
+
+
+def write_snapshot(cache_table_name: str, artists: dict[str, str], expected_version: int, built_at: int) -> bool:
+    """
+    Writes the snapshot if it is still at `expected_version`. Returns False if
+    another writer got there first. `built_at` is when the artists were last
+    scanned from the artist table.
+
+    The parts are written under a new ID first, and only then swapped in by the
+    manifest, so readers never see a half written snapshot and racing writers
+    never overwrite each other's parts. Superseded parts are left to the TTL.
+    """
+
+    ddb = get_client('dynamodb')
+    parts_id: str = f'{expected_version + 1}#{uuid.uuid4().hex}'
+    artist_items: list[tuple[str, str]] = list(artists.items())
+    part_count: int = -(-len(artist_items) // SNAPSHOT_PART_SIZE)
+
+    # Parts outlive the snapshot's max age, so a reader never finds them gone while the manifest is still fresh
+    expires_at: str = str(int(time.time()) + 2 * SNAPSHOT_MAX_AGE_SECONDS)
+
+    def write_part(part_number: int) -> None:
+        part_artists = artist_items[part_number * SNAPSHOT_PART_SIZE : (part_number + 1) * SNAPSHOT_PART_SIZE]
+        ddb.put_item(
+            TableName=cache_table_name,
+            Item={
+                'cache_key': {'S': part_key(parts_id, part_number)},
+                'artists': {'B': encode_artists(dict(part_artists))},
+                'expires_at': {'N': expires_at},
+            },
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, min(10, part_count))) as executor:
+        list(executor.map(write_part, range(part_count)))
+
+    try:
+        ddb.put_item(
+            TableName=cache_table_name,
+            Item={
+                'cache_key': {'S': SNAPSHOT_CACHE_KEY},
+                'parts_id': {'S': parts_id},
+                'part_count': {'N': str(part_count)},
+                'artist_count': {'N': str(len(artists))},
+                'version': {'N': str(expected_version + 1)},
+                'built_at': {'N': str(built_at)},
+            },
+            ConditionExpression='attribute_not_exists(cache_key) OR version = :expected_version',
+            ExpressionAttributeValues={':expected_version': {'N': str(expected_version)}},
+        )
+    except ClientError as err:
+        if err.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+    return True
+
+
+def part_key(parts_id: str, part_number: int) -> str:
+    return f'{SNAPSHOT_CACHE_KEY}#{parts_id}#{part_number}'
+
+
+def encode_artists(artists: dict[str, str]) -> bytes:
+    """
+    Gzips the artists as compact JSON, at about 30 bytes per artist. That is why
+    the snapshot is split into parts of `SNAPSHOT_PART_SIZE` artists.
+    """
+
+    return gzip.compress(json.dumps(artists, separators=(',', ':')).encode())
+
+
+def decode_artists(encoded_artists: bytes) -> dict[str, str]:
+    """
+    Reverses `encode_artists`.
+    """
+
+    return json.loads(gzip.decompress(encoded_artists))
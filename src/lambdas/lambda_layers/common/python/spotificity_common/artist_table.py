@@ -0,0 +1,375 @@
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from functools import cache
+
+from botocore.exceptions import ClientError
+
+from .clients import get_client
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+# BatchGetItem accepts at most 100 keys per request
+BATCH_GET_LIMIT: int = 100
+
+# BatchWriteItem accepts at most 25 put/delete requests per request
+BATCH_WRITE_LIMIT: int = 25
+
+# How many times unprocessed keys/items are retried before giving up
+MAX_BATCH_RETRIES: int = 8
+
+
+def scan_artists(
+    table_name: str,
+    total_segments: int = 1,
+    projection: tuple[str, ...] = ('artist_id', 'artist_name'),
+    filter_expression: str | None = None,
+) -> tuple[list[dict], float]:
+    """
+    Scans every page of the artist table and returns the projected attributes
+    of every artist, plus the read capacity units the scan consumed. With more
+    than one segment, the segments are scanned in parallel threads. A
+    `filter_expression` only returns the matching artists, but every artist is
+    still read.
+    """
+
+    total_segments = max(1, total_segments)
+    scan_kwargs: dict = {'TableName': table_name, 'ReturnConsumedCapacity': 'TOTAL', **projection_kwargs(projection)}
+    if filter_expression:
+        scan_kwargs['FilterExpression'] = filter_expression
+
+    if total_segments == 1:
+        artists, consumed_capacity = scan_segment(scan_kwargs)
+    else:
+        with ThreadPoolExecutor(max_workers=total_segments) as executor:
+            segment_results = list(
+                executor.map(
+                    lambda segment: scan_segment({**scan_kwargs, 'Segment': segment, 'TotalSegments': total_segments}),
+                    range(total_segments),
+                )
+            )
+        artists = [artist for segment_artists, _ in segment_results for artist in segment_artists]
+        consumed_capacity = sum(segment_capacity for _, segment_capacity in segment_results)
+
+    log.info(
+        f'Scanned {len(artists)} artists from {table_name} in {total_segments} segment(s). Consumed {consumed_capacity} RCUs.'
+    )
+    return artists, consumed_capacity
+
+
+def scan_segment(scan_kwargs: dict) -> tuple[list[dict], float]:
+    """
+    Follows `LastEvaluatedKey` through every page of one scan segment.
+    """
+
+    paginator = get_client('dynamodb').get_paginator('scan')
+    artists: list[dict] = []
+    consumed_capacity: float = 0.0
+
+    for page in paginator.paginate(**scan_kwargs):
+        artists.extend(deserialize_item(item) for item in page['Items'])
+        consumed_capacity += page.get('ConsumedCapacity', {}).get('CapacityUnits', 0.0)
+
+    return artists, consumed_capacity
+
+
+def scan_artists_page(
+    table_name: str,
+    limit: int,
+    exclusive_start_key: dict | None = None,
+    projection: tuple[str, ...] = ('artist_id', 'artist_name'),
+) -> tuple[list[dict], dict | None]:
+    """
+    Scans a single page of at most `limit` artists, starting after
+    `exclusive_start_key`. Returns the artists and the key to continue from,
+    which is None once the end of the table is reached.
+    """
+
+    scan_kwargs: dict = {'TableName': table_name, 'Limit': limit, **projection_kwargs(projection)}
+    if exclusive_start_key:
+        scan_kwargs['ExclusiveStartKey'] = exclusive_start_key
+
+    response = get_client('dynamodb').scan(**scan_kwargs)
+    return [deserialize_item(item) for item in response['Items']], response.get('LastEvaluatedKey')
+
+
+def batch_get_artists(
+    table_name: str,
+    artist_ids: list[str],
+    projection: tuple[str, ...] = ('artist_id', 'artist_name'),
+) -> dict[str, dict]:
+    """
+    Reads the projected attributes of many artists with `BatchGetItem`, retrying
+    unprocessed keys with backoff. Returns the artists keyed by their ID. Artists
+    that aren't in the table are left out.
+    """
+
+    ddb = get_client('dynamodb')
+    unique_ids: list[str] = list(dict.fromkeys(artist_ids))
+    artists: dict[str, dict] = {}
+
+    for index in range(0, len(unique_ids), BATCH_GET_LIMIT):
+        request_items: dict = {
+            table_name: {
+                'Keys': [{'artist_id': {'S': artist_id}} for artist_id in unique_ids[index : index + BATCH_GET_LIMIT]],
+                **projection_kwargs(tuple(dict.fromkeys(('artist_id', *projection)))),
+            }
+        }
+
+        for attempt in range(MAX_BATCH_RETRIES + 1):
+            response = ddb.batch_get_item(RequestItems=request_items)
+            for item in response['Responses'].get(table_name, []):
+                artist = deserialize_item(item)
+                artists[artist['artist_id']] = artist
+
+            request_items = response.get('UnprocessedKeys') or {}
+            if not request_items:
+                break
+            if attempt == MAX_BATCH_RETRIES:
+                raise Exception(f'BatchGetItem left {len(request_items[table_name]["Keys"])} keys unprocessed after retries.')
+
+            log.warning(f'{len(request_items[table_name]["Keys"])} keys were unprocessed. Retrying...')
+            backoff(attempt)
+
+    return artists
+
+
+def put_new_artists(table_name: str, artists: list[dict], max_workers: int = 4) -> tuple[set[str], dict[str, str]]:
+    """
+    Writes many artists with conditional `PutItem` requests from a pool of
+    worker threads, so an artist added in the meantime is never overwritten
+    (`BatchWriteItem` can't take a condition). Returns the IDs of the artists
+    that turned out to be in the table already, and the IDs of the artists
+    that could not be written, mapped to the reason why.
+    """
+
+    already_stored: set[str] = set()
+    failures: dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(artists)))) as executor:
+        for artist_id, error in executor.map(lambda artist: put_new_artist(table_name, artist), artists):
+            if error == 'ConditionalCheckFailedException':
+                already_stored.add(artist_id)
+            elif error:
+                failures[artist_id] = error
+
+    log.info(f'Wrote {len(artists) - len(already_stored) - len(failures)} out of {len(artists)} artists to {table_name}.')
+    return already_stored, failures
+
+
+def put_new_artist(table_name: str, artist: dict) -> tuple[str, str | None]:
+    """
+    Writes the artist unless it is already in the table. Returns the artist's
+    ID, and the error code or message if it wasn't written.
+    """
+
+    try:
+        get_client('dynamodb').put_item(
+            TableName=table_name,
+            Item={name: serialize_value(value) for name, value in artist.items()},
+            ConditionExpression='attribute_not_exists(artist_id)',
+        )
+    except ClientError as err:
+        if err.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return artist['artist_id'], err.response['Error']['Code']
+        log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
+        log.error(f'Client Error Code: {err.response["Error"]["Code"]}')
+        return artist['artist_id'], err.response['Error']['Message']
+    return artist['artist_id'], None
+
+
+def batch_delete_artists(table_name: str, artist_ids: list[str], max_workers: int = 4) -> dict[str, str]:
+    """
+    Deletes many artists with `BatchWriteItem`. Returns the IDs of the artists
+    that could not be deleted, mapped to the reason why.
+    """
+
+    write_requests: dict[str, dict] = {
+        artist_id: {'DeleteRequest': {'Key': {'artist_id': {'S': artist_id}}}} for artist_id in artist_ids
+    }
+    return batch_write(table_name, write_requests, max_workers)
+
+
+def batch_write(table_name: str, write_requests: dict[str, dict], max_workers: int) -> dict[str, str]:
+    """
+    Sends the write requests (keyed by artist ID, which also dedupes them, as
+    `BatchWriteItem` rejects duplicate keys) in chunks of 25 from a pool of
+    worker threads.
+    """
+
+    artist_ids: list[str] = list(write_requests)
+    chunks: list[list[str]] = [
+        artist_ids[index : index + BATCH_WRITE_LIMIT] for index in range(0, len(artist_ids), BATCH_WRITE_LIMIT)
+    ]
+
+    failures: dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+        for chunk_failures in executor.map(lambda chunk: write_chunk(table_name, chunk, write_requests), chunks):
+            failures.update(chunk_failures)
+
+    log.info(f'Wrote {len(artist_ids) - len(failures)} out of {len(artist_ids)} artists to {table_name}.')
+    return failures
+
+
+def write_chunk(table_name: str, artist_ids: list[str], write_requests: dict[str, dict]) -> dict[str, str]:
+    """
+    Writes one chunk of up to 25 requests, retrying unprocessed items with
+    backoff. Returns the artists that still failed.
+    """
+
+    ddb = get_client('dynamodb')
+    request_items: dict = {table_name: [write_requests[artist_id] for artist_id in artist_ids]}
+
+    for attempt in range(MAX_BATCH_RETRIES + 1):
+        try:
+            response = ddb.batch_write_item(RequestItems=request_items)
+        except ClientError as err:
+            log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
+            log.error(f'Client Error Code: {err.response["Error"]["Code"]}')
+            return {artist_id: err.response['Error']['Message'] for artist_id in request_key_ids(request_items, table_name)}
+
+        request_items = response.get('UnprocessedItems') or {}
+        if not request_items:
+            return {}
+        if attempt < MAX_BATCH_RETRIES:
+            log.warning(f'{len(request_items[table_name])} items were unprocessed. Retrying...')
+            backoff(attempt)
+
+    return {artist_id: 'Unprocessed after retries' for artist_id in request_key_ids(request_items, table_name)}
+
+
+def request_key_ids(request_items: dict, table_name: str) -> list[str]:
+    """
+    Pulls the artist IDs out of a `BatchWriteItem` request.
+    """
+
+    return [
+        (request.get('PutRequest', {}).get('Item') or request['DeleteRequest']['Key'])['artist_id']['S']
+        for request in request_items.get(table_name, [])
+    ]
+
+
+def update_artist_music(
+    table_name: str,
+    artist_id: str,
+    releases: dict[str, dict],
+    release_history: list[dict] | None = None,
+) -> dict | None:
+    """
+    Writes the `last_<release_type>_details` maps in `releases` (keyed by `album`
+    or `single`) to the artist, but only if at least one of their release IDs
+    differs from the stored one. Unchanged artists therefore cost no write and
+    produce no stream record. The `release_history` list is written alongside
+    them if passed in.
+
+    Returns the overwritten attributes, or None if nothing changed (or the artist
+    is no longer in the table).
+    """
+
+    set_clauses: list[str] = []
+    changed_conditions: list[str] = []
+    attribute_values: dict = {}
+
+    for release_type, details in releases.items():
+        details_attribute: str = f'last_{release_type}_details'
+        id_path: str = f'{details_attribute}.last_{release_type}_id'
+
+        set_clauses.append(f'{details_attribute} = :{details_attribute}')
+        changed_conditions.append(f'attribute_not_exists({id_path}) OR {id_path} <> :{release_type}_id')
+        attribute_values[f':{details_attribute}'] = serialize_value(details)
+        attribute_values[f':{release_type}_id'] = {'S': details[f'last_{release_type}_id']}
+
+    if release_history is not None:
+        set_clauses.append('release_history = :release_history')
+        attribute_values[':release_history'] = serialize_value(release_history)
+
+    try:
+        response = get_client('dynamodb').update_item(
+            TableName=table_name,
+            Key={'artist_id': {'S': artist_id}},
+            UpdateExpression='SET ' + ', '.join(set_clauses),
+            ConditionExpression=f'attribute_exists(artist_id) AND ({" OR ".join(changed_conditions)})',
+            ExpressionAttributeValues=attribute_values,
+            ReturnConsumedCapacity='TOTAL',
+            ReturnValues='UPDATED_OLD',
+        )
+    except ClientError as err:
+        if err.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            log.debug(f'Releases of {artist_id} are unchanged. Nothing was written.')
+            return None
+        raise
+
+    log.debug(f'Returned response: {response}')
+    return deserialize_item(response.get('Attributes', {}))
+
+
+def backoff(attempt: int) -> None:
+    """
+    Sleeps with "full jitter" exponential backoff before retrying unprocessed work.
+    """
+
+    time.sleep(random.uniform(0, min(5.0, 0.05 * 2**attempt)))
+
+
+def projection_kwargs(projection: tuple[str, ...]) -> dict:
+    """
+    Builds the `ProjectionExpression` and its attribute name placeholders for a
+    list of (optionally nested, dot separated) attribute paths.
+    """
+
+    placeholders: dict[str, str] = {}
+    paths: list[str] = []
+    for path in projection:
+        paths.append('.'.join(placeholders.setdefault(name, f'#a{len(placeholders)}') for name in path.split('.')))
+
+    return {
+        'ProjectionExpression': ', '.join(paths),
+        'ExpressionAttributeNames': {placeholder: name for name, placeholder in placeholders.items()},
+    }
+
+
+def deserialize_item(item: dict) -> dict:
+    """
+    Converts a low-level DynamoDB item into plain Python values. Numbers come
+    back as `int` or `float` rather than `Decimal` so they stay JSON serializable.
+    """
+
+    deserializer = type_serializers()[1]
+    return {name: to_python(deserializer.deserialize(value)) for name, value in item.items()}
+
+
+def serialize_value(value) -> dict:
+    """
+    Converts a plain Python value (e.g. a `last_album_details` dict) into its
+    low-level DynamoDB representation.
+    """
+
+    return type_serializers()[0].serialize(value)
+
+
+@cache
+def type_serializers() -> tuple:
+    """
+    Creates boto3's DynamoDB type (de)serializers on first use. Importing them
+    at module scope would pull in all of boto3 during the cold start.
+    """
+
+    from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+    return TypeSerializer(), TypeDeserializer()
+
+
+def to_python(value):
+    """
+    Recursively swaps `Decimal`s for `int`s/`float`s and sets for lists.
+    """
+
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, dict):
+        return {key: to_python(nested_value) for key, nested_value in value.items()}
+    if isinstance(value, (list, set)):
+        return [to_python(nested_value) for nested_value in value]
+    return value
@@ -0,0 +1,171 @@
+import logging
+import os
+import random
+import statistics
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from botocore.exceptions import ClientError
+
+from .artist_table import deserialize_item, projection_kwargs
+from .clients import get_client
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+# Sparse GSI keyed on (`check_shard`, `next_check_at`). Only artists with a schedule are in it
+NEXT_CHECK_INDEX_NAME: str = os.getenv('NEXT_CHECK_INDEX_NAME', 'NextCheckIndex')
+
+# Artists are spread over this many index partitions, so no single partition gets hot
+CHECK_SHARDS: int = 10
+
+# Bounds on how long an artist can go between checks
+MIN_CHECK_INTERVAL_DAYS: float = 1.0
+MAX_CHECK_INTERVAL_DAYS: float = 28.0
+DEFAULT_CHECK_INTERVAL_DAYS: float = 7.0
+
+SECONDS_PER_DAY: int = 86400
+
+
+def check_shard(artist_id: str) -> int:
+    """
+    Maps an artist to a stable index partition.
+    """
+
+    return zlib.crc32(artist_id.encode()) % CHECK_SHARDS
+
+
+def release_cadence_days(release_dates: list[str]) -> float | None:
+    """
+    Returns the median number of days between the artist's releases, or None if
+    there are fewer than two distinct release dates to go on.
+    """
+
+    days: list[date] = sorted({parse_release_date(release_date) for release_date in release_dates if release_date})
+    if len(days) < 2:
+        return None
+    return float(statistics.median((later - earlier).days for earlier, later in zip(days, days[1:])))
+
+
+def next_check_at(cadence_days: float | None, last_release_date: str | None, now: float | None = None) -> int:
+    """
+    Computes when the artist should be checked next. Artists are checked about
+    four times per release cycle, and dormant ones (no release in two cycles)
+    as rarely as allowed. Up to 10% jitter keeps artists with the same cadence
+    from all coming due in the same run.
+    """
+
+    now = now or time.time()
+
+    if cadence_days is None:
+        interval_days: float = DEFAULT_CHECK_INTERVAL_DAYS
+    else:
+        interval_days = cadence_days / 4
+        if last_release_date:
+            days_since_release: int = (date.fromtimestamp(now) - parse_release_date(last_release_date)).days
+            if days_since_release > 2 * cadence_days:
+                interval_days = MAX_CHECK_INTERVAL_DAYS
+
+    interval_days = min(MAX_CHECK_INTERVAL_DAYS, max(MIN_CHECK_INTERVAL_DAYS, interval_days))
+    interval_days *= random.uniform(0.9, 1.1)
+    return int(now + interval_days * SECONDS_PER_DAY)
+
+
+def schedule_from_release_dates(release_dates: list[str], now: float | None = None) -> tuple[int, float | None]:
+    """
+    Works out the artist's release cadence from every release date we know of,
+    and returns when the artist should be checked next along with the cadence.
+    """
+
+    release_dates = [release_date for release_date in release_dates if release_date]
+    cadence_days: float | None = release_cadence_days(release_dates)
+    return next_check_at(cadence_days, max(release_dates, default=None), now), cadence_days
+
+
+def parse_release_date(release_date: str) -> date:
+    """
+    Parses a Spotify release date, which may only be precise to the year or month.
+    """
+
+    parts: list[int] = [int(part) for part in release_date.split('-')]
+    return date(parts[0], parts[1] if len(parts) > 1 else 1, parts[2] if len(parts) > 2 else 1)
+
+
+def query_due_artists(
+    table_name: str,
+    limit: int,
+    projection: tuple[str, ...] = ('artist_id', 'artist_name'),
+    now: float | None = None,
+) -> list[dict]:
+    """
+    Queries every shard of the next check index for artists whose `next_check_at`
+    has passed, and returns at most `limit` of them, most overdue first.
+    """
+
+    now = now or time.time()
+    per_shard_limit: int = max(1, -(-limit // CHECK_SHARDS))
+    names_and_projection: dict = projection_kwargs(tuple(dict.fromkeys((*projection, 'next_check_at'))))
+
+    def query_shard(shard: int) -> list[dict]:
+        paginator = get_client('dynamodb').get_paginator('query')
+        due_artists: list[dict] = []
+        for page in paginator.paginate(
+            TableName=table_name,
+            IndexName=NEXT_CHECK_INDEX_NAME,
+            KeyConditionExpression='#shard = :shard AND #next_check_at <= :now',
+            ExpressionAttributeNames={
+                **names_and_projection['ExpressionAttributeNames'],
+                '#shard': 'check_shard',
+                '#next_check_at': 'next_check_at',
+            },
+            ExpressionAttributeValues={':shard': {'N': str(shard)}, ':now': {'N': str(int(now))}},
+            ProjectionExpression=names_and_projection['ProjectionExpression'],
+            PaginationConfig={'MaxItems': per_shard_limit},
+        ):
+            due_artists.extend(deserialize_item(item) for item in page['Items'])
+        return due_artists
+
+    with ThreadPoolExecutor(max_workers=CHECK_SHARDS) as executor:
+        due_artists: list[dict] = [
+            artist for shard_artists in executor.map(query_shard, range(CHECK_SHARDS)) for artist in shard_artists
+        ]
+
+    # Each shard is already sorted by `next_check_at`, but the shards still have to be merged
+    due_artists.sort(key=lambda artist: artist['next_check_at'])
+    log.info(f'Found {len(due_artists)} artists due for a check in {table_name}.')
+    due_artists = due_artists[:limit]
+    if 'next_check_at' not in projection:
+        for artist in due_artists:
+            del artist['next_check_at']
+    return due_artists
+
+
+def set_check_schedule(table_name: str, artist_id: str, next_check: int, cadence_days: float | None) -> None:
+    """
+    Stores when the artist is due next (which also puts it in the sparse index)
+    and its observed release cadence.
+    """
+
+    update_expression: str = 'SET check_shard = :check_shard, next_check_at = :next_check_at'
+    attribute_values: dict = {
+        ':check_shard': {'N': str(check_shard(artist_id))},
+        ':next_check_at': {'N': str(next_check)},
+    }
+    if cadence_days is not None:
+        update_expression += ', release_cadence_days = :release_cadence_days'
+        attribute_values[':release_cadence_days'] = {'N': str(cadence_days)}
+
+    try:
+        get_client('dynamodb').update_item(
+            TableName=table_name,
+            Key={'artist_id': {'S': artist_id}},
+            UpdateExpression=update_expression,
+            ConditionExpression='attribute_exists(artist_id)',
+            ExpressionAttributeValues=attribute_values,
+        )
+    except ClientError as err:
+        if err.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        log.debug(f'{artist_id} is no longer being monitored. Not scheduling it.')
@@ -0,0 +1,158 @@
+import gzip
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from .clients import get_client
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+# Checkpoints only need to outlive the state machine execution that wrote them
+CHECKPOINT_TTL_SECONDS: int = 24 * 60 * 60
+
+# Records per checkpoint part. Keeps each gzipped part well below the 400 KB item size limit
+CHECKPOINT_PART_SIZE: int = 500
+
+
+def read_checkpoint(cache_table_name: str, scope: str) -> list[dict]:
+    """
+    Reads every record checkpointed under `scope` (e.g. a state machine
+    execution ID). Returns an empty list if nothing was checkpointed yet.
+    """
+
+    ddb = get_client('dynamodb')
+    response = ddb.get_item(
+        TableName=cache_table_name,
+        Key={'cache_key': {'S': manifest_key(scope)}},
+        ConsistentRead=True,
+    )
+
+    item: dict | None = response.get('Item')
+    if not item:
+        return []
+
+    def read_part(part_number: int) -> list[dict]:
+        part = ddb.get_item(
+            TableName=cache_table_name,
+            Key={'cache_key': {'S': part_key(scope, part_number)}},
+            ConsistentRead=True,
+        )
+        return decode_records(part['Item']['records']['B'])
+
+    part_count: int = int(item['part_count']['N'])
+    with ThreadPoolExecutor(max_workers=max(1, min(10, part_count))) as executor:
+        records: list[dict] = [record for part in executor.map(read_part, range(part_count)) for record in part]
+
+    log.info(f'Read {len(records)} checkpointed records from {part_count} part(s) of {scope}.')
+    return records
+
+
+def write_checkpoint(cache_table_name: str, scope: str, records: list[dict]) -> None:
+    """
+    Appends the records to the checkpoint under `scope`. Each batch of records
+    is written as new parts first, and only then counted in the manifest, so a
+    reader never sees a part that was only half written.
+    """
+
+    if not records:
+        return
+
+    ddb = get_client('dynamodb')
+    response = ddb.get_item(
+        TableName=cache_table_name,
+        Key={'cache_key': {'S': manifest_key(scope)}},
+        ConsistentRead=True,
+    )
+    part_count: int = int(response.get('Item', {}).get('part_count', {}).get('N', '0'))
+    expires_at: str = str(int(time.time()) + CHECKPOINT_TTL_SECONDS)
+
+    new_part_count: int = part_count
+    for index in range(0, len(records), CHECKPOINT_PART_SIZE):
+        ddb.put_item(
+            TableName=cache_table_name,
+            Item={
+                'cache_key': {'S': part_key(scope, new_part_count)},
+                'records': {'B': encode_records(records[index : index + CHECKPOINT_PART_SIZE])},
+                'expires_at': {'N': expires_at},
+            },
+        )
+        new_part_count += 1
+
+    try:
+        ddb.put_item(
+            TableName=cache_table_name,
+            Item={
+                'cache_key': {'S': manifest_key(scope)},
+                'part_count': {'N': str(new_part_count)},
+                'expires_at': {'N': expires_at},
+            },
+            ConditionExpression='attribute_not_exists(cache_key) OR part_count = :part_count',
+            ExpressionAttributeValues={':part_count': {'N': str(part_count)}},
+        )
+    except ClientError as err:
+        if err.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            raise Exception(f'Checkpoint {scope} was written to by another invocation.') from err
+        raise
+
+    log.info(f'Checkpointed {len(records)} records to {scope}. It now has {new_part_count} part(s).')
+
+
+def get_or_create_value(cache_table_name: str, scope: str, create) -> dict:
+    """
+    Returns the value stored under `scope`, or creates it with `create()` and
+    stores it. When several invocations race to create it (e.g. the chunks of a
+    Map state), the first write wins and every invocation returns that value.
+    """
+
+    ddb = get_client('dynamodb')
+    key: dict = {'cache_key': {'S': f'checkpoint_value#{scope}'}}
+
+    response = ddb.get_item(TableName=cache_table_name, Key=key, ConsistentRead=True)
+    if response.get('Item'):
+        return decode_records(response['Item']['value']['B'])
+
+    value: dict = create()
+    try:
+        ddb.put_item(
+            TableName=cache_table_name,
+            Item={
+                **key,
+                'value': {'B': encode_records(value)},
+                'expires_at': {'N': str(int(time.time()) + CHECKPOINT_TTL_SECONDS)},
+            },
+            ConditionExpression='attribute_not_exists(cache_key)',
+        )
+    except ClientError as err:
+        if err.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        response = ddb.get_item(TableName=cache_table_name, Key=key, ConsistentRead=True)
+        return decode_records(response['Item']['value']['B'])
+    return value
+
+
+def manifest_key(scope: str) -> str:
+    return f'checkpoint#{scope}'
+
+
+def part_key(scope: str, part_number: int) -> str:
+    return f'checkpoint#{scope}#{part_number}'
+
+
+def encode_records(records: list[dict] | dict) -> bytes:
+    """
+    Gzips the records as compact JSON.
+    """
+
+    return gzip.compress(json.dumps(records, separators=(',', ':')).encode())
+
+
+def decode_records(encoded_records: bytes):
+    """
+    Reverses `encode_records`.
+    """
+
+    return json.loads(gzip.decompress(encoded_records))
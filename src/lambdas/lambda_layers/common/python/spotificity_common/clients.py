@@ -0,0 +1,58 @@
+import logging
+import os
+import threading
+
+from .http_client import HttpSession
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+# Size connection pools to the handler's concurrency so worker threads never queue for a connection
+MAX_POOL_CONNECTIONS: int = int(os.getenv('MAX_CONCURRENT_REQUESTS', '10'))
+
+# Created lazily and then reused for the lifetime of the Lambda container
+_clients: dict = {}
+_http_session = None
+_lock = threading.Lock()
+
+
+def get_client(service_name: str):
+    """
+    Returns the container-wide boto3 client for `service_name`, creating it
+    on first use.
+    """
+
+    client = _clients.get(service_name)
+    if client is None:
+        # boto3's default session is not thread-safe, so client creation is serialized
+        with _lock:
+            client = _clients.get(service_name)
+            if client is None:
+                # Importing boto3 takes longer than anything else during a cold start, so it's only
+                # done once a handler actually needs a client
+                import boto3
+                from botocore.config import Config
+
+                log.debug(f'Creating {service_name} client...')
+                client = boto3.client(
+                    service_name,
+                    config=Config(max_pool_connections=MAX_POOL_CONNECTIONS, tcp_keepalive=True),
+                )
+                _clients[service_name] = client
+    return client
+
+
+def get_http_session():
+    """
+    Returns the container-wide HTTP session. Its pooled connections keep the TLS
+    connection to Spotify alive between calls and invocations.
+    """
+
+    global _http_session
+
+    if _http_session is None:
+        with _lock:
+            if _http_session is None:
+                log.debug('Creating HTTP session...')
+                _http_session = HttpSession(MAX_POOL_CONNECTIONS)
+    return _http_session
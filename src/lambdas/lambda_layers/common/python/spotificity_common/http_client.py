@@ -0,0 +1,118 @@
+import json
+import logging
+from urllib.parse import urlencode
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+# Seconds to wait for a connection to Spotify, and then for its response
+CONNECT_TIMEOUT_SECONDS: float = 5.0
+READ_TIMEOUT_SECONDS: float = 15.0
+
+
+class RequestException(Exception):
+    """
+    Base class of every error raised by `HttpSession`. As with `requests`, only
+    `HTTPError` means a response was received.
+    """
+
+    def __init__(self, message: str, response: 'HttpResponse | None' = None) -> None:
+        super().__init__(message)
+        self.response = response
+
+
+class HTTPError(RequestException):
+    """
+    Raised for 4xx/5xx responses. `response` is None if the request was given up
+    on without a final response (e.g. retries ran out).
+    """
+
+
+class ConnectionError(RequestException):
+    """
+    Raised when the connection to the server could not be made or was dropped.
+    """
+
+
+class Timeout(RequestException):
+    """
+    Raised when the server took too long to respond.
+    """
+
+
+class HttpResponse:
+    """
+    The handful of `requests.Response` features our Lambdas use, on top of a
+    `urllib3` response.
+    """
+
+    def __init__(self, url: str, status_code: int, headers, body: bytes) -> None:
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = body
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise HTTPError(f'{self.status_code} Error for url: {self.url}', response=self)
+
+
+class HttpSession:
+    """
+    Minimal HTTP client on top of the `urllib3` that already ships with botocore
+    in the Lambda runtime, so the Spotify Lambdas don't need the `requests` layer.
+    Its connection pool keeps the TLS connection to Spotify alive between calls
+    and invocations.
+    """
+
+    def __init__(self, max_pool_connections: int) -> None:
+        import urllib3
+
+        self._urllib3 = urllib3
+        self._pool_manager = urllib3.PoolManager(
+            num_pools=2,
+            maxsize=max_pool_connections,
+            block=False,
+            timeout=urllib3.Timeout(connect=CONNECT_TIMEOUT_SECONDS, read=READ_TIMEOUT_SECONDS),
+            retries=False,
+        )
+
+    def get(
+        self, url: str, params: dict | None = None, headers: dict | None = None, timeout: float | None = None
+    ) -> HttpResponse:
+        if params:
+            url = f'{url}?{urlencode(params)}'
+        return self.request('GET', url, headers=headers, timeout=timeout)
+
+    def post(self, url: str, data: dict | None = None, headers: dict | None = None) -> HttpResponse:
+        return self.request('POST', url, body=urlencode(data) if data else None, headers=headers)
+
+    def request(
+        self, method: str, url: str, body: str | None = None, headers: dict | None = None, timeout: float | None = None
+    ) -> HttpResponse:
+        """
+        Sends the request. `timeout` caps the seconds the whole request may take,
+        on top of the usual connect and read timeouts.
+        """
+
+        exceptions = self._urllib3.exceptions
+        request_timeout = self._urllib3.Timeout(total=timeout, connect=CONNECT_TIMEOUT_SECONDS, read=READ_TIMEOUT_SECONDS)
+        try:
+            response = self._pool_manager.request(method, url, body=body, headers=headers, timeout=request_timeout)
+        except (exceptions.NewConnectionError, exceptions.ProtocolError, exceptions.MaxRetryError) as err:
+            # Checked first, as some urllib3 versions subclass `NewConnectionError` from `ConnectTimeoutError`
+            raise ConnectionError(f'Connection to {url} failed: {err}') from err
+        except (exceptions.ConnectTimeoutError, exceptions.ReadTimeoutError) as err:
+            raise Timeout(f'Request to {url} timed out: {err}') from err
+        except exceptions.HTTPError as err:
+            # Every other `urllib3` error (e.g. `SSLError`, `ProxyError`, `DecodeError`) is still a failed request
+            raise ConnectionError(f'Request to {url} failed: {err}') from err
+
+        return HttpResponse(url, response.status, response.headers, response.data)
@@ -0,0 +1,34 @@
+import json
+import os
+import time
+
+# CloudWatch namespace every Spotificity metric is published under
+METRICS_NAMESPACE: str = os.getenv('METRICS_NAMESPACE', 'Spotificity')
+
+
+def emit_metrics(metrics: dict[str, float], dimensions: dict[str, str] | None = None, unit: str = 'Count') -> None:
+    """
+    Publishes metrics by printing them in CloudWatch Embedded Metric Format.
+    CloudWatch extracts them from the function's logs, so no `PutMetricData`
+    call is made on the request path.
+    """
+
+    dimensions = dimensions or {'FunctionName': os.getenv('AWS_LAMBDA_FUNCTION_NAME', 'local')}
+    print(
+        json.dumps(
+            {
+                '_aws': {
+                    'Timestamp': int(time.time() * 1000),
+                    'CloudWatchMetrics': [
+                        {
+                            'Namespace': METRICS_NAMESPACE,
+                            'Dimensions': [list(dimensions)],
+                            'Metrics': [{'Name': name, 'Unit': unit} for name in metrics],
+                        }
+                    ],
+                },
+                **dimensions,
+                **metrics,
+            }
+        )
+    )
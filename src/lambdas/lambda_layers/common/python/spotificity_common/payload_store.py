@@ -0,0 +1,95 @@
+import gzip
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+
+from .clients import get_client
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+# S3 bucket that holds payloads too big to pass through the state machine. Unset means payloads always stay inline
+PAYLOAD_BUCKET_NAME: str | None = os.getenv('PAYLOAD_BUCKET_NAME')
+
+# Budget for a whole state, not just one payload in it. Step Functions caps a state at 256 KB
+CLAIM_CHECK_THRESHOLD_BYTES: int = int(os.getenv('CLAIM_CHECK_THRESHOLD_BYTES', '200000'))
+
+# Uploads are buffered in memory up to this size before spilling to /tmp
+SPOOL_MAX_BYTES: int = 8 * 1024 * 1024
+
+
+def is_over_threshold(records: list, carried_bytes: int = 0) -> bool:
+    """
+    Returns True if claim checks are enabled and the records, on top of the
+    `carried_bytes` the state already holds (e.g. the task's own input when it
+    is kept with `ResultPath`), are too big to be passed through the state
+    machine inline.
+    """
+
+    if not PAYLOAD_BUCKET_NAME:
+        return False
+    return payload_size(records) + carried_bytes > CLAIM_CHECK_THRESHOLD_BYTES
+
+
+def payload_size(payload) -> int:
+    """
+    Returns the size of the payload once serialized into the state.
+    """
+
+    return len(json.dumps(payload, separators=(',', ':')).encode())
+
+
+def store_records(records: list, name: str, offload: bool | None = None) -> list | dict:
+    """
+    Returns the records themselves if they are small enough to pass inline.
+    Otherwise writes them to S3 as gzipped NDJSON and returns a claim check
+    pointing at the object. `offload` overrides the threshold check.
+    """
+
+    if offload is None:
+        offload = is_over_threshold(records)
+    if not offload or not PAYLOAD_BUCKET_NAME:
+        return records
+
+    key: str = f'claim-checks/{time.strftime("%Y-%m-%d")}/{uuid.uuid4()}-{name}.ndjson.gz'
+
+    # Compress one record at a time, so the whole payload is never held in memory as one string
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+        with gzip.GzipFile(fileobj=spool, mode='wb') as gzip_file:
+            for record in records:
+                gzip_file.write(json.dumps(record, separators=(',', ':')).encode() + b'\n')
+
+        spool.seek(0)
+        get_client('s3').upload_fileobj(spool, PAYLOAD_BUCKET_NAME, key)
+
+    log.info(f'Offloaded {len(records)} {name} records to s3://{PAYLOAD_BUCKET_NAME}/{key}.')
+    return {'claim_check': {'bucket': PAYLOAD_BUCKET_NAME, 'key': key, 'count': len(records)}}
+
+
+def load_records(payload: list | dict) -> list:
+    """
+    Returns the records of an inline payload or of a claim check written by
+    `store_records`. Claim checked objects are decompressed and parsed as
+    they stream in from S3.
+    """
+
+    if not is_claim_check(payload):
+        return payload
+
+    claim_check: dict = payload['claim_check']
+    log.info(f'Loading {claim_check["count"]} records from s3://{claim_check["bucket"]}/{claim_check["key"]}...')
+
+    response = get_client('s3').get_object(Bucket=claim_check['bucket'], Key=claim_check['key'])
+    with gzip.GzipFile(fileobj=response['Body'], mode='rb') as gzip_file:
+        return [json.loads(line) for line in gzip_file if line.strip()]
+
+
+def is_claim_check(payload) -> bool:
+    """
+    Returns True if the payload is a claim check rather than inline records.
+    """
+
+    return isinstance(payload, dict) and 'claim_check' in payload
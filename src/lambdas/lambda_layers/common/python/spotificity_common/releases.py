@@ -0,0 +1,258 @@
+import logging
+
+from .http_client import HTTPError
+from .spotify_client import get_spotify_client
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+# Spotify caps the page size of the artist albums API at 50
+RELEASES_PAGE_LIMIT: int = 50
+
+# Most pages walked per release group while catching up on an artist's releases
+MAX_SYNC_PAGES: int = 4
+
+RELEASE_TYPES: tuple[str, ...] = ('album', 'single')
+
+# Most pages of Spotify's new releases feed walked per run
+NEW_RELEASES_FEED_MAX_PAGES: int = 4
+
+
+def get_latest_releases(artist_id: str, artist_name: str, access_token: str) -> tuple[dict, dict]:
+    """
+    Queries the Spotify API once for both the albums and singles released by
+    the artist, and returns the details of the newest album and newest single.
+    """
+
+    endpoint: str = f'https://api.spotify.com/v1/artists/{artist_id}/albums'
+
+    try:
+        log.info(f'Initiating GET request for the {artist_name}\'s latest albums and singles...')
+
+        response = get_spotify_client().get(
+            endpoint,
+            access_token,
+            params={'limit': RELEASES_PAGE_LIMIT, 'offset': 0, 'include_groups': 'album,single', 'market': 'US'},
+        )
+    except HTTPError as err:
+        log.error(f'HTTP Error occurred: {err}')
+        raise
+    else:
+        log.debug(f'Returned payload: {response.json()}')
+        log.debug('Parsing returned payload...')
+        release_search_results: dict = response.json()
+
+        # Catch any errors that may occur when searching for the latest releases
+        if release_search_results.get('error'):
+            log.error(f'Error occurred: {release_search_results["error"]}')
+            raise Exception(f'Error occurred: {release_search_results["error"]}')
+
+        newest_releases: dict = pick_newest_releases(release_search_results['items'])
+
+        # Spotify lists every album before any single, so an artist with a long discography can push
+        # a group past the first page. Only then do we fall back to a dedicated request for that group.
+        last_details: dict = {}
+        for release_type in ('album', 'single'):
+            if newest_releases[release_type] is None and release_search_results.get('next'):
+                last_details[release_type] = get_latest_release(artist_id, artist_name, access_token, release_type)
+            else:
+                last_details[release_type] = format_release_details(newest_releases[release_type], release_type, artist_name)
+
+        log.info('Successfully retrieved last album and last single details.')
+        return last_details['album'], last_details['single']
+
+
+def get_latest_release(artist_id: str, artist_name: str, access_token: str, release_type: str) -> dict:
+    """
+    Queries the Spotify API to return the last album or single (`release_type`)
+    released by the artist.
+    """
+
+    endpoint: str = f'https://api.spotify.com/v1/artists/{artist_id}/albums'
+
+    try:
+        log.info(f'Initiating GET request for the {artist_name}\'s last {release_type}...')
+
+        response = get_spotify_client().get(
+            endpoint,
+            access_token,
+            params={'limit': 1, 'offset': 0, 'include_groups': release_type, 'market': 'US'},
+        )
+    except HTTPError as err:
+        log.error(f'HTTP Error occurred: {err}')
+        raise
+    else:
+        log.debug(f'Returned payload: {response.json()}')
+        log.debug('Parsing returned payload...')
+        release_search_results: dict = response.json()
+
+        # Catch any errors that may occur when searching for the last release
+        if release_search_results.get('error'):
+            log.error(f'Error occurred: {release_search_results["error"]}')
+            raise Exception(f'Error occurred: {release_search_results["error"]}')
+
+        last_release: dict | None = release_search_results['items'][0] if release_search_results['items'] else None
+        return format_release_details(last_release, release_type, artist_name)
+
+
+def get_releases_since(artist_id: str, artist_name: str, access_token: str, last_seen: dict[str, dict]) -> dict[str, list]:
+    """
+    Pages through the artist's albums and singles newest-first and stops each
+    group as soon as it reaches the last seen release (`last_seen[<type>]` holds
+    its `id` and `release_date`). Returns every newer release per group, newest
+    first. A group without a last seen ID only returns its newest release.
+
+    When nothing is new, the first page already reaches both last seen releases,
+    so the common case stays at one request per artist.
+    """
+
+    new_releases: dict[str, list] = {release_type: [] for release_type in RELEASE_TYPES}
+    seen_ids: set[str] = set()
+    pending: set[str] = set(RELEASE_TYPES)
+
+    def consume(releases: list[dict]) -> None:
+        for release in releases:
+            group: str = release.get('album_group') or release['album_type']
+            if group not in pending or release['id'] in seen_ids:
+                continue
+            seen_ids.add(release['id'])
+
+            last_seen_id: str | None = last_seen.get(group, {}).get('id')
+            if last_seen_id is not None and (
+                release['id'] == last_seen_id or release['release_date'] < last_seen[group].get('release_date', '')
+            ):
+                pending.discard(group)
+                continue
+
+            new_releases[group].append(release)
+            if last_seen_id is None:
+                pending.discard(group)
+
+    page: dict = request_releases_page(artist_id, artist_name, access_token, ','.join(RELEASE_TYPES), 0)
+    consume(page['items'])
+
+    # Either a group was pushed past the first page, or there are a lot of new releases. Walk that group on its own
+    if pending and page.get('next'):
+        for release_type in sorted(pending):
+            for page_number in range(MAX_SYNC_PAGES):
+                page = request_releases_page(
+                    artist_id, artist_name, access_token, release_type, page_number * RELEASES_PAGE_LIMIT
+                )
+                consume(page['items'])
+                if release_type not in pending or not page.get('next'):
+                    break
+
+    for releases in new_releases.values():
+        releases.sort(key=lambda release: release['release_date'], reverse=True)
+    return new_releases
+
+
+def request_releases_page(artist_id: str, artist_name: str, access_token: str, include_groups: str, offset: int) -> dict:
+    """
+    Queries the Spotify API for one page of the artist's releases in `include_groups`.
+    """
+
+    endpoint: str = f'https://api.spotify.com/v1/artists/{artist_id}/albums'
+
+    try:
+        log.info(f'Initiating GET request for page {offset // RELEASES_PAGE_LIMIT + 1} of {artist_name}\'s {include_groups}s...')
+
+        response = get_spotify_client().get(
+            endpoint,
+            access_token,
+            params={'limit': RELEASES_PAGE_LIMIT, 'offset': offset, 'include_groups': include_groups, 'market': 'US'},
+        )
+    except HTTPError as err:
+        log.error(f'HTTP Error occurred: {err}')
+        raise
+    else:
+        release_search_results: dict = response.json()
+
+        # Catch any errors that may occur when searching for the releases
+        if release_search_results.get('error'):
+            log.error(f'Error occurred: {release_search_results["error"]}')
+            raise Exception(f'Error occurred: {release_search_results["error"]}')
+
+        return release_search_results
+
+
+def get_new_releases_feed(access_token: str, released_since: str) -> tuple[list[dict], int]:
+    """
+    Pages through Spotify's new releases feed and returns every release dated
+    `released_since` (YYYY-MM-DD) or later, plus the number of requests it took.
+    """
+
+    endpoint: str = 'https://api.spotify.com/v1/browse/new-releases'
+    new_releases: list[dict] = []
+    request_count: int = 0
+
+    for page_number in range(NEW_RELEASES_FEED_MAX_PAGES):
+        try:
+            log.info(f'Initiating GET request for page {page_number + 1} of the new releases feed...')
+
+            response = get_spotify_client().get(
+                endpoint,
+                access_token,
+                params={'limit': RELEASES_PAGE_LIMIT, 'offset': page_number * RELEASES_PAGE_LIMIT, 'country': 'US'},
+            )
+            request_count += 1
+        except HTTPError as err:
+            log.error(f'HTTP Error occurred: {err}')
+            raise
+
+        page: dict = response.json()['albums']
+        new_releases.extend(release for release in page['items'] if release['release_date'] >= released_since)
+        if not page.get('next'):
+            break
+
+    return new_releases, request_count
+
+
+def compact_release(release: dict, release_type: str) -> dict:
+    """
+    Shrinks a Spotify album object down to the fields kept in an artist's release history.
+    """
+
+    return {'id': release['id'], 'name': release['name'], 'release_date': release['release_date'], 'type': release_type}
+
+
+def pick_newest_releases(releases: list[dict]) -> dict:
+    """
+    Picks the newest album and newest single out of a combined list of releases.
+    Ties on release date keep whichever one Spotify listed first.
+    """
+
+    newest_releases: dict = {'album': None, 'single': None}
+    for release in releases:
+        group: str = release.get('album_group') or release['album_type']
+        if group not in newest_releases:
+            continue
+
+        current_newest: dict | None = newest_releases[group]
+        if current_newest is None or release['release_date'] > current_newest['release_date']:
+            newest_releases[group] = release
+
+    return newest_releases
+
+
+def format_release_details(release: dict | None, release_type: str, artist_name: str) -> dict:
+    """
+    Formats a Spotify album object into the `last_album_details` or
+    `last_single_details` shape. Returns empty details if there is no release.
+    """
+
+    if release is None:
+        log.warning(f'No {release_type}s found for {artist_name}. Returning empty details.')
+        return {
+            f'last_{release_type}_id': '',
+            f'last_{release_type}_name': '',
+            f'last_{release_type}_release_date': '',
+            f'last_{release_type}_artists': [],
+        }
+
+    return {
+        f'last_{release_type}_id': release['id'],
+        f'last_{release_type}_name': release['name'],
+        f'last_{release_type}_release_date': release['release_date'],
+        f'last_{release_type}_artists': [artist['name'] for artist in release['artists']],
+    }
@@ -0,0 +1,81 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+from .clients import get_client
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+# How long a secret is trusted before it is pulled from Secrets Manager again
+SECRET_CACHE_TTL_SECONDS: int = int(os.getenv('SECRET_CACHE_TTL_SECONDS', '3600'))
+
+
+class SecretCache:
+    """
+    In-process cache for AWS Secrets Manager secrets. Secrets are cached per
+    secret ID and version stage, so warm Lambda invocations don't pay for a
+    `GetSecretValue` call until the TTL runs out or a refresh is forced.
+    """
+
+    def __init__(self, ttl_seconds: int = SECRET_CACHE_TTL_SECONDS) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._secrets: dict[tuple[str, str], tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def get_secret_string(self, secret_id: str, version_stage: str = 'AWSCURRENT', force_refresh: bool = False) -> str:
+        """
+        Returns the secret's `SecretString`, fetching it only if it isn't cached,
+        has expired, or `force_refresh` is set (e.g. after the secret was rejected).
+        """
+
+        cache_key = (secret_id, version_stage)
+
+        # Holding the lock while fetching keeps concurrent callers from all fetching the same secret
+        with self._lock:
+            cached_secret = self._secrets.get(cache_key)
+            if cached_secret and not force_refresh and time.monotonic() < cached_secret[0]:
+                log.debug(f'Using cached value of {secret_id} ({version_stage}).')
+                return cached_secret[1]
+
+            secret_string = self._fetch_secret_string(secret_id, version_stage)
+            self._secrets[cache_key] = (time.monotonic() + self.ttl_seconds, secret_string)
+            return secret_string
+
+    def get_secret_json(self, secret_id: str, version_stage: str = 'AWSCURRENT', force_refresh: bool = False) -> dict:
+        """
+        Returns the secret's `SecretString` parsed as JSON.
+        """
+
+        return json.loads(self.get_secret_string(secret_id, version_stage, force_refresh))
+
+    def invalidate(self, secret_id: str) -> None:
+        """
+        Drops every cached version stage of the secret.
+        """
+
+        with self._lock:
+            for cache_key in [cache_key for cache_key in self._secrets if cache_key[0] == secret_id]:
+                del self._secrets[cache_key]
+
+    def _fetch_secret_string(self, secret_id: str, version_stage: str) -> str:
+        try:
+            log.info(f'Attempting to pull {secret_id} ({version_stage}) from AWS Secrets Manager...')
+            ssm = get_client('secretsmanager')
+
+            response = ssm.get_secret_value(SecretId=secret_id, VersionStage=version_stage)
+        except ClientError as err:
+            log.error(f'Client Error Message: {err.response["Error"]["Message"]}')
+            log.error(f'Client Error Code: {err.response["Error"]["Code"]}')
+            raise
+        else:
+            log.info(f'Successfully retrieved {secret_id} from AWS Secrets Manager.')
+            return response['SecretString']
+
+
+# Shared by every handler in the container so cached secrets survive between invocations
+secret_cache = SecretCache()
@@ -0,0 +1,205 @@
+import logging
+import os
+import random
+import threading
+import time
+
+from .clients import get_http_session
+from .http_client import ConnectionError, HTTPError, Timeout
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+# Most requests the client will ever have in flight at once
+MAX_CONCURRENT_REQUESTS: int = int(os.getenv('MAX_CONCURRENT_REQUESTS', '10'))
+
+# Retry tuning for throttled (429), failed (5xx) and dropped requests
+MAX_RETRIES: int = int(os.getenv('SPOTIFY_MAX_RETRIES', '5'))
+BASE_BACKOFF_SECONDS: float = 0.5
+MAX_BACKOFF_SECONDS: float = 30.0
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised instead of sending or retrying a request that couldn't finish before the client's deadline.
+    """
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Caps how many requests are in flight at once. The cap is halved every time
+    Spotify throttles us and grows back by one after a run of successful requests,
+    so big batches settle at the highest throughput Spotify allows.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, successes_before_increase: int = 10) -> None:
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.successes_before_increase = successes_before_increase
+        self.limit = self.max_limit
+        self._in_flight = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def __enter__(self) -> 'AdaptiveConcurrencyLimiter':
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+
+    def on_success(self) -> None:
+        with self._condition:
+            self._successes += 1
+            if self._successes >= self.successes_before_increase and self.limit < self.max_limit:
+                self.limit += 1
+                self._successes = 0
+                log.debug(f'Raised Spotify concurrency limit to {self.limit}.')
+                self._condition.notify()
+
+    def on_throttle(self) -> None:
+        with self._condition:
+            self._successes = 0
+            if self.limit > self.min_limit:
+                self.limit = max(self.min_limit, self.limit // 2)
+                log.warning(f'Lowered Spotify concurrency limit to {self.limit}.')
+
+
+class SpotifyClient:
+    """
+    Thin client for the Spotify Web API that retries throttled and failed
+    requests instead of failing the whole run. A 429 pauses every caller until
+    `Retry-After` has passed and shrinks the concurrency limit. 5xx responses and
+    dropped connections are retried with jittered exponential backoff.
+
+    With a `deadline` (a `time.monotonic()` timestamp) set, no request runs past
+    it and no backoff sleeps past it. `DeadlineExceeded` is raised instead.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENT_REQUESTS, max_retries: int = MAX_RETRIES) -> None:
+        self.max_retries = max_retries
+        self.limiter = AdaptiveConcurrencyLimiter(max_concurrency)
+        self.deadline: float | None = None
+        self._resume_at: float = 0.0
+        self._stats: dict = {'requests': 0, 'retries': 0, 'throttles': 0, 'throttle_seconds': 0.0}
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> dict:
+        """
+        Returns a snapshot of the request, retry and throttle counters.
+        """
+
+        with self._lock:
+            return dict(self._stats, concurrency_limit=self.limiter.limit)
+
+    def get(self, url: str, access_token: str, params: dict | None = None):
+        """
+        Sends a GET request to the Spotify API and returns the response. Raises
+        `HTTPError` once the request has failed `max_retries` times in a row.
+        """
+
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_throttle_to_lift()
+
+            try:
+                with self.limiter:
+                    self._count('requests')
+                    response = get_http_session().get(
+                        url=url,
+                        params=params,
+                        headers={'Authorization': f'Bearer {access_token}'},
+                        timeout=self._time_left(url),
+                    )
+            except (ConnectionError, Timeout) as err:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+                log.warning(f'Request to {url} failed ({err}). Retrying in {delay:.2f}s...')
+            else:
+                if response.status_code == 429:
+                    self.limiter.on_throttle()
+                    delay = self._retry_after_delay(response, attempt)
+                    self._throttle_for(delay)
+                    log.warning(f'Spotify throttled request to {url}. Retrying in {delay:.2f}s...')
+                elif response.status_code >= 500:
+                    delay = self._backoff_delay(attempt)
+                    log.warning(f'Spotify returned {response.status_code} for {url}. Retrying in {delay:.2f}s...')
+                else:
+                    self.limiter.on_success()
+                    response.raise_for_status()
+                    return response
+
+                if attempt == self.max_retries:
+                    response.raise_for_status()
+
+            self._count('retries')
+            self._sleep(delay, url)
+
+        raise HTTPError(f'Exhausted retries for {url}')
+
+    def _wait_for_throttle_to_lift(self) -> None:
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            self._sleep(delay)
+
+    def _time_left(self, url: str | None = None) -> float | None:
+        if self.deadline is None:
+            return None
+        time_left = self.deadline - time.monotonic()
+        if time_left <= 0:
+            raise DeadlineExceeded(f'No time left to request {url}.')
+        return time_left
+
+    def _sleep(self, delay: float, url: str | None = None) -> None:
+        time_left = self._time_left(url)
+        if time_left is not None and delay >= time_left:
+            raise DeadlineExceeded(f'No time left to wait {delay:.2f}s before requesting {url}.')
+        time.sleep(delay)
+
+    def _throttle_for(self, delay: float) -> None:
+        with self._lock:
+            self._stats['throttles'] += 1
+            self._stats['throttle_seconds'] += delay
+            self._resume_at = max(self._resume_at, time.monotonic() + delay)
+
+    def _retry_after_delay(self, response, attempt: int) -> float:
+        retry_after = response.headers.get('Retry-After')
+        try:
+            # A long ban would otherwise park every worker until the Lambda times out. Capped, the retries
+            # run out and the run fails instead. Spread retries out a little so every waiting thread doesn't
+            # fire at the same instant
+            return min(MAX_BACKOFF_SECONDS, float(retry_after)) + random.uniform(0, BASE_BACKOFF_SECONDS)
+        except (TypeError, ValueError):
+            return self._backoff_delay(attempt)
+
+    def _backoff_delay(self, attempt: int) -> float:
+        # "Full jitter" exponential backoff
+        return random.uniform(0, min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2**attempt))
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+
+_spotify_client: SpotifyClient | None = None
+_spotify_client_lock = threading.Lock()
+
+
+def get_spotify_client() -> SpotifyClient:
+    """
+    Returns the container-wide Spotify client, creating it on first use.
+    """
+
+    global _spotify_client
+
+    if _spotify_client is None:
+        with _spotify_client_lock:
+            if _spotify_client is None:
+                _spotify_client = SpotifyClient()
+    return _spotify_client
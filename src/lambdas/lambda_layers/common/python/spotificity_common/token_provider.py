@@ -0,0 +1,300 @@
+import base64
+import logging
+import os
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+from .clients import get_client, get_http_session
+from .http_client import HTTPError
+from .secret_cache import secret_cache
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+# DynamoDB table that shares the token between containers. Unset means in-memory caching only
+CACHE_TABLE_NAME: str | None = os.getenv('CACHE_TABLE_NAME')
+TOKEN_CACHE_KEY: str = 'spotify_access_token'
+
+# Treat the token as expired this many seconds before Spotify says it is
+EXPIRY_SAFETY_MARGIN_SECONDS: int = 60
+
+# Once the token is this close to expiring, refresh it in the background while still handing out the current one
+EARLY_REFRESH_SECONDS: int = 300
+
+# How long one container may hold the refresh lease before another container is allowed to take over
+REFRESH_LEASE_SECONDS: int = 10
+
+# Warm containers keep the last token in memory between invocations
+_cached_token: dict = {}
+_refresh_lock = threading.Lock()
+_background_refresh_lock = threading.Lock()
+_background_refresh: threading.Thread | None = None
+
+
+def get_access_token() -> str:
+    """
+    Returns a Spotify access token. Prefers the copy held in memory, then the copy
+    shared through the cache table, and only requests a new token from Spotify
+    when neither of those is still valid.
+    """
+
+    access_token: str | None = usable_access_token(_cached_token)
+    if access_token:
+        log.info('Using access token cached in memory.')
+        refresh_in_background_if_due()
+        return access_token
+
+    with _refresh_lock:
+        # Another thread may have refreshed the token while we were waiting on the lock
+        access_token = usable_access_token(_cached_token)
+        if access_token:
+            return access_token
+
+        shared_token: dict | None = read_shared_token()
+        if usable_access_token(shared_token):
+            log.info('Using access token shared through the cache table.')
+            _cached_token.clear()
+            _cached_token.update(shared_token)
+            refresh_in_background_if_due()
+            return _cached_token['access_token']
+
+        return refresh_token()
+
+
+def usable_access_token(token: dict | None) -> str | None:
+    """
+    Returns the access token if it is still valid once the safety margin is
+    taken into account. Otherwise returns None.
+    """
+
+    if not token or time.time() >= token['expires_at'] - EXPIRY_SAFETY_MARGIN_SECONDS:
+        return None
+    return token['access_token']
+
+
+def refresh_in_background_if_due() -> None:
+    """
+    Kicks off a background refresh once the cached token enters the early refresh
+    window, so callers never have to wait on Spotify for a new token.
+    """
+
+    global _background_refresh
+
+    if time.time() < _cached_token['expires_at'] - EARLY_REFRESH_SECONDS:
+        return
+
+    with _background_refresh_lock:
+        if _background_refresh is not None and _background_refresh.is_alive():
+            return
+
+        log.info('Access token is close to expiring. Refreshing it in the background...')
+        _background_refresh = threading.Thread(target=refresh_token_quietly, daemon=True)
+        _background_refresh.start()
+
+
+def refresh_token_quietly() -> None:
+    """
+    Background variant of `refresh_token`. Does nothing if a refresh is already
+    underway, and only logs failures since the current token is still valid.
+    """
+
+    if not _refresh_lock.acquire(blocking=False):
+        return
+
+    try:
+        # Some other container may have already refreshed the shared token
+        shared_token: dict | None = read_shared_token()
+        if shared_token and shared_token['expires_at'] - EARLY_REFRESH_SECONDS > time.time():
+            _cached_token.clear()
+            _cached_token.update(shared_token)
+            return
+
+        refresh_token()
+    except Exception as err:
+        log.warning(f'Background refresh of the access token failed: {err}')
+    finally:
+        _refresh_lock.release()
+
+
+def refresh_token() -> str:
+    """
+    Requests a new access token from Spotify and caches it in memory and in the
+    cache table. Only the container holding the refresh lease calls Spotify. Every
+    other container waits for that one to publish the new token.
+
+    Callers must hold `_refresh_lock`.
+    """
+
+    if CACHE_TABLE_NAME and not acquire_refresh_lease():
+        log.info('Another container is already refreshing the access token. Waiting for it...')
+        shared_token: dict | None = wait_for_shared_token()
+        if shared_token:
+            _cached_token.clear()
+            _cached_token.update(shared_token)
+            return shared_token['access_token']
+        log.warning('Timed out waiting for the shared access token. Requesting one directly.')
+
+    client_id, client_secret = get_client_credentials()
+
+    # Request access token
+    log.debug("Entering request_token function...")
+    try:
+        token_payload: dict = request_token(client_id, client_secret)
+    except HTTPError as err:
+        # The client credentials may have been rotated since we cached them. Pull them again and retry once
+        if err.response is None or err.response.status_code not in (400, 401):
+            raise
+        log.warning('Spotify rejected the cached client credentials. Refreshing them and retrying...')
+        client_id, client_secret = get_client_credentials(force_refresh=True)
+        token_payload = request_token(client_id, client_secret)
+
+    token: dict = {
+        'access_token': token_payload['access_token'],
+        'expires_at': int(time.time()) + int(token_payload.get('expires_in', 3600)),
+    }
+    _cached_token.clear()
+    _cached_token.update(token)
+
+    if CACHE_TABLE_NAME:
+        write_shared_token(token)
+    return token['access_token']
+
+
+def get_client_credentials(force_refresh: bool = False) -> tuple[str, str]:
+    """
+    Returns the Spotify client ID and client secret stored in AWS Secrets Manager.
+    Warm containers reuse the cached secret unless `force_refresh` is set.
+    """
+
+    client_creds: dict = secret_cache.get_secret_json('SpotifySecrets', force_refresh=force_refresh)
+    return client_creds['SPOTIFY_CLIENT_ID'], client_creds['SPOTIFY_CLIENT_SECRET']
+
+
+def read_shared_token() -> dict | None:
+    """
+    Reads the access token shared through the cache table. Returns None if there
+    is no table, no token, or the read fails.
+    """
+
+    if not CACHE_TABLE_NAME:
+        return None
+
+    try:
+        ddb = get_client('dynamodb')
+        response = ddb.get_item(
+            TableName=CACHE_TABLE_NAME,
+            Key={'cache_key': {'S': TOKEN_CACHE_KEY}},
+            ConsistentRead=True,
+        )
+    except ClientError as err:
+        log.warning(f'Could not read the shared access token: {err.response["Error"]["Message"]}')
+        return None
+
+    item: dict | None = response.get('Item')
+    if not item or 'access_token' not in item:
+        return None
+    return {'access_token': item['access_token']['S'], 'expires_at': int(item['expires_at']['N'])}
+
+
+def write_shared_token(token: dict) -> None:
+    """
+    Publishes the access token to the cache table and releases the refresh lease.
+    `expires_at` doubles as the table's TTL attribute, so stale tokens clean themselves up.
+    """
+
+    try:
+        ddb = get_client('dynamodb')
+        ddb.update_item(
+            TableName=CACHE_TABLE_NAME,
+            Key={'cache_key': {'S': TOKEN_CACHE_KEY}},
+            UpdateExpression='SET access_token = :access_token, expires_at = :expires_at REMOVE lease_expires_at',
+            ExpressionAttributeValues={
+                ':access_token': {'S': token['access_token']},
+                ':expires_at': {'N': str(token['expires_at'])},
+            },
+        )
+    except ClientError as err:
+        log.warning(f'Could not share the access token: {err.response["Error"]["Message"]}')
+
+
+def acquire_refresh_lease() -> bool:
+    """
+    Tries to take the short-lived lease that allows one container to request a
+    new token from Spotify. This keeps a burst of containers that all see the
+    token expire at once from stampeding the Spotify `/token/` API.
+    """
+
+    now = int(time.time())
+    try:
+        ddb = get_client('dynamodb')
+        ddb.update_item(
+            TableName=CACHE_TABLE_NAME,
+            Key={'cache_key': {'S': TOKEN_CACHE_KEY}},
+            UpdateExpression='SET lease_expires_at = :lease_expires_at',
+            ConditionExpression='attribute_not_exists(lease_expires_at) OR lease_expires_at < :now',
+            ExpressionAttributeValues={
+                ':lease_expires_at': {'N': str(now + REFRESH_LEASE_SECONDS)},
+                ':now': {'N': str(now)},
+            },
+        )
+    except ClientError as err:
+        if err.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+
+        # If the lease can't be taken for any other reason, refresh anyway rather than fail the caller
+        log.warning(f'Could not take the refresh lease: {err.response["Error"]["Message"]}')
+    return True
+
+
+def wait_for_shared_token() -> dict | None:
+    """
+    Polls the cache table until the container holding the refresh lease publishes
+    a usable token, or the lease runs out.
+    """
+
+    deadline = time.time() + REFRESH_LEASE_SECONDS
+    while time.time() < deadline:
+        time.sleep(0.25)
+        shared_token: dict | None = read_shared_token()
+        if usable_access_token(shared_token):
+            return shared_token
+    return None
+
+
+def request_token(client_id: str, client_secret: str) -> dict:
+    """
+    Sends POST request to Spotify Token API to get an access token. Returns the
+    token payload, which includes the `access_token` and its `expires_in` seconds.
+    """
+
+    client_creds: str = f'{client_id}:{client_secret}'
+    endpoint: str = 'https://accounts.spotify.com/api/token'
+
+    try:
+        log.info("Initiating POST request for Access Token...")
+
+        response = get_http_session().post(
+            url=endpoint,
+            headers={
+                # Encode the client credentials to base64
+                'Authorization': f'Basic {base64.b64encode(client_creds.encode()).decode()}',
+                'Content-Type': 'application/x-www-form-urlencoded',
+            },
+            data={'grant_type': 'client_credentials'},
+        )
+        response.raise_for_status()
+    except HTTPError as err:
+        log.error(f'HTTP Error occurred: {err}')
+        raise
+    else:
+        log.info(f'Successfully received response from Spotify Token API. HTTP Status code: {response.status_code}')
+
+        # Check if error occurred while attempting to retrieve access token. If not, return token
+        if response.json().get('error'):
+            log.error(f'Unsuccessful response from Spotify Token API. Error: {response.json()["error"]}')
+            raise Exception(f'Error: {response.json()["error"]}')
+        else:
+            log.debug("Exiting request_token function...")
+            return response.json()
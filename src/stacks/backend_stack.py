@@ -1,6 +1,6 @@
 from aws_cdk import Stack
 from aws_cdk.aws_dynamodb import TableV2
-from aws_cdk.aws_lambda import Code, LayerVersion, Runtime
+from aws_cdk.aws_lambda import LayerVersion, Runtime
 from constructs import Construct
 
 from ..constants import AwsAccount
@@ -8,25 +8,42 @@ from ..custom_constructs.api_gateway import ApiGatewayConstruct
 from ..custom_constructs.notifier import NotifierConstruct
 from ..custom_constructs.spotify_operators import CoreSpotifyOperatorsConstruct
 from ..custom_constructs.table_operators import CoreTableOperatorsConstruct
+from ..helpers.helpers import layer_code
 
 
 class BackendStack(Stack):
-    def __init__(self, scope: Construct, id: str, account: AwsAccount, artist_table: TableV2, **kwargs) -> None:
+    def __init__(
+        self,
+        scope: Construct,
+        id: str,
+        account: AwsAccount,
+        artist_table: TableV2,
+        cache_table: TableV2,
+        adaptive_schedule: bool = False,
+        **kwargs,
+    ) -> None:
         super().__init__(scope, id, **kwargs)
 
-        # Lambda layer that bundles `requests` module
-        requests_layer = LayerVersion(
+        # Lambda layer that bundles the helpers shared across our Lambdas (`spotificity_common`)
+        common_layer = LayerVersion(
             self,
-            'RequestsLayer',
-            code=Code.from_asset('src/lambdas/lambda_layers/requests_v2-31-0.zip'),
-            layer_version_name='Requests_v2-31-0',
-            description='Bundles the "requests" module.',
+            'CommonLayer',
+            code=layer_code('src/lambdas/lambda_layers/common'),
+            layer_version_name='SpotificityCommon',
+            description='Bundles the "spotificity_common" helpers shared across Lambdas.',
             compatible_runtimes=[Runtime.PYTHON_3_12],
         )
 
         # Custom construct with setter, getter, and deleter Lambda functions
         # for manipulating DynamoDB table
-        table_operators = CoreTableOperatorsConstruct(self, 'TableManipulatorsConstruct', account, artist_table=artist_table)
+        table_operators = CoreTableOperatorsConstruct(
+            self,
+            'TableManipulatorsConstruct',
+            account,
+            artist_table=artist_table,
+            cache_table=cache_table,
+            common_layer=common_layer,
+        )
 
         # Custom construct for the resources that will interact with the Spotify API
         spotify_operators = CoreSpotifyOperatorsConstruct(
@@ -35,8 +52,9 @@ class BackendStack(Stack):
             account,
             artist_table.table_arn,
             artist_table.table_stream_arn,
-            table_operators.update_table_with_music_lambda,
-            requests_layer,
+            cache_table,
+            common_layer,
+            adaptive_schedule=adaptive_schedule,
         )
 
         # Custom construct for the step function workflow that will be triggered by an EventBridge rate expression
@@ -45,8 +63,10 @@ class BackendStack(Stack):
             'NotifierConstruct',
             account,
             artist_table,
-            requests_layer,
+            cache_table,
+            common_layer,
             spotify_operators.get_access_token_lambda,
+            adaptive_schedule=adaptive_schedule,
         )
 
         # Custom construct for the API Gateway that will be used to invoke the Lambda functions
@@ -57,6 +77,9 @@ class BackendStack(Stack):
             table_operators.fetch_artists_lambda,
             table_operators.add_artist_lambda,
             table_operators.remove_artist_lambda,
+            table_operators.add_artists_batch_lambda,
+            table_operators.remove_artists_batch_lambda,
             spotify_operators.get_access_token_lambda,
             spotify_operators.get_artist_id_lambda,
+            spotify_operators.import_playlist_artists_lambda,
         )
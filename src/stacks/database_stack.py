@@ -1,8 +1,15 @@
 from aws_cdk import RemovalPolicy, Stack
-from aws_cdk.aws_dynamodb import AttributeType, StreamViewType, TableEncryptionV2, TableV2
+from aws_cdk.aws_dynamodb import (
+    AttributeType,
+    GlobalSecondaryIndexPropsV2,
+    ProjectionType,
+    StreamViewType,
+    TableEncryptionV2,
+    TableV2,
+)
 from constructs import Construct
 
-from ..constants import AwsAccount
+from ..constants import NEXT_CHECK_INDEX_NAME, AwsAccount
 from ..helpers.helpers import generate_name, get_removal_policy
 
 
@@ -13,6 +20,11 @@ class DatabaseStack(Stack):
         """Returns the DynamoDB table name that holds the monitored artists."""
         return self.table
 
+    @property
+    def cache_table(self) -> TableV2:
+        """Returns the DynamoDB table that caches short-lived values shared across Lambda containers."""
+        return self._cache_table
+
     def __init__(self, scope: Construct, id: str, account: AwsAccount, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
@@ -26,5 +38,29 @@ class DatabaseStack(Stack):
             dynamo_stream=StreamViewType.NEW_IMAGE,
             table_name=artist_table_name,
             point_in_time_recovery=True,
+            # Sparse index of when each artist is due for its next check. Only scheduled artists have
+            # `check_shard`, which spreads them over a few partitions instead of one hot one
+            global_secondary_indexes=[
+                GlobalSecondaryIndexPropsV2(
+                    index_name=NEXT_CHECK_INDEX_NAME,
+                    partition_key={'name': 'check_shard', 'type': AttributeType.NUMBER},
+                    sort_key={'name': 'next_check_at', 'type': AttributeType.NUMBER},
+                    projection_type=ProjectionType.INCLUDE,
+                    non_key_attributes=['artist_name', 'last_album_details', 'last_single_details'],
+                )
+            ],
         )
         self.table.apply_removal_policy(get_removal_policy(account.stage))
+
+        # Short-lived values (e.g. the Spotify access token) shared between Lambda containers.
+        # Every item carries an `expires_at` epoch timestamp that DynamoDB's TTL sweeps up
+        cache_table_name = generate_name('SpotificityCacheTable', account)
+        self._cache_table = TableV2(
+            self,
+            cache_table_name,
+            partition_key={'name': 'cache_key', 'type': AttributeType.STRING},
+            encryption=TableEncryptionV2.aws_managed_key(),
+            removal_policy=RemovalPolicy.DESTROY,
+            time_to_live_attribute='expires_at',
+            table_name=cache_table_name,
+        )
@@ -0,0 +1,20 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT_DIR: Path = Path(__file__).resolve().parent.parent
+
+# `src/constants.py` reads the account IDs as soon as it is imported
+os.environ.setdefault('SPOTIFICITY_BETA_ACCT', '111111111111')
+os.environ.setdefault('SPOTIFICITY_PROD_ACCT', '222222222222')
+os.environ.setdefault('JSII_SILENCE_WARNING_DEPRECATED_NODE_VERSION', '1')
+sys.path.insert(0, str(ROOT_DIR))
+
+# Lambda handlers import each other and the common layer as top level modules, the way the Lambda runtime sees them
+for path in (
+    ROOT_DIR / 'src/lambdas/lambda_layers/common/python',
+    ROOT_DIR / 'src/lambdas/CoreSpotifyOperatorLambdas',
+    ROOT_DIR / 'src/lambdas/CoreTableOperatorLambdas',
+    ROOT_DIR / 'src/lambdas/NotifierConstructLambdas',
+):
+    sys.path.insert(0, str(path))
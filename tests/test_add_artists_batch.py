@@ -0,0 +1,40 @@
+import json
+
+import add_artists_batch
+from botocore.exceptions import ClientError
+from spotificity_common import artist_table
+
+
+class FakeDynamoDB:
+    """
+    Holds the artist table in memory and honours the `attribute_not_exists` condition of `PutItem`.
+    """
+
+    def __init__(self, stored_ids: set[str], throttled_ids: set[str]) -> None:
+        self.stored_ids = stored_ids
+        self.throttled_ids = throttled_ids
+
+    def put_item(self, TableName: str, Item: dict, ConditionExpression: str) -> dict:
+        artist_id: str = Item['artist_id']['S']
+        if artist_id in self.throttled_ids:
+            error: dict = {'Code': 'ProvisionedThroughputExceededException', 'Message': 'Throttled'}
+            raise ClientError({'Error': error}, 'PutItem')
+        if artist_id in self.stored_ids:
+            raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'Exists'}}, 'PutItem')
+        self.stored_ids.add(artist_id)
+        return {}
+
+
+def test_artists_added_after_the_existence_check_are_not_overwritten(monkeypatch):
+    # Other requests add `artist0` and `artist1` between the existence check and the writes
+    ddb = FakeDynamoDB(stored_ids={'artist0', 'artist1'}, throttled_ids={'artist3'})
+    monkeypatch.setenv('ARTIST_TABLE_NAME', 'artists')
+    monkeypatch.setattr(artist_table, 'get_client', lambda service: ddb)
+    monkeypatch.setattr(add_artists_batch, 'batch_get_artists', lambda table, artist_ids: {})
+
+    artists: list[dict] = [{'artist_id': f'artist{index}', 'artist_name': f'Artist {index}'} for index in range(4)]
+    result: dict = add_artists_batch.handler({'body': json.dumps({'artists': artists})}, None)
+
+    body: dict = json.loads(result['body'])
+    assert [artist['status'] for artist in body['results']] == ['already_monitored', 'already_monitored', 'added', 'failed']
+    assert (body['added'], body['already_monitored'], body['failed']) == (1, 2, 1)
@@ -0,0 +1,88 @@
+import random
+import string
+
+import pytest
+from botocore.exceptions import ClientError
+from spotificity_common import artist_snapshot
+
+# DynamoDB rejects items over 400 KB, counting attribute names and values
+MAX_ITEM_SIZE_BYTES: int = 400 * 1024
+
+
+class FakeCacheTable:
+    """
+    Local stand-in for the DynamoDB client that keeps the cache table's items in memory.
+    """
+
+    def __init__(self) -> None:
+        self.items: dict[str, dict] = {}
+
+    def get_item(self, TableName: str, Key: dict, ConsistentRead: bool = False) -> dict:
+        item: dict | None = self.items.get(Key['cache_key']['S'])
+        return {'Item': item} if item else {}
+
+    def put_item(self, TableName: str, Item: dict, ConditionExpression: str | None = None, **kwargs) -> dict:
+        if ConditionExpression:
+            stored_item: dict | None = self.items.get(Item['cache_key']['S'])
+            expected_version: dict = kwargs['ExpressionAttributeValues'][':expected_version']
+            if stored_item and stored_item['version'] != expected_version:
+                raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException', 'Message': ''}}, 'PutItem')
+
+        if item_size(Item) > MAX_ITEM_SIZE_BYTES:
+            raise ClientError({'Error': {'Code': 'ValidationException', 'Message': 'Item size too large'}}, 'PutItem')
+        self.items[Item['cache_key']['S']] = Item
+        return {}
+
+
+def item_size(item: dict) -> int:
+    return sum(len(name) + len(next(iter(value.values()))) for name, value in item.items())
+
+
+def realistic_artists(count: int) -> dict[str, str]:
+    # Spotify artist IDs are 22 random base62 characters, which gzip can't do much with
+    generator = random.Random(count)
+    alphabet: str = string.ascii_letters + string.digits
+    return {
+        ''.join(generator.choices(alphabet, k=22)): ' '.join(
+            ''.join(generator.choices(string.ascii_lowercase, k=generator.randint(3, 9))).title()
+            for _ in range(generator.randint(1, 3))
+        )
+        for _ in range(count)
+    }
+
+
+@pytest.fixture
+def cache_table(monkeypatch) -> FakeCacheTable:
+    fake_cache_table = FakeCacheTable()
+    monkeypatch.setattr(artist_snapshot, 'get_client', lambda service_name: fake_cache_table)
+    return fake_cache_table
+
+
+def test_20k_artist_snapshot_is_split_into_items_below_the_size_limit(cache_table: FakeCacheTable):
+    artists: dict[str, str] = realistic_artists(20_000)
+
+    # A single gzipped item wouldn't fit
+    assert len(artist_snapshot.encode_artists(artists)) > MAX_ITEM_SIZE_BYTES
+
+    built_at: int = int(artist_snapshot.time.time())
+    assert artist_snapshot.write_snapshot('cache', artists, 0, built_at)
+
+    assert len(cache_table.items) == 1 + 20_000 // artist_snapshot.SNAPSHOT_PART_SIZE
+    assert max(item_size(item) for item in cache_table.items.values()) < MAX_ITEM_SIZE_BYTES / 2
+    assert artist_snapshot.read_snapshot('cache') == (artists, 1, built_at)
+
+
+def test_losing_writer_leaves_the_snapshot_alone(cache_table: FakeCacheTable):
+    built_at: int = int(artist_snapshot.time.time())
+    assert artist_snapshot.write_snapshot('cache', {'artist0': 'Artist 0'}, 0, built_at)
+
+    assert not artist_snapshot.write_snapshot('cache', {'artist1': 'Artist 1'}, 0, built_at)
+    assert artist_snapshot.read_snapshot('cache') == ({'artist0': 'Artist 0'}, 1, built_at)
+
+
+def test_snapshot_with_a_missing_part_counts_as_missing(cache_table: FakeCacheTable):
+    built_at: int = int(artist_snapshot.time.time())
+    artist_snapshot.write_snapshot('cache', realistic_artists(6_000), 0, built_at)
+
+    del cache_table.items[next(key for key in cache_table.items if key.endswith('#1'))]
+    assert artist_snapshot.read_snapshot('cache') == (None, 1, built_at)
@@ -0,0 +1,42 @@
+import json
+
+import get_artist_id
+import pytest
+from spotificity_common.http_client import HTTPError, HttpResponse, Timeout
+
+
+def search_event() -> dict:
+    return {'body': json.dumps({'artist_name': 'Artist', 'access_token': 'token'})}
+
+
+def fail_with(error: Exception):
+    def search_artist(artist_name: str, market: str, access_token: str) -> list:
+        raise error
+
+    return search_artist
+
+
+def test_spotify_error_response_is_passed_back(monkeypatch):
+    response = HttpResponse('https://api.spotify.com/v1/search', 404, {}, b'{"error": "not found"}')
+    monkeypatch.setattr(get_artist_id, 'search_artist', fail_with(HTTPError('404 Error', response=response)))
+
+    result: dict = get_artist_id.handler(search_event(), None)
+
+    assert result['statusCode'] == 404
+    assert json.loads(result['body'])['error'] == '{"error": "not found"}'
+
+
+def test_http_error_without_response_is_a_bad_gateway(monkeypatch):
+    monkeypatch.setattr(get_artist_id, 'search_artist', fail_with(HTTPError('Exhausted retries')))
+
+    result: dict = get_artist_id.handler(search_event(), None)
+
+    assert result['statusCode'] == 502
+    assert json.loads(result['body'])['error'] == 'Exhausted retries'
+
+
+def test_timeout_is_not_treated_as_an_http_error(monkeypatch):
+    monkeypatch.setattr(get_artist_id, 'search_artist', fail_with(Timeout('Request timed out')))
+
+    with pytest.raises(Timeout):
+        get_artist_id.handler(search_event(), None)
@@ -0,0 +1,106 @@
+import time
+
+import get_latest_music_for_notifier
+import pytest
+from spotificity_common.http_client import HTTPError, HttpResponse
+from spotificity_common.spotify_client import DeadlineExceeded, SpotifyClient
+
+
+class FakeContext:
+    def __init__(self, remaining_ms: int) -> None:
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self) -> int:
+        return self.remaining_ms
+
+
+class ThrottlingSession:
+    """
+    Answers every request with a 429 and a long `Retry-After`.
+    """
+
+    def __init__(self) -> None:
+        self.timeouts: list[float | None] = []
+
+    def get(self, url, params=None, headers=None, timeout=None) -> HttpResponse:
+        self.timeouts.append(timeout)
+        return HttpResponse(url, 429, {'Retry-After': '30'}, b'')
+
+
+def artist(index: int) -> dict:
+    return {'artist_id': f'artist-{index}', 'artist_name': f'Artist {index}'}
+
+
+def test_client_raises_instead_of_sleeping_past_its_deadline(monkeypatch):
+    session = ThrottlingSession()
+    monkeypatch.setattr('spotificity_common.spotify_client.get_http_session', lambda: session)
+
+    client = SpotifyClient(max_concurrency=1)
+    client.deadline = time.monotonic() + 2
+
+    started_at: float = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        client.get('https://api.spotify.com/v1/artists/1/albums', 'token')
+
+    assert time.monotonic() - started_at < 1
+    assert session.timeouts and all(timeout <= 2 for timeout in session.timeouts)
+
+
+def test_client_without_deadline_sends_no_request_timeout(monkeypatch):
+    session = ThrottlingSession()
+    monkeypatch.setattr('spotificity_common.spotify_client.get_http_session', lambda: session)
+    monkeypatch.setattr('spotificity_common.spotify_client.time.sleep', lambda delay: None)
+
+    with pytest.raises(HTTPError):
+        SpotifyClient(max_concurrency=1, max_retries=1).get('https://api.spotify.com/v1/artists/1/albums', 'token')
+
+    assert session.timeouts == [None, None]
+
+
+def test_artists_past_the_deadline_are_unfinished_not_failed(monkeypatch):
+    def fetch_artist_music(artist: dict) -> dict:
+        if artist['artist_id'] == 'artist-1':
+            raise DeadlineExceeded('No time left.')
+        return {'artist_id': artist['artist_id']}
+
+    monkeypatch.setattr(get_latest_music_for_notifier, 'fetch_artist_music', fetch_artist_music)
+
+    fetched_music, error = get_latest_music_for_notifier.fetch_latest_music([artist(0), artist(1), artist(2)], 2)
+
+    assert error is None
+    assert [music['artist_id'] for music in fetched_music] == ['artist-0', 'artist-2']
+
+
+def test_handler_checkpoints_unfinished_artists_and_continues(monkeypatch):
+    checkpoints: dict[str, list[dict]] = {}
+    tokens: list[str] = []
+
+    def get_access_token() -> str:
+        tokens.append(f'token-{len(tokens)}')
+        return tokens[-1]
+
+    def get_releases_since(artist_id, artist_name, access_token, last_seen) -> dict:
+        if artist_id == 'artist-3':
+            raise DeadlineExceeded('No time left.')
+        return {'album': [], 'single': []}
+
+    monkeypatch.setattr(get_latest_music_for_notifier, 'CACHE_TABLE_NAME', 'cache-table')
+    monkeypatch.setattr(get_latest_music_for_notifier, 'get_access_token', get_access_token)
+    monkeypatch.setattr(get_latest_music_for_notifier, 'get_releases_since', get_releases_since)
+    monkeypatch.setattr(get_latest_music_for_notifier, 'read_checkpoint', lambda table, scope: checkpoints.get(scope, []))
+    monkeypatch.setattr(
+        get_latest_music_for_notifier,
+        'write_checkpoint',
+        lambda table, scope, records: checkpoints.setdefault(scope, []).extend(records),
+    )
+
+    event: dict = {
+        'artists': {'current_artists_with_id': [artist(index) for index in range(5)]},
+        'checkpoint': {'execution_id': 'execution'},
+    }
+    result: dict = get_latest_music_for_notifier.handler(event, FakeContext(remaining_ms=60000))
+
+    assert result == {'continuation': {'completed': 4, 'remaining': 1}}
+    assert sorted(music['artist_id'] for music in checkpoints['execution']) == ['artist-0', 'artist-1', 'artist-2', 'artist-4']
+    # Every artist asked the token provider for a token of its own
+    assert len(tokens) == 5
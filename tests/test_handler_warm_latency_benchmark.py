@@ -0,0 +1,139 @@
+"""
+Benchmarks warm invocations of the DynamoDB handlers against a local fake
+DynamoDB endpoint, with the container-wide client (reused) and with a new client
+per invocation (the way the handlers used to create them). The timing comparison
+only runs with `pytest -m benchmark -s`, which also prints the timings.
+"""
+
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import add_artist
+import list_artists
+import pytest
+import remove_artist
+import update_table_music_for_notifier
+from spotificity_common import clients
+
+WARM_INVOCATIONS: int = 30
+
+STORED_ARTISTS: list[dict] = [
+    {'artist_id': {'S': f'artist{index}'}, 'artist_name': {'S': f'Artist {index}'}} for index in range(20)
+]
+
+
+class FakeDynamoDbHandler(BaseHTTPRequestHandler):
+    """
+    Answers the DynamoDB JSON protocol with canned responses.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self) -> None:
+        request: dict = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        operation: str = self.headers['X-Amz-Target'].split('.')[-1]
+
+        if operation == 'Scan':
+            response: dict = {'Items': STORED_ARTISTS, 'Count': len(STORED_ARTISTS)}
+        elif operation == 'BatchGetItem':
+            # Already scheduled artists, whose music hasn't changed
+            response = {
+                'Responses': {
+                    table: [{**key, 'next_check_at': {'N': '0'}} for key in request_items['Keys']]
+                    for table, request_items in request['RequestItems'].items()
+                },
+                'UnprocessedKeys': {},
+            }
+        else:
+            response = {}
+
+        body: bytes = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-amz-json-1.0')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@pytest.fixture(scope='module')
+def fake_dynamodb_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeDynamoDbHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+
+
+@pytest.fixture
+def fake_dynamodb(fake_dynamodb_url: str, monkeypatch) -> None:
+    monkeypatch.setenv('AWS_ENDPOINT_URL', fake_dynamodb_url)
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('ARTIST_TABLE_NAME', 'artists')
+    monkeypatch.setenv('CACHE_TABLE_NAME', 'cache')
+    monkeypatch.setattr(clients, '_clients', {})
+
+
+def artist_event() -> dict:
+    return {'body': json.dumps({'artist_id': 'artist0', 'artist_name': 'Artist 0'})}
+
+
+def latest_music_event() -> list[dict]:
+    return [
+        {
+            'artist_id': artist['artist_id']['S'],
+            'artist_name': artist['artist_name']['S'],
+            'last_album_details': None,
+            'last_single_details': None,
+            'new_releases': [],
+        }
+        for artist in STORED_ARTISTS
+    ]
+
+
+HANDLERS: dict = {
+    'add_artist': lambda: add_artist.handler(artist_event(), None),
+    'remove_artist': lambda: remove_artist.handler(artist_event(), None),
+    'list_artists': lambda: list_artists.handler({}, None),
+    'update_table_music_for_notifier': lambda: update_table_music_for_notifier.handler(latest_music_event(), None),
+}
+
+
+def median_warm_latency_ms(invoke, fresh_client_per_invocation: bool) -> float:
+    invoke()  # Cold start: creates the clients and opens the connections
+
+    latencies: list[float] = []
+    for _ in range(WARM_INVOCATIONS):
+        if fresh_client_per_invocation:
+            clients._clients.clear()
+        started_at: float = time.perf_counter()
+        invoke()
+        latencies.append((time.perf_counter() - started_at) * 1000)
+    return statistics.median(latencies)
+
+
+@pytest.mark.parametrize('handler_name', HANDLERS)
+def test_handlers_reuse_one_client_across_warm_invocations(fake_dynamodb, handler_name: str):
+    HANDLERS[handler_name]()
+    client = clients.get_client('dynamodb')
+    HANDLERS[handler_name]()
+
+    assert clients.get_client('dynamodb') is client
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize('handler_name', HANDLERS)
+def test_reused_clients_cut_warm_latency(fake_dynamodb, handler_name: str):
+    fresh_ms: float = median_warm_latency_ms(HANDLERS[handler_name], fresh_client_per_invocation=True)
+    reused_ms: float = median_warm_latency_ms(HANDLERS[handler_name], fresh_client_per_invocation=False)
+
+    print(f'\n{handler_name}: {fresh_ms:.1f} ms with a new client per invocation, {reused_ms:.1f} ms reused')
+    assert reused_ms < fresh_ms * 0.75
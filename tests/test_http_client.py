@@ -0,0 +1,31 @@
+import pytest
+from spotificity_common.http_client import ConnectionError, HttpSession, Timeout
+from urllib3 import exceptions
+
+
+def session_failing_with(error: Exception) -> HttpSession:
+    session = HttpSession(max_pool_connections=1)
+
+    def request(*args, **kwargs):
+        raise error
+
+    session._pool_manager.request = request
+    return session
+
+
+@pytest.mark.parametrize(
+    'error',
+    [exceptions.SSLError('Bad handshake'), exceptions.ProxyError('Proxy refused', None), exceptions.DecodeError('Bad gzip')],
+)
+def test_other_urllib3_errors_are_connection_errors(error: Exception):
+    with pytest.raises(ConnectionError) as raised:
+        session_failing_with(error).get('https://api.spotify.com/v1/artists/1')
+
+    assert raised.value.__cause__ is error
+
+
+def test_timeouts_are_still_timeouts():
+    with pytest.raises(Timeout):
+        session_failing_with(exceptions.ReadTimeoutError(None, '/v1/artists/1', 'Read timed out')).get(
+            'https://api.spotify.com/v1/artists/1'
+        )
@@ -0,0 +1,48 @@
+import json
+
+import import_playlist_artists
+import pytest
+from botocore.exceptions import ClientError
+from spotificity_common.http_client import ConnectionError
+
+
+def import_event(access_token: str | None = None) -> dict:
+    return {'body': json.dumps({'playlist_id': 'playlist', **({'access_token': access_token} if access_token else {})})}
+
+
+def fail_with(error: Exception):
+    def get_access_token() -> str:
+        raise error
+
+    return get_access_token
+
+
+@pytest.mark.parametrize(
+    'error, error_type',
+    [
+        (ClientError({'Error': {'Code': 'AccessDeniedException', 'Message': 'Denied'}}, 'GetSecretValue'), 'Client'),
+        (ConnectionError('Connection refused'), 'HTTP'),
+    ],
+)
+def test_token_errors_are_a_bad_gateway(monkeypatch, error, error_type):
+    monkeypatch.setattr(import_playlist_artists, 'get_access_token', fail_with(error))
+
+    result: dict = import_playlist_artists.handler(import_event(), None)
+
+    assert result['statusCode'] == 502
+    assert json.loads(result['body'])['error_type'] == error_type
+
+
+def test_playlists_too_big_to_import_in_time_are_rejected(monkeypatch):
+    requested_offsets: list[int] = []
+
+    def get_playlist_page(playlist_id: str, access_token: str, offset: int) -> dict:
+        requested_offsets.append(offset)
+        return {'total': import_playlist_artists.MAX_PLAYLIST_TRACKS + 1, 'items': []}
+
+    monkeypatch.setattr(import_playlist_artists, 'get_playlist_page', get_playlist_page)
+
+    result: dict = import_playlist_artists.handler(import_event('token'), None)
+
+    assert result['statusCode'] == 413
+    assert requested_offsets == [0]
@@ -0,0 +1,137 @@
+"""
+Benchmarks the notifier's concurrent fetch against a local fake Spotify server,
+from 10 to 2,000 artists. The timing comparison only runs with
+`pytest -m benchmark -s`, which also prints the timings.
+"""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import get_latest_music_for_notifier
+import pytest
+from spotificity_common import releases, spotify_client
+from spotificity_common.http_client import HttpSession
+from spotificity_common.spotify_client import SpotifyClient
+
+# Simulated round trip of one request to Spotify
+FAKE_SPOTIFY_LATENCY_SECONDS: float = 0.01
+
+ARTIST_COUNTS: tuple[int, ...] = (10, 100, 500, 2000)
+MAX_IN_FLIGHT: int = 10
+
+
+class FakeSpotifyHandler(BaseHTTPRequestHandler):
+    """
+    Answers `/v1/artists/<id>/albums` with the artist's newest album and single.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        time.sleep(FAKE_SPOTIFY_LATENCY_SECONDS)
+        artist_id: str = re.match(r'/v1/artists/([^/]+)/albums', self.path).group(1)
+        body: bytes = json.dumps(
+            {
+                'items': [
+                    {
+                        'id': f'{artist_id}-{release_type}',
+                        'name': f'{artist_id} {release_type}',
+                        'album_type': release_type,
+                        'album_group': release_type,
+                        'release_date': '2024-01-01',
+                        'artists': [{'id': artist_id, 'name': artist_id}],
+                    }
+                    for release_type in ('album', 'single')
+                ],
+                'next': None,
+            }
+        ).encode()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class LocalSpotifySession(HttpSession):
+    """
+    Sends every request meant for the Spotify API to the fake server instead.
+    """
+
+    def __init__(self, base_url: str) -> None:
+        super().__init__(max_pool_connections=MAX_IN_FLIGHT)
+        self.base_url = base_url
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        return super().request(method, url.replace('https://api.spotify.com', self.base_url), body, headers, timeout)
+
+
+@pytest.fixture(scope='module')
+def fake_spotify_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeSpotifyHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+
+
+@pytest.fixture
+def fake_spotify(fake_spotify_url: str, monkeypatch) -> None:
+    session = LocalSpotifySession(fake_spotify_url)
+    client = SpotifyClient(max_concurrency=MAX_IN_FLIGHT)
+    monkeypatch.setattr(spotify_client, 'get_http_session', lambda: session)
+    monkeypatch.setattr(releases, 'get_spotify_client', lambda: client)
+    monkeypatch.setattr(get_latest_music_for_notifier, 'get_access_token', lambda: 'token')
+
+
+def monitored_artists(count: int) -> list[dict]:
+    # Every artist was last seen at an older album, so each one has something new
+    return [
+        {
+            'artist_id': f'artist{index}',
+            'artist_name': f'Artist {index}',
+            'last_album_details': {'last_album_id': 'old', 'last_album_release_date': '2020-01-01'},
+            'last_single_details': {'last_single_id': 'old', 'last_single_release_date': '2020-01-01'},
+        }
+        for index in range(count)
+    ]
+
+
+def time_fetch(artists: list[dict], max_in_flight: int) -> float:
+    started_at: float = time.perf_counter()
+    latest_music, error = get_latest_music_for_notifier.fetch_latest_music(artists, max_in_flight)
+    elapsed: float = time.perf_counter() - started_at
+
+    assert error is None
+    assert [music['artist_id'] for music in latest_music] == [artist['artist_id'] for artist in artists]
+    assert all(len(music['new_releases']) == 2 for music in latest_music)
+    return elapsed
+
+
+def test_concurrent_fetch_keeps_every_artist_in_order(fake_spotify):
+    time_fetch(monitored_artists(100), MAX_IN_FLIGHT)
+
+
+@pytest.mark.benchmark
+def test_fetch_scales_from_10_to_2000_artists(fake_spotify):
+    # One artist at a time, as the notifier used to fetch them
+    sequential_seconds_per_artist: float = time_fetch(monitored_artists(50), max_in_flight=1) / 50
+
+    print(f'\nSequential: {sequential_seconds_per_artist * 1000:.1f} ms per artist')
+    print(f'{"Artists":>8} | {"Concurrent (s)":>14} | {"Sequential, est. (s)":>20} | {"Speedup":>7}')
+    for artist_count in ARTIST_COUNTS:
+        elapsed: float = time_fetch(monitored_artists(artist_count), MAX_IN_FLIGHT)
+        sequential_estimate: float = sequential_seconds_per_artist * artist_count
+        print(f'{artist_count:>8} | {elapsed:>14.2f} | {sequential_estimate:>20.2f} | {sequential_estimate / elapsed:>6.1f}x')
+
+        # Small runs are dominated by thread start-up. Big ones should come close to MAX_IN_FLIGHT times faster
+        if artist_count >= 500:
+            assert elapsed < sequential_estimate / (MAX_IN_FLIGHT / 2)
@@ -0,0 +1,127 @@
+import json
+
+import message_new_music
+import pytest
+from botocore.exceptions import ClientError
+from spotificity_common import secret_cache as secret_cache_module
+from spotificity_common import token_provider
+from spotificity_common.http_client import HTTPError, HttpResponse
+from spotificity_common.secret_cache import SecretCache, secret_cache
+
+
+class FakeSecretsManager:
+    """
+    Local stand-in for the Secrets Manager client that counts `GetSecretValue` calls.
+    """
+
+    def __init__(self, secrets: dict[tuple[str, str], dict]) -> None:
+        self.secrets = secrets
+        self.calls: list[tuple[str, str]] = []
+
+    def get_secret_value(self, SecretId: str, VersionStage: str) -> dict:
+        self.calls.append((SecretId, VersionStage))
+        if (SecretId, VersionStage) not in self.secrets:
+            raise ClientError(
+                {'Error': {'Code': 'ResourceNotFoundException', 'Message': f'{SecretId} not found'}}, 'GetSecretValue'
+            )
+        return {'SecretString': json.dumps(self.secrets[(SecretId, VersionStage)])}
+
+
+class FakeSns:
+    def __init__(self, subscribed_emails: list[str]) -> None:
+        self.subscribed_emails = subscribed_emails
+
+    def list_subscriptions_by_topic(self, TopicArn: str) -> dict:
+        return {'Subscriptions': [{'Endpoint': email} for email in self.subscribed_emails]}
+
+
+@pytest.fixture
+def secrets_manager(monkeypatch) -> FakeSecretsManager:
+    fake_secrets_manager = FakeSecretsManager(
+        {
+            ('SpotifySecrets', 'AWSCURRENT'): {'SPOTIFY_CLIENT_ID': 'id', 'SPOTIFY_CLIENT_SECRET': 'secret'},
+            ('SpotifySecrets', 'AWSPREVIOUS'): {'SPOTIFY_CLIENT_ID': 'old-id', 'SPOTIFY_CLIENT_SECRET': 'old-secret'},
+            ('EmailSecret', 'AWSCURRENT'): {'MY_EMAIL': 'me@example.com'},
+        }
+    )
+    clients: dict = {'secretsmanager': fake_secrets_manager, 'sns': FakeSns(['me@example.com'])}
+    monkeypatch.setattr(secret_cache_module, 'get_client', clients.get)
+    monkeypatch.setattr(message_new_music, 'get_client', clients.get)
+
+    # The shared cache outlives a single test, just like it outlives a single invocation
+    secret_cache.invalidate('SpotifySecrets')
+    secret_cache.invalidate('EmailSecret')
+    yield fake_secrets_manager
+    secret_cache.invalidate('SpotifySecrets')
+    secret_cache.invalidate('EmailSecret')
+
+
+def test_warm_invocations_fetch_the_secret_only_once(secrets_manager: FakeSecretsManager):
+    for _ in range(5):
+        message_new_music.confirm_email_subscription()
+
+    assert secrets_manager.calls == [('EmailSecret', 'AWSCURRENT')]
+
+
+def test_secret_is_fetched_again_once_the_ttl_runs_out(secrets_manager: FakeSecretsManager, monkeypatch):
+    now: list[float] = [1000.0]
+    monkeypatch.setattr(secret_cache_module.time, 'monotonic', lambda: now[0])
+    cache = SecretCache(ttl_seconds=60)
+
+    cache.get_secret_json('SpotifySecrets')
+    now[0] += 59
+    cache.get_secret_json('SpotifySecrets')
+    assert len(secrets_manager.calls) == 1
+
+    now[0] += 2
+    cache.get_secret_json('SpotifySecrets')
+    assert len(secrets_manager.calls) == 2
+
+
+def test_forced_refresh_picks_up_a_rotated_secret(secrets_manager: FakeSecretsManager):
+    cache = SecretCache()
+    assert cache.get_secret_json('SpotifySecrets')['SPOTIFY_CLIENT_ID'] == 'id'
+
+    secrets_manager.secrets[('SpotifySecrets', 'AWSCURRENT')] = {'SPOTIFY_CLIENT_ID': 'new-id', 'SPOTIFY_CLIENT_SECRET': 's'}
+    assert cache.get_secret_json('SpotifySecrets')['SPOTIFY_CLIENT_ID'] == 'id'
+    assert cache.get_secret_json('SpotifySecrets', force_refresh=True)['SPOTIFY_CLIENT_ID'] == 'new-id'
+    assert len(secrets_manager.calls) == 2
+
+
+def test_version_stages_are_cached_separately(secrets_manager: FakeSecretsManager):
+    cache = SecretCache()
+
+    for _ in range(3):
+        assert cache.get_secret_json('SpotifySecrets')['SPOTIFY_CLIENT_ID'] == 'id'
+        assert cache.get_secret_json('SpotifySecrets', 'AWSPREVIOUS')['SPOTIFY_CLIENT_ID'] == 'old-id'
+
+    assert secrets_manager.calls == [('SpotifySecrets', 'AWSCURRENT'), ('SpotifySecrets', 'AWSPREVIOUS')]
+
+
+def test_failed_fetches_are_not_cached(secrets_manager: FakeSecretsManager):
+    cache = SecretCache()
+
+    for _ in range(2):
+        with pytest.raises(ClientError):
+            cache.get_secret_string('MissingSecret')
+
+    assert len(secrets_manager.calls) == 2
+
+
+def test_rejected_client_credentials_are_fetched_again_once(secrets_manager: FakeSecretsManager, monkeypatch):
+    def request_token(client_id: str, client_secret: str) -> dict:
+        if client_id != 'new-id':
+            raise HTTPError('401 Error', response=HttpResponse('https://accounts.spotify.com/api/token', 401, {}, b''))
+        return {'access_token': 'token', 'expires_in': 3600}
+
+    monkeypatch.setattr(token_provider, 'CACHE_TABLE_NAME', None)
+    monkeypatch.setattr(token_provider, 'request_token', request_token)
+    monkeypatch.setattr(token_provider, '_cached_token', {})
+
+    # Cache the credentials, then rotate them behind the cache's back
+    token_provider.get_client_credentials()
+    secrets_manager.secrets[('SpotifySecrets', 'AWSCURRENT')] = {'SPOTIFY_CLIENT_ID': 'new-id', 'SPOTIFY_CLIENT_SECRET': 's'}
+
+    with token_provider._refresh_lock:
+        assert token_provider.refresh_token() == 'token'
+    assert secrets_manager.calls == [('SpotifySecrets', 'AWSCURRENT')] * 2
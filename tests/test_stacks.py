@@ -0,0 +1,92 @@
+import json
+
+import pytest
+from aws_cdk import App, Duration, Environment, Stack
+from aws_cdk.assertions import Match, Template
+from aws_cdk.aws_lambda import LayerVersion
+
+from src.constants import Accounts
+from src.custom_constructs.spotify_operators import CoreSpotifyOperatorsConstruct
+from src.helpers.helpers import layer_code
+from src.stacks.backend_stack import BackendStack
+from src.stacks.database_stack import DatabaseStack
+
+
+def event_pattern(*patterns: dict) -> dict:
+    return {'Filters': [{'Pattern': json.dumps(pattern, separators=(',', ':'))} for pattern in patterns]}
+
+
+@pytest.fixture(scope='module')
+def backend_template() -> Template:
+    app = App()
+    env = Environment(account=Accounts.beta.account_id, region='us-east-1')
+    database_stack = DatabaseStack(app, 'DatabaseStack', account=Accounts.beta, env=env)
+    backend_stack = BackendStack(
+        app,
+        'BackendStack',
+        account=Accounts.beta,
+        artist_table=database_stack.artist_table,
+        cache_table=database_stack.cache_table,
+        env=env,
+    )
+    return Template.from_stack(backend_stack)
+
+
+def test_get_latest_music_only_receives_inserts(backend_template: Template):
+    backend_template.has_resource_properties(
+        'AWS::Lambda::EventSourceMapping',
+        {
+            'FunctionName': {'Ref': Match.string_like_regexp('GetLatestMusicLambda')},
+            'FilterCriteria': event_pattern({'eventName': ['INSERT']}),
+        },
+    )
+
+
+def test_artist_snapshot_consumer_only_receives_list_changes_and_dead_letters_failures(backend_template: Template):
+    backend_template.has_resource_properties(
+        'AWS::Lambda::EventSourceMapping',
+        {
+            'FunctionName': {'Ref': Match.string_like_regexp('SyncArtistSnapshotLambda')},
+            'FilterCriteria': event_pattern(
+                {'eventName': ['INSERT', 'REMOVE']},
+                {'eventName': ['MODIFY'], 'dynamodb': {'NewImage': {'name_changed': {'BOOL': [True]}}}},
+            ),
+            'BisectBatchOnFunctionError': True,
+            'DestinationConfig': {'OnFailure': {'Destination': Match.any_value()}},
+        },
+    )
+
+
+def test_notifier_artist_scan_has_time_for_a_full_table_scan(backend_template: Template):
+    backend_template.has_resource_properties(
+        'AWS::Lambda::Function',
+        {'FunctionName': Match.string_like_regexp('GetArtistsListFor-ForNotifier'), 'Timeout': 30},
+    )
+
+
+def test_stream_batching_is_configurable():
+    app = App()
+    database_stack = DatabaseStack(app, 'DatabaseStack', account=Accounts.beta)
+    stack = Stack(app, 'SpotifyOperatorsStack')
+    CoreSpotifyOperatorsConstruct(
+        stack,
+        'SpotifyOperators',
+        Accounts.beta,
+        database_stack.artist_table.table_arn,
+        database_stack.artist_table.table_stream_arn,
+        database_stack.cache_table,
+        LayerVersion(stack, 'CommonLayer', code=layer_code('src/lambdas/lambda_layers/common')),
+        stream_batch_size=50,
+        stream_max_batching_window=Duration.seconds(5),
+        stream_parallelization_factor=4,
+    )
+
+    Template.from_stack(stack).has_resource_properties(
+        'AWS::Lambda::EventSourceMapping',
+        {
+            'FilterCriteria': event_pattern({'eventName': ['INSERT']}),
+            'BatchSize': 50,
+            'MaximumBatchingWindowInSeconds': 5,
+            'ParallelizationFactor': 4,
+        },
+    )
@@ -0,0 +1,40 @@
+import sync_artist_snapshot
+
+
+def stream_record(event_name: str, artist_id: str, artist_name: str | None = None) -> dict:
+    record: dict = {'eventName': event_name, 'dynamodb': {'Keys': {'artist_id': {'S': artist_id}}}}
+    if artist_name:
+        record['dynamodb']['NewImage'] = {'artist_id': {'S': artist_id}, 'artist_name': {'S': artist_name}}
+    return record
+
+
+def test_renames_are_applied_and_their_flag_cleared(monkeypatch):
+    applied_changes: list[tuple] = []
+    cleared_flags: list[tuple] = []
+
+    monkeypatch.setenv('ARTIST_TABLE_NAME', 'artists')
+    monkeypatch.setenv('CACHE_TABLE_NAME', 'cache')
+    monkeypatch.setattr(
+        sync_artist_snapshot,
+        'apply_snapshot_changes',
+        lambda cache_table, artist_table, added, removed: applied_changes.append((added, removed)),
+    )
+    monkeypatch.setattr(
+        sync_artist_snapshot,
+        'clear_name_changed',
+        lambda table, artist_id, artist_name: cleared_flags.append((artist_id, artist_name)),
+    )
+
+    sync_artist_snapshot.handler(
+        {
+            'Records': [
+                stream_record('INSERT', 'artist0', 'Artist 0'),
+                stream_record('MODIFY', 'artist1', 'Renamed Artist 1'),
+                stream_record('REMOVE', 'artist2'),
+            ]
+        },
+        None,
+    )
+
+    assert applied_changes == [({'artist0': 'Artist 0', 'artist1': 'Renamed Artist 1'}, {'artist2'})]
+    assert cleared_flags == [('artist1', 'Renamed Artist 1')]
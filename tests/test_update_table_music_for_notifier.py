@@ -0,0 +1,92 @@
+import io
+
+import message_new_music
+import pytest
+import update_table_music_for_notifier
+from spotificity_common import payload_store
+
+CLAIM_CHECK_THRESHOLD_BYTES: int = 5000
+
+
+class FakeS3:
+    """
+    Keeps uploaded objects in memory.
+    """
+
+    def __init__(self) -> None:
+        self.objects: dict[tuple[str, str], bytes] = {}
+
+    def upload_fileobj(self, fileobj, bucket: str, key: str) -> None:
+        self.objects[(bucket, key)] = fileobj.read()
+
+    def get_object(self, Bucket: str, Key: str) -> dict:
+        return {'Body': io.BytesIO(self.objects[(Bucket, Key)])}
+
+
+def artist_with_new_release(index: int) -> dict:
+    release: dict = {'id': f'release-{index}', 'name': f'Release {index} ' + 'x' * 100, 'release_date': '2026-10-16'}
+    return {
+        'artist_id': f'artist-{index}',
+        'artist_name': f'Artist {index}',
+        'last_single_details': {'last_single_id': release['id'], 'last_single_name': release['name']},
+        'new_releases': [release],
+    }
+
+
+def test_sharded_chunks_claim_check_new_music_that_only_overflows_once_joined(monkeypatch):
+    s3 = FakeS3()
+    monkeypatch.setenv('ARTIST_TABLE_NAME', 'artists')
+    monkeypatch.setattr(payload_store, 'PAYLOAD_BUCKET_NAME', 'payloads')
+    monkeypatch.setattr(payload_store, 'CLAIM_CHECK_THRESHOLD_BYTES', CLAIM_CHECK_THRESHOLD_BYTES)
+    monkeypatch.setattr(payload_store, 'get_client', lambda service: s3)
+    monkeypatch.setattr(update_table_music_for_notifier, 'SHARDED', True)
+    monkeypatch.setattr(
+        update_table_music_for_notifier,
+        'batch_get_artists',
+        lambda table, artist_ids, projection: {artist_id: {'next_check_at': 0} for artist_id in artist_ids},
+    )
+    monkeypatch.setattr(update_table_music_for_notifier, 'update_artist_music', lambda *args: {})
+
+    chunks: list[list[dict]] = [[artist_with_new_release(index) for index in range(start, start + 20)] for start in (0, 20)]
+    chunks.append([])
+
+    # Each chunk's new music fits on its own, but the chunks together go over the threshold
+    new_music: list[list[dict]] = [
+        [{'artist_name': artist['artist_name'], 'new_releases': artist['new_releases']} for artist in chunk] for chunk in chunks
+    ]
+    assert all(not payload_store.is_over_threshold(chunk_new_music) for chunk_new_music in new_music)
+    assert payload_store.is_over_threshold([artist for chunk_new_music in new_music for artist in chunk_new_music])
+
+    map_output: list = [update_table_music_for_notifier.handler(chunk, None)['new_music'] for chunk in chunks]
+
+    assert [payload_store.is_claim_check(new_music) for new_music in map_output] == [True, True, False]
+    assert payload_store.payload_size(map_output) < CLAIM_CHECK_THRESHOLD_BYTES
+
+    sent_emails: list[list[dict]] = []
+    monkeypatch.setattr(message_new_music, 'confirm_email_subscription', lambda: None)
+    monkeypatch.setattr(message_new_music, 'send_email_with_new_music', sent_emails.append)
+    message_new_music.handler(map_output, None)
+
+    assert [artist['artist_name'] for artist in sent_emails[0]] == [f'Artist {index}' for index in range(40)]
+
+
+@pytest.mark.parametrize('schedule_mode, scheduled_count', [('weekly', 0), ('adaptive', 2)])
+def test_only_the_adaptive_schedule_writes_check_schedules(monkeypatch, schedule_mode, scheduled_count):
+    scheduled_artist_ids: list[str] = []
+    monkeypatch.setenv('ARTIST_TABLE_NAME', 'artists')
+    monkeypatch.setattr(update_table_music_for_notifier, 'SCHEDULE_MODE', schedule_mode)
+    monkeypatch.setattr(
+        update_table_music_for_notifier,
+        'batch_get_artists',
+        lambda table, artist_ids, projection: {artist_id: {} for artist_id in artist_ids},
+    )
+    monkeypatch.setattr(update_table_music_for_notifier, 'update_artist_music', lambda *args: {})
+    monkeypatch.setattr(
+        update_table_music_for_notifier,
+        'set_check_schedule',
+        lambda table, artist_id, next_check, cadence_days: scheduled_artist_ids.append(artist_id),
+    )
+
+    update_table_music_for_notifier.handler([artist_with_new_release(index) for index in range(2)], None)
+
+    assert len(scheduled_artist_ids) == scheduled_count